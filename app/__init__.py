@@ -13,19 +13,25 @@ def create_app():
     with app.app_context():
 
         from . import models
+        models.graph.configure(app.config)
 
         # Routes
         from app.routes import logging
         from app.routes import about
         from app.routes import blog
+        from app.routes import coalescing
+        from app.routes import bulk_import
         from app.routes import comment
         from app.routes import concept
         from app.routes import errors
+        from app.routes import export
         from app.routes import index
+        from app.routes import jobs
         from app.routes import links
         from app.routes import note
         from app.routes import podcast
         from app.routes import popup
+        from app.routes import queries
         from app.routes import rss
         from app.routes import search
 
@@ -0,0 +1,127 @@
+""" Coalescing of rapid updates to the same document.
+
+An editor autosaving every few seconds posts the same article again and
+again. With COALESCE_WINDOW set, an update is held for that many seconds;
+updates to the same document arriving meanwhile are merged into it, and
+only the merged payload is parsed and written when the window closes.
+
+Pending updates of the documents a GET reads are flushed before it, so
+the read sees them. They are held in this process, so that only holds for
+reads served by the process that took the update.
+"""
+from typing import Any, Callable, Dict, Hashable, Optional
+import atexit
+import logging
+import threading
+from flask import current_app
+
+
+class WriteCoalescer:
+
+    """ Merges the updates to each key that arrive within a window.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        # Key -> (apply, merged payload)
+        self._pending: Dict[Hashable, Any] = {}
+        # Held while a key's update is written, so updates to a key are written in order
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, apply: Callable[[Dict[str, Any]], Any], payload: Dict[str, Any]) -> None:
+        """ Hold an update, merging it into the one pending for key.
+
+        :param key: Identifies the document, e.g. ("Article", title).
+        :param apply: Writes the merged payload.
+        :param payload: Fields to update; later values win.
+        """
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                self._pending[key] = (apply, {**pending[1], **payload})
+                return
+            self._pending[key] = (apply, dict(payload))
+            self._key_locks.setdefault(key, threading.Lock())
+
+        timer = threading.Timer(self.window, self.flush, args=(key,))
+        timer.daemon = True
+        timer.start()
+
+    def flush(self, key: Hashable) -> None:
+        """ Write the update pending for key, if any, and wait for one being written.
+        """
+        with self._lock:
+            key_lock = self._key_locks.get(key)
+        if key_lock is None:
+            return
+        with key_lock:
+            with self._lock:
+                pending = self._pending.pop(key, None)
+            if pending is not None:
+                apply, payload = pending
+                try:
+                    apply(payload)
+                except Exception as e:
+                    logging.error(f"Failed to write coalesced update of {key} with exception {e}")
+            with self._lock:
+                # Unless another update arrived meanwhile, the key is done with
+                if key not in self._pending and self._key_locks.get(key) is key_lock:
+                    del self._key_locks[key]
+
+    def flush_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """ Write the pending updates whose keys predicate accepts.
+        """
+        with self._lock:
+            keys = [key for key in self._key_locks if predicate(key)]
+        for key in keys:
+            self.flush(key)
+
+    def flush_all(self) -> None:
+        """ Write every pending update.
+        """
+        self.flush_where(lambda key: True)
+
+    def __len__(self):
+        return len(self._pending)
+
+
+_coalescer: Optional[WriteCoalescer] = None
+_coalescer_lock = threading.Lock()
+
+
+def write_coalescer() -> Optional[WriteCoalescer]:
+
+    """ The application's write coalescer, created on first use.
+
+    :return: WriteCoalescer, or None when COALESCE_WINDOW is 0.
+    """
+
+    global _coalescer
+    window = current_app.config["COALESCE_WINDOW"]
+    if not window:
+        return None
+    if _coalescer is None:
+        with _coalescer_lock:
+            if _coalescer is None:
+                _coalescer = WriteCoalescer(window)
+                atexit.register(_coalescer.flush_all)
+    return _coalescer
+
+
+def coalesce(label: str, key: str, apply: Callable[[Dict[str, Any]], Any], payload: Dict[str, Any]) -> bool:
+
+    """ Hold an update to an existing document when coalescing is on.
+
+    :param label: Label of the document.
+    :param key: Title or name of the document.
+    :param apply: Writes the merged payload.
+    :param payload: Fields to update.
+    :return: True if the update is held, False if the caller should write it now.
+    """
+
+    coalescer = write_coalescer()
+    if coalescer is None:
+        return False
+    coalescer.submit((label, key), apply, payload)
+    return True
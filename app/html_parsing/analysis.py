@@ -0,0 +1,409 @@
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from bs4 import BeautifulSoup, Tag
+import json
+import math
+import re
+from .blocks import split_blocks
+from .cache import ParseCache, content_hash
+from .concept_matcher import ConceptMatcher
+from .concept_parser import ConceptMention, build_concept_mentions, concept_offsets, merge_concept_mentions
+from .stream_parser import extract
+
+
+# Bump when the analysis changes so stored results are recomputed
+ANALYSIS_VERSION = 4
+
+# Blocks of recently analysed documents kept for incremental re-analysis
+BLOCK_CACHE_SIZE = 8192
+
+# Blocks longer than this many characters are analysed by the streaming
+# parser rather than parsed into a tree, e.g. a document wrapped in one <div>
+STREAM_PARSE_THRESHOLD = 256 * 1024
+
+SITE_URL = "https://experimental-learning.com"
+
+SITE_HOSTS = {"experimental-learning.com", "www.experimental-learning.com"}
+
+# Pages that list nodes, each anchored by its slug
+ANCHORED_PAGES = {"/notes": "Note", "/concepts": "Concept", "/links": "Link"}
+
+WORDS_PER_MINUTE = 200
+
+HEADINGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+
+# Every tag the analysis reads, so the tree is searched once
+_ANALYSED_TAGS = HEADINGS + ["summary", "a", "img"]
+
+# Node properties computed from content; never set directly
+DERIVED_FIELDS = ("summary", "text", "absolute_content", "word_count", "reading_time",
+                  "toc", "links_to", "rendered_content", "content_hash", "analysis_version")
+
+_WORDS = re.compile(r"\w+")
+
+# <a> and <img> tags; quoted attribute values may contain ">"
+_URL_TAGS = re.compile(r"""<(a|img)\b(?:[^>"']|"[^"]*"|'[^']*')*>""", re.I)
+
+_URL_ATTRIBUTES = {"a": "href", "img": "src"}
+
+
+class InternalLink(NamedTuple):
+
+    """ A link to another page of the site: the label and slug of the linked node.
+    """
+
+    label: str
+    slug: str
+
+    @property
+    def ref(self) -> str:
+        """ The link as stored in a node's links_to property.
+        """
+        return f"{self.label}/{self.slug}"
+
+
+class DocumentAnalysis:
+
+    """ Everything derived from a document's html, computed in one parse.
+    """
+
+    content_hash: str
+    summary: Optional[str]
+    concepts: List[ConceptMention]
+    text: str
+    absolute_content: str
+    word_count: int
+    reading_time: int
+    toc: List[Dict[str, Any]]
+    links: List[InternalLink]
+    # src of every image, before urls are made absolute
+    images: List[str]
+
+    def __init__(self,
+                 content_hash: str,
+                 summary: Optional[str],
+                 concepts: List[ConceptMention],
+                 text: str,
+                 absolute_content: str,
+                 word_count: int,
+                 reading_time: int,
+                 toc: List[Dict[str, Any]],
+                 links: List[InternalLink],
+                 images: List[str]):
+        self.content_hash = content_hash
+        self.summary = summary
+        self.concepts = concepts
+        self.text = text
+        self.absolute_content = absolute_content
+        self.word_count = word_count
+        self.reading_time = reading_time
+        self.toc = toc
+        self.links = links
+        self.images = images
+
+    def properties(self) -> Dict[str, Any]:
+        """ The fields persisted on the analysed node.
+
+        The table of contents is stored as a JSON string because node
+        properties can't hold maps.
+        """
+        return {
+            "content_hash": self.content_hash,
+            "analysis_version": ANALYSIS_VERSION,
+            "summary": self.summary,
+            "text": self.text,
+            "absolute_content": self.absolute_content,
+            "word_count": self.word_count,
+            "reading_time": self.reading_time,
+            "toc": json.dumps(self.toc),
+            "links_to": [link.ref for link in self.links]
+        }
+
+    def __repr__(self):
+        return f"<DocumentAnalysis words={self.word_count} concepts={len(self.concepts)}>"
+
+
+def is_relative(href: str) -> bool:
+    return not bool(urlparse(href).netloc)
+
+
+def rel_to_abs(rel_url: str) -> str:
+    return urljoin(SITE_URL, rel_url)
+
+
+def _absolutize_urls(tags: List[Tag]) -> None:
+    for tag in tags:
+        attribute = {"a": "href", "img": "src"}.get(tag.name)
+        href = tag.get(attribute) if attribute else None
+        if href and is_relative(href):
+            tag[attribute] = rel_to_abs(href)
+
+
+def _absolutize_url_attributes(html: str) -> str:
+
+    """ Make the relative urls of links and images absolute, without parsing the html.
+    """
+
+    def absolutize(tag: re.Match) -> str:
+        attribute = _URL_ATTRIBUTES[tag.group(1).lower()]
+        value = re.compile(rf"""(\s{attribute}\s*=\s*)(["'])(.*?)\2""", re.I)
+
+        def replace(match: re.Match) -> str:
+            href = match.group(3)
+            if not href or not is_relative(href):
+                return match.group(0)
+            return f"{match.group(1)}{match.group(2)}{rel_to_abs(href)}{match.group(2)}"
+
+        return value.sub(replace, tag.group(0), count=1)
+
+    return _URL_TAGS.sub(absolutize, html)
+
+
+def _internal_link(tag: Tag) -> Optional[InternalLink]:
+    # Popover links name the article directly
+    if "article" in tag.get("class", []) and tag.get("slug"):
+        return InternalLink("Article", tag["slug"])
+
+    href = tag.get("href")
+    if not href:
+        return None
+    url = urlparse(href)
+    if url.netloc and url.netloc not in SITE_HOSTS:
+        return None
+
+    path = url.path.rstrip("/")
+    if path.startswith("/articles/") and "/" not in path[len("/articles/"):]:
+        return InternalLink("Article", path[len("/articles/"):])
+    if path in ANCHORED_PAGES and url.fragment:
+        return InternalLink(ANCHORED_PAGES[path], url.fragment)
+    return None
+
+
+def _internal_links(tags: List[Tag]) -> List[InternalLink]:
+    links = (_internal_link(tag) for tag in tags if tag.name == "a")
+    return list(dict.fromkeys(link for link in links if link))
+
+
+def _streamed_links(anchors: List[Dict[str, Any]]) -> List[InternalLink]:
+    # Attribute dicts read like tags
+    links = (_internal_link(anchor) for anchor in anchors)
+    return list(dict.fromkeys(link for link in links if link))
+
+
+def _table_of_contents(tags: List[Tag]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "level": int(heading.name[1]),
+            "title": heading.get_text().strip(),
+            "anchor": heading.get("id")
+        }
+        for heading in tags
+        if heading.name in HEADINGS
+    ]
+
+
+class BlockAnalysis(NamedTuple):
+
+    """ The analysis of one top-level block of a document.
+    """
+
+    text: str
+    has_summary: bool
+    summary: Optional[str]
+    # Marked up concept spans: (offset within text, concept name, span text)
+    spans: List[Tuple[int, Optional[str], str]]
+    concepts: List[ConceptMention]
+    absolute_content: str
+    word_count: int
+    toc: List[Dict[str, Any]]
+    links: List[InternalLink]
+    images: List[str]
+
+
+def _analyse_block_streaming(block: str) -> BlockAnalysis:
+    document = extract(block)
+    # The streamed summary is "" when there's no <summary>
+    has_summary = document.summary != ""
+    return BlockAnalysis(text=document.text,
+                         has_summary=has_summary,
+                         summary=document.summary if has_summary else None,
+                         spans=document.concepts,
+                         concepts=build_concept_mentions(document.text, document.concepts, include_trailing=True)
+                         if document.concepts else [],
+                         absolute_content=_absolutize_url_attributes(block),
+                         word_count=len(_WORDS.findall(document.text)),
+                         toc=[
+                             {"level": level, "title": title, "anchor": anchor}
+                             for level, title, anchor in document.headings
+                         ],
+                         links=_streamed_links(document.anchors),
+                         images=document.images)
+
+
+def _analyse_block(block: str) -> BlockAnalysis:
+    if len(block) > STREAM_PARSE_THRESHOLD:
+        return _analyse_block_streaming(block)
+
+    soup = BeautifulSoup(block, 'html.parser')
+
+    text, spans = concept_offsets(soup)
+    tags = soup.find_all(_ANALYSED_TAGS)
+    summary = next((tag for tag in tags if tag.name == "summary"), None)
+    toc = _table_of_contents(tags)
+    links = _internal_links(tags)
+    images = [tag["src"] for tag in tags if tag.name == "img" and tag.get("src")]
+
+    # Rewrites the tree, so runs after everything that reads it
+    _absolutize_urls(tags)
+
+    # Sentences end with their block, so mentions don't run into the next heading or paragraph
+    return BlockAnalysis(text=text,
+                         has_summary=summary is not None,
+                         summary=summary.string if summary else None,
+                         spans=spans,
+                         concepts=build_concept_mentions(text, spans, include_trailing=True) if spans else [],
+                         absolute_content=str(soup),
+                         word_count=len(_WORDS.findall(text)),
+                         toc=toc,
+                         links=links,
+                         images=images)
+
+
+def _linked_concepts(block: BlockAnalysis, matcher: ConceptMatcher) -> List[ConceptMention]:
+    spans = matcher.link(block.text, block.spans)
+    return build_concept_mentions(block.text, spans, include_trailing=True) if spans else []
+
+
+def _cached(cache: ParseCache, key: str, compute: Callable[..., Any], *args: Any) -> Any:
+    value = cache.get(key)
+    if value is None:
+        value = compute(*args)
+        cache.put(key, value)
+    return value
+
+
+class ParseCaches(NamedTuple):
+
+    """ The caches an analysis reads and fills.
+    """
+
+    blocks: ParseCache
+    # Concepts of each block found by a matcher, keyed by block and matcher version
+    linked: ParseCache
+    analyses: ParseCache
+
+
+block_cache = ParseCache(maxsize=BLOCK_CACHE_SIZE)
+
+linked_cache = ParseCache(maxsize=BLOCK_CACHE_SIZE)
+
+analysis_cache = ParseCache()
+
+_caches: ContextVar[ParseCaches] = ContextVar("caches",
+                                              default=ParseCaches(block_cache, linked_cache, analysis_cache))
+
+
+@contextmanager
+def private_caches() -> Iterator[ParseCaches]:
+
+    """ Analyse with caches of their own inside the block, rather than the shared ones.
+
+    For one-off work over many documents, such as an import, that would
+    otherwise evict the blocks of the documents being served and edited.
+    """
+
+    caches = ParseCaches(ParseCache(maxsize=BLOCK_CACHE_SIZE), ParseCache(maxsize=BLOCK_CACHE_SIZE), ParseCache())
+    token = _caches.set(caches)
+    try:
+        yield caches
+    finally:
+        _caches.reset(token)
+
+
+def _analyse(content: str, matcher: Optional[ConceptMatcher]) -> DocumentAnalysis:
+    caches = _caches.get()
+    blocks = []
+    concepts = []
+    for block in split_blocks(content):
+        # Only blocks that changed since the document was last analysed are parsed
+        key = content_hash(block)
+        analysis = _cached(caches.blocks, key, _analyse_block, block)
+        blocks.append(analysis)
+        if matcher is None:
+            concepts.append(analysis.concepts)
+        else:
+            concepts.append(_cached(caches.linked, f"{key}:{matcher.cache_key}", _linked_concepts, analysis, matcher))
+
+    summary = next((block.summary for block in blocks if block.has_summary), "")
+    word_count = sum(block.word_count for block in blocks)
+
+    return DocumentAnalysis(content_hash=content_hash(content),
+                            summary=summary,
+                            concepts=merge_concept_mentions(concepts),
+                            text="".join(block.text for block in blocks),
+                            absolute_content="".join(block.absolute_content for block in blocks),
+                            word_count=word_count,
+                            reading_time=math.ceil(word_count / WORDS_PER_MINUTE),
+                            toc=[entry for block in blocks for entry in block.toc],
+                            links=list(dict.fromkeys(link for block in blocks for link in block.links)),
+                            images=list(dict.fromkeys(src for block in blocks for src in block.images)))
+
+
+def parse_blocks(contents: Iterable[str], executor: Executor) -> int:
+
+    """ Parse the blocks of many documents in parallel, ahead of analysing them.
+
+    Blocks that aren't cached yet are parsed on the executor and cached, so
+    analysing the documents afterwards only puts their blocks together.
+
+    :param contents: HTML strings.
+    :param executor: Executor to parse on; a process pool parses on every core.
+    :return: Number of blocks parsed.
+    """
+
+    cache = _caches.get().blocks
+    blocks: Dict[str, str] = {}
+    for content in contents:
+        for block in split_blocks(content or ""):
+            key = content_hash(block)
+            if key not in blocks and key not in cache:
+                blocks[key] = block
+
+    for key, analysis in zip(blocks, executor.map(_analyse_block, blocks.values())):
+        cache.put(key, analysis)
+    return len(blocks)
+
+
+def analyse(content: str, matcher: Optional[ConceptMatcher] = None) -> DocumentAnalysis:
+
+    """ Analyse a document, memoized by content hash.
+
+    Concepts are the ones marked up in the content, plus, when a matcher is
+    given, every mention of a concept name it knows.
+
+    :param content: HTML string.
+    :param matcher: Optional ConceptMatcher used to link concepts automatically.
+    :return: DocumentAnalysis.
+    """
+
+    content = content or ""
+    key = content_hash(content)
+    if matcher is not None:
+        key = f"{key}:{matcher.cache_key}"
+    return _cached(_caches.get().analyses, key, _analyse, content, matcher)
+
+
+def is_current(properties: Dict[str, Any], content: str) -> bool:
+
+    """ Check whether a stored node already holds the analysis of content.
+
+    :param properties: The node's stored properties.
+    :param content: New content.
+    :return: True if content is unchanged and was analysed by this version.
+    """
+
+    return properties.get("content_hash") == content_hash(content) \
+        and properties.get("analysis_version") == ANALYSIS_VERSION
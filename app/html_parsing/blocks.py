@@ -0,0 +1,95 @@
+from typing import List
+import re
+from .stream_parser import VOID_ELEMENTS
+
+
+# Elements that start a block of their own at the top level of a document
+BLOCK_ELEMENTS = {
+    "address", "article", "aside", "blockquote", "details", "dialog", "dd", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "hgroup", "hr", "iframe", "li", "main", "nav", "ol", "p", "pre", "section",
+    "summary", "table", "ul"
+}
+
+# Elements whose content is never parsed as markup
+RAW_TEXT_ELEMENTS = {"script", "style"}
+
+# Comments and tags; quoted attribute values may contain ">"
+_TOKENS = re.compile(r"""<!--.*?-->|<(/?)([A-Za-z][^\s/>]*)(?:[^>"']|"[^"]*"|'[^']*')*>""", re.S)
+
+_RAW_TEXT_ENDS = {name: re.compile(f"</{name}", re.I) for name in RAW_TEXT_ELEMENTS}
+
+
+def split_blocks(content: str) -> List[str]:
+
+    """ Split html into its top-level blocks.
+
+    Each top-level block element is a block of its own; runs of top-level
+    text and inline elements are grouped into one block so sentences within
+    them stay together. Whitespace is kept with the text it would be merged
+    into by the parser, so each block parses as it would within the document,
+    and joining the blocks gives back the content.
+
+    Only tags are tokenized, which is much cheaper than parsing the document,
+    so unchanged blocks can be found without re-parsing them. Unclosed
+    elements extend to the end of the document.
+
+    :param content: HTML string.
+    :return: List of html strings.
+    """
+
+    boundaries = [0]
+    open_tags: List[str] = []
+    inline_run = False
+    position = 0
+    # Where the current run of text began; stray end tags don't end text
+    text_start = 0
+
+    def start_block(start: int) -> None:
+        # Leading whitespace stays with the first block
+        if start > boundaries[-1] and (len(boundaries) > 1 or not content[:start].isspace()):
+            boundaries.append(start)
+
+    while True:
+        match = _TOKENS.search(content, position)
+        text_end = match.start() if match else len(content)
+
+        # Top-level text starts an inline run unless one is already open
+        if not open_tags and not inline_run and content[position:text_end].strip():
+            start_block(text_start)
+            inline_run = True
+
+        if match is None:
+            break
+        position = match.end()
+
+        closing, name = match.group(1), match.group(2)
+        if name is None:
+            text_start = position
+            continue
+        name = name.lower()
+
+        if closing:
+            # Like the tree builder, close up to the most recent matching element
+            if name in open_tags:
+                del open_tags[len(open_tags) - 1 - open_tags[::-1].index(name):]
+                text_start = position
+            continue
+
+        if not open_tags:
+            block = name in BLOCK_ELEMENTS
+            if block or not inline_run:
+                start_block(match.start())
+            inline_run = not block
+
+        text_start = position
+        if name in VOID_ELEMENTS or match.group(0).endswith("/>"):
+            continue
+        open_tags.append(name)
+
+        if name in RAW_TEXT_ELEMENTS:
+            end = _RAW_TEXT_ENDS[name].search(content, position)
+            position = end.start() if end else len(content)
+
+    boundaries.append(len(content))
+    return [content[start:end] for start, end in zip(boundaries, boundaries[1:])]
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from typing import Any, Optional
+import hashlib
+import threading
+
+
+def content_hash(content: str) -> str:
+
+    """ Fingerprint content so unchanged re-posts can be detected.
+
+    :param content: HTML string.
+    :return: Hex digest.
+    """
+
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+
+class ParseCache:
+
+    """ Bounded LRU of parse results keyed by content hash.
+    """
+
+    maxsize: int
+    hits: int
+    misses: int
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        :return: Cached value or None.
+        """
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __contains__(self, key: str) -> bool:
+        # Unlike get, doesn't count as a hit or refresh the entry
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return f"<ParseCache size={len(self)} maxsize={self.maxsize} hits={self.hits} misses={self.misses}>"
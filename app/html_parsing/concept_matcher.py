@@ -0,0 +1,256 @@
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import itertools
+import threading
+
+
+# Names added since the last full build are matched by a second, small
+# automaton; it's folded into the main one once it grows past this share
+PENDING_RATIO = 8
+MIN_PENDING = 1024
+
+_SPACES = str.maketrans("\n\t\r\x0c\xa0", "     ")
+
+_matcher_ids = itertools.count()
+
+
+def fold(text: str) -> str:
+
+    """ Case fold text without changing its length.
+
+    Offsets into the folded text are offsets into the original text, so
+    matches can be mapped straight back. All whitespace folds to a space.
+
+    :param text: Text.
+    :return: Folded text.
+    """
+
+    folded = text.lower()
+    if len(folded) != len(text):
+        # A few characters (e.g. "İ") lower to more than one character
+        folded = "".join(char.lower() if len(char.lower()) == 1 else char for char in text)
+    return folded.translate(_SPACES)
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class _Automaton:
+
+    """ Aho-Corasick automaton over a fixed set of folded keys.
+    """
+
+    def __init__(self, keys: Iterable[str]):
+        self.keys: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Index into keys of the key ending at each state, or -1
+        self._key: List[int] = [-1]
+        # Nearest state on the fail chain at which a key ends
+        self._output_link: List[int] = [0]
+
+        for key in keys:
+            self._insert(key)
+        self._link()
+
+    def _insert(self, key: str) -> None:
+        state = 0
+        for char in key:
+            child = self._goto[state].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._key.append(-1)
+                self._output_link.append(0)
+                self._goto[state][char] = child
+            state = child
+        if self._key[state] < 0:
+            self._key[state] = len(self.keys)
+            self.keys.append(key)
+
+    def _link(self) -> None:
+        goto, fail, key, output_link = self._goto, self._fail, self._key, self._output_link
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in goto[state].items():
+                queue.append(child)
+                suffix = fail[state]
+                while suffix and char not in goto[suffix]:
+                    suffix = fail[suffix]
+                target = goto[suffix].get(char, 0) if state else 0
+                fail[child] = target
+                output_link[child] = target if key[target] >= 0 else output_link[target]
+
+    def find(self, folded: str) -> Iterator[Tuple[int, int, str]]:
+        """
+        :param folded: Folded text.
+        :return: Iterator of (start, end, key) for every occurrence of every key.
+        """
+        if not self.keys:
+            return
+        goto, fail, keys, key, output_link = self._goto, self._fail, self.keys, self._key, self._output_link
+        state = 0
+        for end, char in enumerate(folded, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            match = state if key[state] >= 0 else output_link[state]
+            while match:
+                found = keys[key[match]]
+                yield end - len(found), end, found
+                match = output_link[match]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class ConceptMatcher:
+
+    """ Finds mentions of known concept names in plain text.
+
+    Names are matched case-insensitively, in one pass over the text, and only
+    on word boundaries. Overlapping mentions resolve to the leftmost, then
+    longest, name.
+
+    Adding names only rebuilds a small automaton of recent additions, so
+    concepts can be added one at a time; version changes whenever the set of
+    names does.
+    """
+
+    version: int
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.version = 0
+        self._id = next(_matcher_ids)
+        # Folded name -> name, first added wins
+        self._names: Dict[str, str] = {}
+        self._main = _Automaton([])
+        self._pending: Optional[_Automaton] = _Automaton([])
+        self._pending_keys: List[str] = []
+        self._lock = threading.Lock()
+        self.add(names)
+
+    @property
+    def cache_key(self) -> str:
+        """ Identifies this matcher's current set of names.
+        """
+        return f"{self._id}.{self.version}"
+
+    def add(self, names: Iterable[str]) -> None:
+        """ Add concept names.
+
+        :param names: Concept names.
+        """
+        with self._lock:
+            added = False
+            for name in names:
+                key = fold(name.strip()) if name else ""
+                if not key or key in self._names:
+                    continue
+                self._names[key] = name
+                self._pending_keys.append(key)
+                added = True
+
+            if not added:
+                return
+            if len(self._pending_keys) > max(MIN_PENDING, len(self._main) // PENDING_RATIO):
+                keys = itertools.chain(self._main.keys, self._pending_keys)
+                self._main = _Automaton(key for key in keys if key in self._names)
+                self._pending_keys = []
+                self._pending = _Automaton([])
+            else:
+                # Built on the next match, so bulk adds only build once
+                self._pending = None
+            self.version += 1
+
+    def extended(self, names: Iterable[str]) -> "ConceptMatcher":
+        """ A matcher of this matcher's names plus more, leaving this one unchanged.
+
+        The copy shares the main automaton, so only the pending names are built again.
+
+        :param names: Concept names to add to the copy.
+        """
+        copy = ConceptMatcher()
+        with self._lock:
+            copy._names = dict(self._names)
+            copy._main = self._main
+            copy._pending_keys = list(self._pending_keys)
+        copy._pending = None
+        copy.add(names)
+        return copy
+
+    def discard(self, name: str) -> None:
+        """ Stop matching a concept name.
+
+        The automata still hold the name until they are next rebuilt; its
+        matches are dropped in the meantime.
+
+        :param name: Concept name.
+        """
+        with self._lock:
+            if self._names.pop(fold(name.strip()), None) is not None:
+                self.version += 1
+
+    def _automata(self) -> Tuple[_Automaton, _Automaton]:
+        with self._lock:
+            if self._pending is None:
+                self._pending = _Automaton(self._pending_keys)
+            return self._main, self._pending
+
+    def find(self, text: str) -> List[Tuple[int, str, str]]:
+        """ Find the concept mentions in text.
+
+        :param text: Plain text.
+        :return: [(offset, concept name, mention text)] in document order, not overlapping.
+        """
+        folded = fold(text)
+        main, pending = self._automata()
+        names = self._names
+
+        candidates = []
+        for start, end, key in itertools.chain(main.find(folded), pending.find(folded)):
+            if key not in names:
+                continue
+            if _is_word_char(key[0]) and start > 0 and _is_word_char(folded[start - 1]):
+                continue
+            if _is_word_char(key[-1]) and end < len(folded) and _is_word_char(folded[end]):
+                continue
+            candidates.append((start, start - end, end, key))
+        # Leftmost first, then longest first
+        candidates.sort()
+
+        mentions = []
+        last_end = 0
+        for start, _, end, key in candidates:
+            if start >= last_end:
+                mentions.append((start, names[key], text[start:end]))
+                last_end = end
+        return mentions
+
+    def link(self, text: str, spans: List[Tuple[int, Optional[str], str]]) -> List[Tuple[int, Optional[str], str]]:
+        """ Add the mentions found in text to the concept spans already marked up in it.
+
+        Mentions overlapping a marked up span are dropped.
+
+        :param text: Plain text.
+        :param spans: (offset, concept name, span text) of marked up concepts, in document order.
+        :return: (offset, concept name, span text) in document order.
+        """
+        marked = [(offset, offset + len(span_text)) for offset, _, span_text in spans]
+        found = [
+            mention for mention in self.find(text)
+            if not any(start < mention[0] + len(mention[2]) and mention[0] < end for start, end in marked)
+        ]
+        return sorted(spans + found, key=lambda span: span[0])
+
+    def __contains__(self, name: str) -> bool:
+        return fold(name.strip()) in self._names
+
+    def __len__(self):
+        return len(self._names)
+
+    def __repr__(self):
+        return f"<ConceptMatcher names={len(self)} version={self.version}>"
@@ -1,44 +1,8 @@
-from typing import Dict, Any, Tuple
-from bs4 import BeautifulSoup
+from typing import Dict, Any, Iterable, Optional, Tuple
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
 import requests
 from typing import NamedTuple, List
-import re
-
-
-# From: https://stackoverflow.com/questions/4576077/how-can-i-split-a-text-into-sentences
-alphabets= "([A-Za-z])"
-prefixes = "(Mr|St|Mrs|Ms|Dr)[.]"
-suffixes = "(Inc|Ltd|Jr|Sr|Co)"
-starters = "(Mr|Mrs|Ms|Dr|He\s|She\s|It\s|They\s|Their\s|Our\s|We\s|But\s|However\s|That\s|This\s|Wherever)"
-acronyms = "([A-Z][.][A-Z][.](?:[A-Z][.])?)"
-websites = "[.](com|net|org|io|gov)"
-
-
-def split_into_sentences(text):
-    text = " " + text + "  "
-    text = text.replace("\n"," ")
-    text = re.sub(prefixes,"\\1<prd>",text)
-    text = re.sub(websites,"<prd>\\1",text)
-    if "Ph.D" in text: text = text.replace("Ph.D.","Ph<prd>D<prd>")
-    text = re.sub("\s" + alphabets + "[.] "," \\1<prd> ",text)
-    text = re.sub(acronyms+" "+starters,"\\1<stop> \\2",text)
-    text = re.sub(alphabets + "[.]" + alphabets + "[.]" + alphabets + "[.]","\\1<prd>\\2<prd>\\3<prd>",text)
-    text = re.sub(alphabets + "[.]" + alphabets + "[.]","\\1<prd>\\2<prd>",text)
-    text = re.sub(" "+suffixes+"[.] "+starters," \\1<stop> \\2",text)
-    text = re.sub(" "+suffixes+"[.]"," \\1<prd>",text)
-    text = re.sub(" " + alphabets + "[.]"," \\1<prd>",text)
-    if "”" in text: text = text.replace(".”","”.")
-    if "\"" in text: text = text.replace(".\"","\".")
-    if "!" in text: text = text.replace("!\"","\"!")
-    if "?" in text: text = text.replace("?\"","\"?")
-    text = text.replace(".",".<stop>")
-    text = text.replace("?","?<stop>")
-    text = text.replace("!","!<stop>")
-    text = text.replace("<prd>",".")
-    sentences = text.split("<stop>")
-    sentences = sentences[:-1]
-    sentences = [s.strip() for s in sentences]
-    return sentences
+from .sentence_segmenter import SentenceIndex
 
 
 class ConceptMention:
@@ -75,56 +39,106 @@ def html_to_text(content: str) -> str:
     return soup.get_text()
 
 
-def parse_concepts(content: str) -> List[ConceptMention]:
+def concept_offsets(soup: BeautifulSoup) -> Tuple[str, List[Tuple[int, Optional[str], str]]]:
 
-    """ Parse concepts from an html string.
+    """ Walk the document once, collecting its text and the concept spans.
 
-    :param content: Article content
-    :return: List of ConceptMentions or None
+    The text is identical to ``soup.get_text()``; each concept span is paired
+    with the offset of its first character within that text.
+
+    :param soup: Parsed document.
+    :return: (text, [(offset, concept name, span text)]).
     """
 
-    # Parse html
-    soup = BeautifulSoup(content, 'html.parser')
-    concepts = soup.find_all("span", class_="concept")
+    pieces: List[str] = []
+    spans: List[Tuple[int, Optional[str], str]] = []
+    offset = 0
+    for node in soup.descendants:
+        if isinstance(node, Tag):
+            if node.name == "span" and "concept" in node.get("class", []):
+                spans.append((offset, node.get("name"), node.get_text()))
+        elif type(node) in (NavigableString, CData):
+            pieces.append(node)
+            offset += len(node)
+    return "".join(pieces), spans
+
+
+def build_concept_mentions(text: str,
+                           spans: Iterable[Tuple[int, Optional[str], str]],
+                           include_trailing: bool = False) -> List[ConceptMention]:
+
+    """ Build ConceptMentions from the concept spans found in a document.
+
+    The sentence table is built once; every concept is then mapped to its
+    sentence by binary search.
+
+    :param text: Document text.
+    :param spans: (offset within text, concept name, span text) in document order.
+    :param include_trailing: Treat unterminated text at the end as a sentence.
+    :return: List of ConceptMentions.
+    """
+
+    sentences = SentenceIndex(text, include_trailing)
 
-    sentinel = "☀"
     data: Dict[str, Dict[str, Any]] = {}
 
     # Get concepts
-    for concept in concepts:
-        # HTML Element info
-
-        # The string wrapped in the span tag
-        concept_text = concept.string
+    for idx, concept_name, concept_text in spans:
 
         # The "official" name of the concept is in the name attribute
-        concept_name = concept.get("name")
         if not concept_name:
             continue
 
-        # Find index within string
-        concept.string = sentinel
-        idx = soup.get_text().index(sentinel)
-        concept.string = concept_text
-
         # Add Concept info
-        if not data.get(concept_text):
+        if concept_name not in data:
             data[concept_name] = {"mentions": []}
 
         # Find the sentence context of the concept
-        sentences = split_into_sentences(soup.get_text())
-        start_char = 0
-        end_char = 0
-        for sentence in sentences:
-            end_char += len(sentence)
-            if concept_text in sentence:
-                if start_char <= idx <= end_char:
-                    mention_sentence = sentence.replace(concept_text, f"<span class='concept' name='{concept_name}'>{concept_text}</span>")
-                    data[concept_name]["mentions"].append(mention_sentence)
-                    continue
-            start_char = end_char + 1
+        sentence = sentences.find(idx)
+        if sentence is None:
+            continue
+        sentence = sentence.text
+        if concept_text in sentence:
+            mention_sentence = sentence.replace(concept_text, f"<span class='concept' name='{concept_name}'>{concept_text}</span>")
+            data[concept_name]["mentions"].append(mention_sentence)
 
     return [
         ConceptMention(name=key, mentions=value["mentions"])
         for key, value in data.items()
     ]
+
+
+def merge_concept_mentions(groups: Iterable[List[ConceptMention]]) -> List[ConceptMention]:
+
+    """ Merge the ConceptMentions of consecutive parts of a document.
+
+    :param groups: ConceptMentions of each part, in document order.
+    :return: List of ConceptMentions, one per concept name.
+    """
+
+    data: Dict[str, List[str]] = {}
+    for concepts in groups:
+        for concept in concepts:
+            data.setdefault(concept.name, []).extend(concept.mentions)
+
+    return [
+        ConceptMention(name=name, mentions=mentions)
+        for name, mentions in data.items()
+    ]
+
+
+def parse_concepts(content: str) -> List[ConceptMention]:
+
+    """ Parse concepts from an html string.
+
+    :param content: Article content
+    :return: List of ConceptMentions or None
+    """
+
+    # Parse html
+    soup = BeautifulSoup(content, 'html.parser')
+    text, concepts = concept_offsets(soup)
+    if not concepts:
+        return []
+
+    return build_concept_mentions(text, concepts)
@@ -0,0 +1,270 @@
+from PIL import Image
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import threading
+from .analysis import SITE_HOSTS, DocumentAnalysis
+
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+STATIC_URL = "/static/"
+
+# Variants are named after the hash of the source image, so each image is
+# only resized once however many documents embed it
+VARIANTS_DIR = os.path.join(STATIC_DIR, "images", "variants")
+VARIANTS_URL = STATIC_URL + "images/variants/"
+
+VARIANT_WIDTHS = (480, 960, 1440)
+SIZES = "(max-width: 960px) 100vw, 960px"
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+# Formats that are resized; others (e.g. animated GIFs) are left alone
+RESIZED_FORMATS = {"PNG": ".png", "JPEG": ".jpg"}
+
+
+class ImageVariants(NamedTuple):
+
+    """ The resized copies of one source image.
+    """
+
+    width: int
+    height: int
+    # (url, width) of each copy, narrowest first
+    webp: List[Tuple[str, int]]
+    fallback: List[Tuple[str, int]]
+
+
+def srcset(variants: List[Tuple[str, int]]) -> str:
+    return ", ".join(f"{url} {width}w" for url, width in variants)
+
+
+def local_path(src: str) -> Optional[str]:
+
+    """ Map an image url to a file in the static directory.
+
+    :param src: Image url.
+    :return: File path, or None if the image isn't a local static file.
+    """
+
+    url = urlparse(src)
+    if url.netloc and url.netloc not in SITE_HOSTS:
+        return None
+    if not url.path.startswith(STATIC_URL) or url.path.startswith(VARIANTS_URL):
+        return None
+
+    path = os.path.normpath(os.path.join(STATIC_DIR, url.path[len(STATIC_URL):]))
+    if not path.startswith(STATIC_DIR + os.sep) or not os.path.isfile(path):
+        return None
+    return path
+
+
+# (path, mtime, size) -> sha256 of the file
+_digests: Dict[Tuple[str, int, int], str] = {}
+
+# Digest -> lock held while that image is resized, so images are resized in
+# parallel but each only once; dropped once its variants are written
+_generating: Dict[str, threading.Lock] = {}
+_lock = threading.Lock()
+
+# What Pillow raises for images it can't read: truncated or corrupt files,
+# unknown formats, and images big enough to be decompression bombs
+IMAGE_ERRORS = (OSError, ValueError, SyntaxError, Image.DecompressionBombError)
+
+
+def _file_hash(path: str) -> str:
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _digests.get(key)
+    if digest is None:
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        _digests[key] = digest
+    return digest
+
+
+def _save(image: Image.Image, path: str, **options) -> None:
+    # Written under a temporary name so a half-written file is never served
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    image.save(temporary, **options)
+    os.replace(temporary, path)
+
+
+def _generate(path: str, digest: str) -> Optional[ImageVariants]:
+    with Image.open(path) as image:
+        extension = RESIZED_FORMATS.get(image.format)
+        if extension is None or getattr(image, "is_animated", False):
+            return None
+
+        width, height = image.size
+        widths = [w for w in VARIANT_WIDTHS if w < width] + [width]
+        # Palette images would otherwise be resized with nearest neighbour
+        source = image.convert("RGBA") if image.mode in ("1", "P") else image
+
+        webp, fallback = [], []
+        for w in widths:
+            resized = image if w == width else source.resize((w, max(1, round(height * w / width))),
+                                                             Image.LANCZOS)
+            name = f"{digest}-{w}"
+
+            _save(resized, os.path.join(VARIANTS_DIR, name + ".webp"), format="WEBP", quality=WEBP_QUALITY)
+            webp.append((VARIANTS_URL + name + ".webp", w))
+
+            if image.format == "JPEG":
+                _save(resized.convert("RGB"), os.path.join(VARIANTS_DIR, name + extension),
+                      format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            else:
+                _save(resized, os.path.join(VARIANTS_DIR, name + extension), format="PNG", optimize=True)
+            fallback.append((VARIANTS_URL + name + extension, w))
+
+    return ImageVariants(width=width, height=height, webp=webp, fallback=fallback)
+
+
+def _generate_variants(src: str, path: str, digest: str, manifest: str) -> Optional[ImageVariants]:
+    try:
+        os.makedirs(VARIANTS_DIR, exist_ok=True)
+        variants = _generate(path, digest)
+    except IMAGE_ERRORS as e:
+        logging.warning(f"Failed to generate variants of image {src}: {e}")
+        return None
+
+    # Written last, so it only exists once every variant does
+    if variants is not None:
+        temporary = f"{manifest}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(variants._asdict(), f)
+        os.replace(temporary, manifest)
+    return variants
+
+
+def _read_manifest(manifest: str) -> Optional[ImageVariants]:
+    try:
+        with open(manifest) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    return ImageVariants(width=data["width"],
+                         height=data["height"],
+                         webp=[tuple(variant) for variant in data["webp"]],
+                         fallback=[tuple(variant) for variant in data["fallback"]])
+
+
+def image_variants(src: str) -> Optional[ImageVariants]:
+
+    """ Get the resized copies of an image, generating them the first time.
+
+    :param src: Image url.
+    :return: ImageVariants, or None if the image isn't a local image that can be resized.
+    """
+
+    path = local_path(src)
+    if path is None:
+        return None
+
+    digest = _file_hash(path)
+    manifest = os.path.join(VARIANTS_DIR, f"{digest}.json")
+    variants = _read_manifest(manifest)
+    if variants is not None:
+        return variants
+
+    with _lock:
+        generating = _generating.setdefault(digest, threading.Lock())
+    try:
+        with generating:
+            # Generated while waiting for the lock
+            variants = _read_manifest(manifest)
+            if variants is None:
+                variants = _generate_variants(src, path, digest, manifest)
+    finally:
+        with _lock:
+            _generating.pop(digest, None)
+    return variants
+
+
+# <picture> tags and <img> tags; quoted attribute values may contain ">"
+_IMAGE_TAGS = re.compile(r"""<(/?)(picture|img)\b((?:[^>"']|"[^"]*"|'[^']*')*)>""", re.I)
+
+_ATTRIBUTE = re.compile(r"""\s([^\s"'>/=]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s"'>]+))?""")
+
+
+def _attributes(tag: str) -> Dict[str, str]:
+    attributes = {}
+    for match in _ATTRIBUTE.finditer(tag):
+        value = match.group(2) or ""
+        if value[:1] in ("'", '"'):
+            value = value[1:-1]
+        # The first of repeated attributes wins, as in browsers
+        attributes.setdefault(match.group(1).lower(), html.unescape(value))
+    return attributes
+
+
+def _tag(name: str, attributes: Dict[str, str]) -> str:
+    return "<" + " ".join([name] + [f'{key}="{html.escape(value)}"' for key, value in attributes.items()]) + ">"
+
+
+def _optimize(attributes: Dict[str, str], variants: ImageVariants, in_picture: bool) -> str:
+    attributes["srcset"] = srcset(variants.fallback)
+    attributes["sizes"] = SIZES
+    if not attributes.get("width") and not attributes.get("height"):
+        attributes["width"] = str(variants.width)
+        attributes["height"] = str(variants.height)
+    attributes["loading"] = attributes.get("loading") or "lazy"
+    attributes["decoding"] = attributes.get("decoding") or "async"
+
+    img = _tag("img", attributes)
+    if in_picture:
+        return img
+    source = _tag("source", {"type": "image/webp", "srcset": srcset(variants.webp), "sizes": SIZES})
+    return f"<picture>{source}{img}</picture>"
+
+
+def optimize_images(content: str) -> Optional[str]:
+
+    """ Point the local images in html at resized copies.
+
+    Each <img> gets a WebP <source> and a srcset of resized copies in its
+    own format, its intrinsic width and height, and is loaded lazily.
+    Only the <img> tags are rewritten, so the rest of the html isn't parsed.
+
+    :param content: HTML string.
+    :return: Rewritten html, or None if it has no local images.
+    """
+
+    pictures = 0
+    optimized = False
+
+    def rewrite(tag: re.Match) -> str:
+        nonlocal pictures, optimized
+        closing, name = tag.group(1), tag.group(2).lower()
+        if name == "picture":
+            pictures = max(0, pictures - 1) if closing else pictures + 1
+            return tag.group(0)
+        if closing:
+            return tag.group(0)
+
+        attributes = _attributes(tag.group(3))
+        variants = image_variants(attributes.get("src") or "")
+        if variants is None:
+            return tag.group(0)
+        optimized = True
+        return _optimize(attributes, variants, pictures > 0)
+
+    rewritten = _IMAGE_TAGS.sub(rewrite, content)
+    return rewritten if optimized else None
+
+
+def render_content(content: str, analysis: DocumentAnalysis) -> Optional[str]:
+
+    """ The html served in place of content, when it differs from content.
+
+    :param content: HTML string.
+    :param analysis: The analysis of content.
+    :return: HTML string or None.
+    """
+
+    return optimize_images(content) if analysis.images else None
@@ -0,0 +1,144 @@
+from bisect import bisect_right
+from heapq import merge
+from typing import Iterator, List, NamedTuple, Optional
+import re
+
+
+# Rules from: https://stackoverflow.com/questions/4576077/how-can-i-split-a-text-into-sentences
+alphabets = "([A-Za-z])"
+suffixes = "(Inc|Ltd|Jr|Sr|Co)"
+starters = r"(Mr|Mrs|Ms|Dr|He\s|She\s|It\s|They\s|Their\s|Our\s|We\s|But\s|However\s|That\s|This\s|Wherever)"
+websites = "[.](com|net|org|io|gov)"
+
+# The rules are applied to a working copy of the text in which every
+# replacement keeps the length unchanged, so positions in the working copy
+# map straight back onto the original text.
+_PRD = "\x00"  # A full stop that doesn't end a sentence
+_CUT = "\x01"  # A full stop replaced by a sentence break
+
+# Each pattern starts at the full stop and checks the text before it with a
+# lookbehind; matching on the literal is much faster than trying the leading
+# character class at every position.
+_PREFIXES = re.compile("[.](?:(?<=Mr[.])|(?<=St[.])|(?<=Mrs[.])|(?<=Ms[.])|(?<=Dr[.]))")
+_WEBSITES = re.compile(websites)
+_INITIALS = re.compile(r"[.] (?<=\s[A-Za-z][.] )")
+_ACRONYM_STARTERS = re.compile("[.](?<=[A-Z][.])[A-Z][.](?:[A-Z][.])?(?= " + starters + ")")
+_THREE_LETTER_ACRONYMS = re.compile("[.](?<=[A-Za-z][.])" + alphabets + "[.]" + alphabets + "[.]")
+_TWO_LETTER_ACRONYMS = re.compile("[.](?<=[A-Za-z][.])" + alphabets + "[.]")
+_SUFFIX_STARTERS = re.compile(" " + suffixes + "[.] " + starters)
+_SUFFIXES = re.compile("[.](?:(?<= Inc[.])|(?<= Ltd[.])|(?<= Jr[.])|(?<= Sr[.])|(?<= Co[.]))")
+_LETTERS = re.compile("[.](?<= [A-Za-z][.])")
+_TERMINATORS = re.compile(f"[.?!{_CUT}]")
+
+
+class SentenceSpan(NamedTuple):
+
+    """ A sentence and its position within the segmented text.
+
+    text is always text[start:end] of the original string.
+    """
+
+    start: int
+    end: int
+    text: str
+
+
+def _breaks(text: str) -> Iterator[int]:
+
+    """ Yield the positions of sentence breaks within the padded text.
+
+    :param text: Text padded with one leading and two trailing spaces.
+    :return: Iterator of break positions, ascending.
+    """
+
+    text = text.replace("\n", " ")
+    text = _PREFIXES.sub(_PRD, text)
+    text = _WEBSITES.sub(_PRD + "\\1", text)
+    if "Ph.D" in text: text = text.replace("Ph.D.", f"Ph{_PRD}D{_PRD}")
+    if "." in text:
+        text = _INITIALS.sub(_PRD + " ", text)
+        acronym_breaks = [match.end() for match in _ACRONYM_STARTERS.finditer(text)]
+        text = _THREE_LETTER_ACRONYMS.sub(f"{_PRD}\\1{_PRD}\\2{_PRD}", text)
+        text = _TWO_LETTER_ACRONYMS.sub(f"{_PRD}\\1{_PRD}", text)
+        text = _SUFFIX_STARTERS.sub(" \\1" + _CUT + " \\2", text)
+        text = _SUFFIXES.sub(_PRD, text)
+        text = _LETTERS.sub(_PRD, text)
+    else:
+        acronym_breaks = []
+    if "”" in text: text = text.replace(".”", "”.")
+    if "\"" in text: text = text.replace(".\"", "\".")
+    if "!" in text: text = text.replace("!\"", "\"!")
+    if "?" in text: text = text.replace("?\"", "\"?")
+
+    terminator_breaks = (match.end() for match in _TERMINATORS.finditer(text))
+    return merge(acronym_breaks, terminator_breaks)
+
+
+def iter_sentence_spans(text: str, include_trailing: bool = False) -> Iterator[SentenceSpan]:
+
+    """ Lazily split text into sentences.
+
+    Text after the last sentence terminator is only yielded when
+    include_trailing is True. Sentences are stripped of surrounding whitespace
+    and empty sentences are skipped.
+
+    :param text: Plain text.
+    :param include_trailing: Yield the unterminated text at the end as a sentence.
+    :return: Iterator of SentenceSpans in document order.
+    """
+
+    length = len(text)
+    start = 0
+    # The padding adds one leading space, so break positions are offset by one
+    breaks = (min(position - 1, length) for position in _breaks(" " + text + "  "))
+    if include_trailing:
+        breaks = merge(breaks, [length])
+
+    for end in breaks:
+        if end <= start:
+            continue
+        sentence = text[start:end].lstrip()
+        span_start = end - len(sentence)
+        sentence = sentence.rstrip()
+        if sentence:
+            yield SentenceSpan(span_start, span_start + len(sentence), sentence)
+        start = end
+
+
+def split_into_sentences(text: str) -> List[str]:
+
+    """ Split text into a list of sentences.
+
+    :param text: Plain text.
+    :return: List of stripped sentences.
+    """
+
+    return [span.text for span in iter_sentence_spans(text)]
+
+
+class SentenceIndex:
+
+    """ Looks up the sentence containing a character offset.
+
+    Segments the text once; each lookup is a binary search.
+    """
+
+    spans: List[SentenceSpan]
+
+    def __init__(self, text: str, include_trailing: bool = False):
+        self.spans = list(iter_sentence_spans(text, include_trailing))
+        self._starts = [span.start for span in self.spans]
+
+    def find(self, offset: int) -> Optional[SentenceSpan]:
+        """ Find the sentence containing offset.
+
+        :param offset: Character offset within the text.
+        :return: SentenceSpan or None if the offset falls between sentences.
+        """
+        i = bisect_right(self._starts, offset) - 1
+        if i < 0 or offset >= self.spans[i].end:
+            return None
+        return self.spans[i]
+
+    def __len__(self):
+        return len(self.spans)
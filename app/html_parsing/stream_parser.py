@@ -0,0 +1,275 @@
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+from .concept_parser import ConceptMention, build_concept_mentions
+
+
+# Feed size used when the content is passed in as a single string
+CHUNK_SIZE = 64 * 1024
+
+# Elements that never have children, so have no end tag
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr"
+}
+
+# Elements whose whitespace-only strings are kept as they are
+PRESERVE_WHITESPACE_ELEMENTS = {"pre", "textarea"}
+
+ASCII_SPACES = " \n\t\x0c\r"
+
+HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+
+class StreamedDocument(NamedTuple):
+
+    """ Everything the streaming extractor pulls out of a document.
+    """
+
+    text: str
+    # "" when there's no <summary>, None when it doesn't wrap a single string
+    summary: Optional[str]
+    concepts: List[Tuple[int, Optional[str], str]]
+    # (level, text, id) of each heading
+    headings: List[Tuple[int, str, Optional[str]]]
+    # Attributes of each <a>, with class split into a list like BeautifulSoup's
+    anchors: List[Dict[str, object]]
+    # src of each <img>
+    images: List[str]
+
+
+class _SummaryCapture:
+
+    """ Collects the text of the first <summary> element.
+
+    Mirrors Tag.string: the summary only has a value when it wraps a single
+    string, possibly through a chain of single-child tags.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.pieces: List[str] = []
+        self.seen_text = False
+        self.seen_end = False
+        self.single_string = True
+
+    def start(self, tag: str) -> None:
+        if self.seen_text or tag in VOID_ELEMENTS:
+            self.single_string = False
+        if tag not in VOID_ELEMENTS:
+            self.depth += 1
+
+    def end(self) -> None:
+        if not self.seen_text:
+            self.single_string = False
+        self.seen_end = True
+        self.depth -= 1
+
+    def data(self, data: str) -> None:
+        if self.seen_text or self.seen_end:
+            self.single_string = False
+        self.seen_text = True
+        self.pieces.append(data)
+
+    def value(self) -> Optional[str]:
+        if not self.single_string or not self.seen_text:
+            return None
+        return "".join(self.pieces)
+
+
+class _StreamingExtractor(HTMLParser):
+
+    """ Tokenizer callbacks that build the document text, the summary and the
+    concept spans without building a tree.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.pieces: List[str] = []
+        self.text_length = 0
+        self.concepts: List[Tuple[int, Optional[str], str]] = []
+        self._span_depth = 0
+        # (slot in concepts, offset, name, span depth, index into pieces) of each open concept span
+        self._open_concepts: List[Tuple[int, int, Optional[str], int, int]] = []
+        self._summary: Optional[_SummaryCapture] = None
+        self._summary_done = False
+        self._preserve_depth = 0
+        # Text arrives in several events when it spans fed chunks
+        self._pending: List[str] = []
+        self.headings: List[Tuple[int, str, Optional[str]]] = []
+        # (slot in headings, level, id, index into pieces) of each open heading
+        self._open_headings: List[Tuple[int, int, Optional[str], int]] = []
+        self.anchors: List[Dict[str, object]] = []
+        self.images: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        summary = self._capturing_summary()
+        if summary:
+            summary.start(tag)
+        elif tag == "summary" and not self._summary_done:
+            self._summary = _SummaryCapture()
+
+        if tag in HEADINGS:
+            self._open_headings.append((len(self.headings), int(tag[1]), dict(attrs).get("id"), len(self.pieces)))
+            self.headings.append(None)
+        elif tag == "a":
+            anchor: Dict[str, object] = dict(attrs)
+            anchor["class"] = (anchor.get("class") or "").split()
+            self.anchors.append(anchor)
+        elif tag == "img" and dict(attrs).get("src"):
+            self.images.append(dict(attrs)["src"])
+
+        if tag in PRESERVE_WHITESPACE_ELEMENTS:
+            self._preserve_depth += 1
+        elif tag == "span":
+            self._span_depth += 1
+            attrs = dict(attrs)
+            if "concept" in (attrs.get("class") or "").split():
+                self._open_concepts.append((len(self.concepts), self.text_length, attrs.get("name"),
+                                            self._span_depth, len(self.pieces)))
+                # Reserve the slot so spans stay in document order when nested
+                self.concepts.append(None)
+
+    def handle_endtag(self, tag):
+        self._flush()
+        summary = self._capturing_summary()
+        if summary:
+            if summary.depth:
+                summary.end()
+            elif tag == "summary":
+                self._summary_done = True
+
+        if tag in HEADINGS and self._open_headings:
+            self._close_heading()
+
+        if tag in PRESERVE_WHITESPACE_ELEMENTS and self._preserve_depth:
+            self._preserve_depth -= 1
+        elif tag == "span" and self._span_depth:
+            if self._open_concepts and self._open_concepts[-1][3] == self._span_depth:
+                self._close_concept()
+            self._span_depth -= 1
+
+    def handle_data(self, data):
+        self._pending.append(data)
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        data = "".join(self._pending)
+        self._pending = []
+        # Like BeautifulSoup, collapse whitespace-only strings
+        if not self._preserve_depth and not data.strip(ASCII_SPACES):
+            data = "\n" if "\n" in data else " "
+        self.pieces.append(data)
+        self.text_length += len(data)
+        summary = self._capturing_summary()
+        if summary:
+            summary.data(data)
+
+    def handle_comment(self, data):
+        self._flush()
+        summary = self._capturing_summary()
+        if summary:
+            summary.single_string = False
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        # CDATA sections are part of the text, like soup.get_text()
+        self._flush()
+        if data.startswith("CDATA["):
+            self.handle_data(data[len("CDATA["):])
+            self._flush()
+
+    def _close_concept(self) -> None:
+        slot, offset, name, _, start = self._open_concepts.pop()
+        self.concepts[slot] = (offset, name, "".join(self.pieces[start:]))
+
+    def _close_heading(self) -> None:
+        slot, level, anchor, start = self._open_headings.pop()
+        self.headings[slot] = (level, "".join(self.pieces[start:]).strip(), anchor)
+
+    def _capturing_summary(self) -> Optional[_SummaryCapture]:
+        if self._summary is not None and not self._summary_done:
+            return self._summary
+        return None
+
+    def result(self) -> StreamedDocument:
+        self._flush()
+        # Concept spans left open at the end of the document run to the end
+        while self._open_concepts:
+            self._close_concept()
+        while self._open_headings:
+            self._close_heading()
+
+        summary = self._summary.value() if self._summary else ""
+        return StreamedDocument(text="".join(self.pieces),
+                                summary=summary,
+                                concepts=self.concepts,
+                                headings=self.headings,
+                                anchors=self.anchors,
+                                images=self.images)
+
+
+def _chunks(content: str) -> Iterable[str]:
+    return (content[i:i + CHUNK_SIZE] for i in range(0, len(content), CHUNK_SIZE))
+
+
+def extract(content: Union[str, Iterable[str]]) -> StreamedDocument:
+
+    """ Extract the text, summary and concept spans from html in one pass.
+
+    No document tree is built; the html is tokenized incrementally, so content
+    can also be passed in as an iterable of chunks (e.g. read from a file).
+
+    :param content: HTML string or iterable of HTML chunks.
+    :return: StreamedDocument.
+    """
+
+    chunks = _chunks(content) if isinstance(content, str) else content
+
+    parser = _StreamingExtractor()
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser.result()
+
+
+def html_to_text(content: str) -> str:
+
+    """ Streaming drop-in for concept_parser.html_to_text.
+
+    :param content: HTML string.
+    :return: Text string (HTML Tags stripped)
+    """
+
+    return extract(content).text
+
+
+def parse_summary(html: str) -> Optional[str]:
+
+    """ Streaming drop-in for summary_parser.parse_summary.
+
+    :param html: HTML string.
+    :return: Text of the first <summary> element.
+    """
+
+    return extract(html).summary
+
+
+def parse_concepts(content: str) -> List[ConceptMention]:
+
+    """ Streaming drop-in for concept_parser.parse_concepts.
+
+    :param content: Article content
+    :return: List of ConceptMentions
+    """
+
+    document = extract(content)
+    if not document.concepts:
+        return []
+    return build_concept_mentions(document.text, document.concepts)
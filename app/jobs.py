@@ -0,0 +1,271 @@
+""" Background ingestion of posted content.
+
+With ASYNC_INGESTION on, POST handlers queue the parse and graph writes as a
+job and return 202 straight away; a pool of worker threads runs the jobs and
+GET /jobs/<id> reports their progress.
+
+Each process serving requests runs the jobs it queued on its own pool, but
+reports them to a SQLite file (JOBS_DB) shared by every process on the
+host, so any worker can answer GET /jobs/<id> and reports outlive a
+restart. A job left unfinished by a process that has since exited is
+reported as failed.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import closing
+from typing import Any, Callable, Dict, Optional, Tuple
+import datetime as dt
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from flask import Flask, current_app
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Finished jobs are forgotten, oldest first, past this many jobs
+MAX_JOBS = 1000
+
+
+class Job:
+
+    """ One queued ingestion.
+    """
+
+    def __init__(self, kind: str, payload: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.status = QUEUED
+        self.status_code: Optional[int] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.queued_at = dt.datetime.now().isoformat()
+        self._queued = time.perf_counter()
+        self.wait_time: Optional[float] = None
+        self.run_time: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def run(self, app: Flask, handler: Callable[[Dict[str, Any]], Tuple[Dict[str, Any], int]],
+            report: Callable[["Job"], None]) -> None:
+        started = time.perf_counter()
+        self.wait_time = started - self._queued
+        self.status = RUNNING
+        report(self)
+        try:
+            with app.app_context():
+                result, status_code = handler(self.payload)
+            self.result = result
+            self.status_code = status_code
+            self.status = SUCCEEDED if status_code < 400 else FAILED
+        except Exception as e:
+            logging.exception(f"Job {self.id} ({self.kind}) failed")
+            self.error = str(e)
+            self.status_code = 500
+            self.status = FAILED
+        finally:
+            self.run_time = time.perf_counter() - started
+            # The payload isn't reported, so don't keep it around
+            self.payload = None
+            report(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "status_code": self.status_code,
+            "result": self.result,
+            "error": self.error,
+            "queued_at": self.queued_at,
+            "wait_time": self.wait_time,
+            "run_time": self.run_time
+        }
+
+
+class JobStore:
+
+    """ Reports of jobs, in a SQLite file shared by the processes on a host.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with closing(self._connect()) as connection, connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    pid INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    queued_at TEXT NOT NULL,
+                    report TEXT NOT NULL
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_queued_at ON jobs (queued_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def save(self, job: Job) -> None:
+        """ Record the job's current state, forgetting the oldest finished jobs past MAX_JOBS.
+        """
+        report = job.to_dict()
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO jobs (id, pid, status, queued_at, report) VALUES (?, ?, ?, ?, ?)",
+                (job.id, os.getpid(), job.status, job.queued_at, json.dumps(report, default=str))
+            )
+            if job.status == QUEUED:
+                connection.execute("""
+                    DELETE FROM jobs WHERE id IN (
+                        SELECT id FROM jobs
+                        WHERE status IN (?, ?)
+                        ORDER BY queued_at
+                        LIMIT max((SELECT count(*) FROM jobs) - ?, 0)
+                    )
+                """, (SUCCEEDED, FAILED, MAX_JOBS))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """ The report of a job, queued by any process.
+
+        :return: As Job.to_dict(), or None if there's no such job.
+        """
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT pid, report FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        pid, report = row
+        report = json.loads(report)
+        if report["status"] in (QUEUED, RUNNING) and not _alive(pid):
+            report.update(status=FAILED, status_code=500, error="The process running the job stopped")
+        return report
+
+
+def _alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobQueue:
+
+    """ Runs jobs on a pool of worker threads and reports them to a JobStore.
+
+    Jobs with the same key, e.g. two posts of one article, run in the order
+    they were submitted.
+    """
+
+    def __init__(self, workers: int, store: JobStore):
+        self.workers = workers
+        self.store = store
+        # Key -> the last job submitted with that key
+        self._last: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def submit(self, app: Flask, kind: str, key: str,
+               handler: Callable[[Dict[str, Any]], Tuple[Dict[str, Any], int]],
+               payload: Dict[str, Any]) -> Job:
+        """ Queue a job.
+
+        :param app: Application the job runs in the context of.
+        :param kind: What is being ingested, e.g. "article".
+        :param key: Identifies what the job writes.
+        :param handler: Called with the payload, returns (response body, status code).
+        :param payload: Posted data.
+        :return: The queued Job.
+        """
+        job = Job(kind, payload)
+        self.store.save(job)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingestion")
+
+            previous = self._last.get(key)
+            if previous is not None and previous.done():
+                previous = None
+            # The previous job was queued first, so it's already running by
+            # the time this one waits for it
+            self._last[key] = self._executor.submit(self._run, job, app, handler, previous)
+            self._last = {other: future for other, future in self._last.items() if not future.done()}
+        return job
+
+    def _run(self, job: Job, app: Flask, handler: Callable[[Dict[str, Any]], Tuple[Dict[str, Any], int]],
+             previous: Optional[Future]) -> None:
+        if previous is not None:
+            wait([previous])
+        job.run(app, handler, self._report)
+
+    def _report(self, job: Job) -> None:
+        # A report that can't be written mustn't stop the job
+        try:
+            self.store.save(job)
+        except sqlite3.Error as e:
+            logging.warning(f"Failed to report job {job.id} with exception {e}")
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """ The report of a job queued by any process, or None.
+        """
+        return self.store.get(job_id)
+
+    def shutdown(self) -> None:
+        """ Wait for the queued jobs to finish.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def job_queue(app: Flask) -> JobQueue:
+
+    """ The application's job queue, created on first use.
+    """
+
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue(app.config["INGESTION_WORKERS"], JobStore(app.config["JOBS_DB"]))
+    return _queue
+
+
+def ingest(kind: str, key: str,
+           handler: Callable[[Dict[str, Any]], Tuple[Dict[str, Any], int]],
+           payload: Dict[str, Any]) -> Tuple[Dict[str, Any], int, Dict[str, str]]:
+
+    """ Queue a validated POST, or handle it in the request when ASYNC_INGESTION is off.
+
+    :param kind: What is being ingested, e.g. "article".
+    :param key: Identifies what is being written, e.g. the article's title.
+    :param handler: Called with the payload, returns (response body, status code).
+    :param payload: Posted data.
+    :return: (response body, status code, headers)
+    """
+
+    app = current_app._get_current_object()
+    if not app.config["ASYNC_INGESTION"]:
+        body, status_code = handler(payload)
+        return body, status_code, {}
+
+    job = job_queue(app).submit(app, kind, f"{kind}/{key}", handler, payload)
+    return job.to_dict(), 202, {"Location": f"/jobs/{job.id}"}
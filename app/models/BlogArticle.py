@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import Any, List, Dict
 from app.models.comments import ArticleComments
 
 
@@ -19,6 +19,16 @@ class BlogArticle:
     categories: List[str]
     finished_confidence: int
     summary: str
+    text: str
+    absolute_content: str
+    word_count: int
+    reading_time: int
+    toc: str
+    links_to: List[str]
+    rendered_content: str
+    backlinks: List[Dict[str, Any]]
+    content_hash: str
+    analysis_version: int
 
     comments: ArticleComments
 
@@ -35,6 +45,16 @@ class BlogArticle:
                  concepts: List[Dict[str, str]],
                  last_edited: str,
                  summary: str,
+                 text: str = None,
+                 absolute_content: str = None,
+                 word_count: int = None,
+                 reading_time: int = None,
+                 toc: str = None,
+                 links_to: List[str] = None,
+                 rendered_content: str = None,
+                 backlinks: List[Dict[str, Any]] = None,
+                 content_hash: str = None,
+                 analysis_version: int = None,
                  comments: ArticleComments = ArticleComments()) -> None:
 
         self.published = published
@@ -49,4 +69,14 @@ class BlogArticle:
         self.comments = comments
         self.categories = categories
         self.summary = summary
+        self.text = text
+        self.absolute_content = absolute_content
+        self.word_count = word_count
+        self.reading_time = reading_time
+        self.toc = toc
+        self.links_to = links_to or []
+        self.rendered_content = rendered_content
+        self.backlinks = backlinks or []
+        self.content_hash = content_hash
+        self.analysis_version = analysis_version
         self.finished_confidence = finished_confidence
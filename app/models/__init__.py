@@ -1,42 +1,7 @@
-from py2neo import Graph, Node
-import os
+from .connection import GraphConnection
 
 
-password = os.getenv('NEO4J_PASSWORD')
-user = os.getenv("NEO4J_USERNAME")
-# graph = Graph(user=user, password=password)
-graph = Graph("BlogTest", password="helloworld")
+# Connects on first use, see connection.py
+graph = GraphConnection()
 
-
-
-# Query
-# CALL db.index.fulltext.queryNodes("articleContent", "query") YIELD node, score
-# RETURN node.title, node.description, score
-
-# graph.schema.create_uniqueness_constraint("User", "username")
-# graph.schema.create_uniqueness_constraint("Article", "uuid")
-# graph.schema.create_uniqueness_constraint("Comment", "uuid")
-# graph.schema.create_uniqueness_constraint("Concept", "name")
-
-
-
-def add_fts_index():
-    query = """
-         CALL db.index.fulltext.createNodeIndex("articleContent",["Article"],["title",
-                                                                              "content",
-                                                                              "author",
-                                                                              "timestamp",
-                                                                              "summary"])
-    """
-    graph.run(query)
-
-
-def drop_fts_index():
-    query = """
-        CALL db.index.fulltext.drop("articleContent")
-    """
-    graph.run(query)
-
-
-drop_fts_index()
-add_fts_index()
+# Constraints and indexes are applied by "python manage.py migrate", see migrations.py
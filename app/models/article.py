@@ -5,12 +5,42 @@ import datetime as dt
 from slugify import slugify
 from app.models.BlogArticle import BlogArticle
 from app.models.comments import clean_comments_recursive, ArticleComments
-from app.html_parsing.concept_parser import parse_concepts
+from app.html_parsing.analysis import DERIVED_FIELDS, analyse
+from app.html_parsing.images import render_content
 from app.models.pagination import Paginated
-from app.html_parsing.summary_parser import parse_summary
 import logging
 from . import graph
-from .concept import Concept
+from .concept import Concept, auto_linker, concept_matcher
+from .batch import create_all
+from .link_graph import sync_links
+from .queries import queries
+from .upsert import update_properties, write_content
+
+
+ARTICLE_BY_TITLE = queries.register("article_by_title", """
+    MATCH (a: Article { title: $title })
+    RETURN a
+""", title="")
+
+ARTICLE_BY_SLUG = queries.register("article_by_slug", """
+    MATCH (a: Article { slug: $slug })
+    RETURN a
+""", slug="")
+
+
+# Cypher turning the comment threads of each article into a tree, keeping only article and threads
+THREADS = """
+    OPTIONAL MATCH r=(article)<-[:AS_REPLY_TO*..]-(c:Comment)<-[:WROTE]-(u:User)
+    WITH article, COLLECT(r) AS rs
+    CALL apoc.convert.toTree(rs, true, {
+        nodes: {
+            Comment: ['uuid', 'content', 'timestamp'],
+            User: ['username'],
+            Article: ['slug', 'timestamp']
+        }
+    }) YIELD value
+    WITH article, value AS threads
+"""
 
 
 class Article(GraphObject):
@@ -36,6 +66,15 @@ class Article(GraphObject):
     last_edited: str = Property()
     finished_confidence: int = Property()
     slug: str = Property()
+    text: str = Property()
+    absolute_content: str = Property()
+    word_count: int = Property()
+    reading_time: int = Property()
+    toc: str = Property()
+    links_to: List[str] = Property()
+    rendered_content: str = Property()
+    content_hash: str = Property()
+    analysis_version: int = Property()
 
     def __init__(self,
                  title: str,
@@ -68,34 +107,6 @@ class Article(GraphObject):
 
         }
 
-    @classmethod
-    def add_concepts(cls, title: str) -> None:
-
-        """ Add concept relations to the Article.
-        """
-
-        article = Article.match(graph).where(f"_.title = \'{title}\'").first()
-
-        # Add concept net concepts
-        concepts = parse_concepts(article.content)
-        if not concepts:
-            return
-
-        # Add concept relations to graph
-        for concept in concepts:
-
-            rel = Concept(concept.name, "")
-            rel.create()
-
-            # Add concept
-            query = """
-                MERGE (c: Concept { name: $name })
-                MERGE (a: Article { uuid: $uuid })
-                MERGE (a)-[:HAS_CONCEPT { mentions: $mentions }]->(c)
-            """
-            graph.run(query, name=concept.name, mentions=concept.mentions, uuid=article.uuid)
-            logging.debug(f"Added Article-Concept relationship between {article.title} and {concept.name}")
-
     def create(self) -> bool:
 
         """ Create an Article and add concept relations.
@@ -103,122 +114,96 @@ class Article(GraphObject):
         :returns: True on success else False.
         """
 
-        # Check uniqueness
-        if Article.exists(self.title):
-            logging.warning(f"Failed to create new article \'{self.title}\' because an article with that slug already exists.")
+        # Merged on title, so an existing article is left alone
+        if not Article.create_many([self]):
+            logging.debug(f"Didn't create article \'{self.title}\' because an article with that title already exists.")
             return False
 
-        # Get summary information
-        self.summary = parse_summary(self.content)
-
-        # Create article
-        graph.merge(self)
         logging.debug(f"Created new Article {self.title}")
-
-        # Add relationships
-        Article.add_concepts(self.title)
         return True
 
     @classmethod
-    def update_article(cls, title: str, update_info: Dict[str, Any]) -> bool:
+    def update_article(cls, title: str, update_info: Dict[str, Any]) -> Optional[bool]:
         """ Update an article's properties.
 
         Ignores slug.
         Ignores new properties.
+        Skips properties that haven't changed, so re-posting an unchanged
+        article doesn't write to the graph. The article isn't read first:
+        the statements writing it compare the values.
 
-        :return: True on success else False.
+        :return: True if every property was updated, False if an update failed, None if the article doesn't exist.
         """
-        if not Article.exists(title):
-            return False
-
         if not update_info:
             logging.warning(f"Called update_article with empty update_info")
             return False
 
+        changes = {}
         article_fields = list(vars(Article)["__annotations__"].keys())
         for key, value in update_info.items():
             # Don't allow adding new properties
             if key not in article_fields:
                 logging.warning(f"Attempted to add new field to Article")
                 continue
-            elif key == "content":
-                Article.__update_content(title, value)
-            elif key == "slug" or key == "title":
+            elif key in ("content", "slug", "title") or key in DERIVED_FIELDS:
                 continue
             else:
-                Article.__update_property(title, key, value)
-        return True
+                changes[key] = value
 
-    @classmethod
-    def __update_property(cls, title: str, key: str, value: Any) -> bool:
-        """
-        :param slug: Article slug.
-        :param value: New value.
-        :return: True on success else False.
-        """
-        if not Article.exists(title):
-            return False
-
-        article_fields = list(vars(Article)["__annotations__"].keys())
-        if key not in article_fields:
-            logging.warning(f"Attempted to add new field to Article")
-            return False
-        elif key == "content":
-            logging.warning(f"Attempted to update content field - use update_content method instead")
-            return False
-
-        query = f"""
-            MATCH (a: Article)
-            WHERE a.title = $title
-            SET a.{key} = $value
-        """
-        graph.run(query, title=title, value=value)
-        logging.debug(f"Updated {key} field of {title} to {value}")
-        return True
+        if "content" not in update_info:
+            return True if update_properties("Article", "title", title, changes) else None
+        return Article.__update(title, changes, update_info["content"])
 
     @classmethod
-    def __update_content(cls, title: str, value) -> bool:
-        """ Update the content of an existing article.
+    def __update(cls, title: str, changes: Dict[str, Any], value) -> Optional[bool]:
+        """ Update the properties and content of an existing article in one transaction.
 
-        :param slug: Article slug.
+        :param title: Article title.
+        :param changes: Properties other than content to set.
         :param value: New article content.
-        :return: True on success else False.
+        :return: True on success, False if the update failed, None if the article doesn't exist.
         """
-        if not Article.exists(title):
-            return False
-        try:
+        # Get summary, text and other derived fields
+        analysis = analyse(value)
+        properties = analysis.properties()
+        properties["rendered_content"] = render_content(value, analysis)
 
-            # Get categories and summary
-            summary = parse_summary(value)
-
-            tx = graph.begin()
-            # 1. Delete concept relationships
-            query = """
-                MATCH (Concept)<-[rel:HAS_CONCEPT]-(Article { title: $title })
-                DELETE rel
-            """
-            graph.run(query, title=title)
-
-            # 2. Update content and last_edited
-            query = """
-                MATCH (a: Article { title: $title })
-                SET a.content = $content
-                SET a.last_edited = $last_edited
-                SET a.summary = $summary
-            """
-
-            last_edited = dt.datetime.now().isoformat()
-            graph.run(query, content=value, summary=summary, last_edited=last_edited, title=title)
-            tx.commit()
-            logging.debug(f"Updated content for Article {title}")
+        concepts = analyse(value, auto_linker()).concepts
 
-            # 3. Update concept relationships
-            Article.add_concepts(title)
-            return True
+        last_edited = dt.datetime.now().isoformat()
+        created = []
+        tx = graph.begin()
+        try:
+            # 1. Update the changed properties
+            if not update_properties("Article", "title", title, changes, tx):
+                tx.rollback()
+                return None
 
+            # 2. Update content and last_edited, unless the content is unchanged
+            if write_content("Article", "title", title, value, properties, last_edited, tx):
+                # 3. Update concept and link relationships
+                created = Concept.link_mentions("Article", "title", title, concepts, tx)
+                sync_links("Article", "title", title, properties["links_to"], tx)
+            else:
+                logging.debug(f"Skipped content update for unchanged Article {title}")
+            tx.commit()
         except Exception as e:
+            tx.rollback()
             logging.error(f"Failed to update content with exception {e}")
             return False
+        concept_matcher.add(created)
+        logging.debug(f"Updated Article {title}")
+        return True
+
+    @classmethod
+    def create_many(cls, articles: List["Article"]) -> List[str]:
+
+        """ Create Articles and their relationships in a fixed number of statements.
+
+        :return: Titles of the Articles created; existing and repeated titles are skipped.
+        """
+
+        return create_all("Article", "title", articles, render=True)
 
     @classmethod
     def exists(cls, title: str) -> bool:
@@ -226,11 +211,7 @@ class Article(GraphObject):
 
         :return: True if exists else False.
         """
-        query = """
-            MATCH (a: Article { title: $title })
-            RETURN a
-        """
-        return graph.evaluate(query, title=title) is not None
+        return queries.evaluate(ARTICLE_BY_TITLE, title=title) is not None
 
     # TODO: Test
     @classmethod
@@ -285,14 +266,8 @@ class Article(GraphObject):
     def get_similar_articles(cls, slug) -> List:
         """ Find articles with overlapping tags.
 
-        :return: List or None
+        :return: List, empty if the article doesn't exist.
         """
-        # Check existence
-        if not Article.exists(slug):
-            logging.warning(f"Failed to get similar articles because article with slug {slug} does not exist")
-            return []
-
-        # Find similar articles
         query = """
             CYPHER expressionEngine=interpreted
             MATCH (this: Article { slug: $slug })-[:HAS_CONCEPT]->(c: Concept),
@@ -301,7 +276,7 @@ class Article(GraphObject):
             WITH DISTINCT c as c, other, rel
             WITH other, COLLECT(rel{.*, name: c.name}) as concepts
             ORDER BY SIZE(concepts) DESC LIMIT 3
-            RETURN other{.*, concepts: concepts}
+            RETURN other{.*, concepts: concepts} AS article
         """
         data = graph.run(query, slug=slug).data()
         if not data:
@@ -319,36 +294,33 @@ class Article(GraphObject):
         """
 
         if title:
-
-            query = """
-                CYPHER expressionEngine=interpreted
-                MATCH (article: Article { title: $title })
-                OPTIONAL MATCH (article: Article {title: $title})-[rel:HAS_CONCEPT]->(concept: Concept)
-                OPTIONAL MATCH (article)-[:HAS_CATEGORY]-(category: Category)
-                WITH COLLECT(rel{.*, name: concept.name}) as concepts, article, COLLECT(category) as categories
-                RETURN article{.*, concepts: concepts, categories: categories }
-            """
-            data = graph.run(query, title=title).data()
-            if not data:
-                return None
-
+            match = "MATCH (article: Article { title: $title })"
         elif slug:
+            match = "MATCH (article: Article { slug: $slug })"
+        else:
+            return None
 
-            query = """
-                CYPHER expressionEngine=interpreted
-                MATCH (article: Article { slug: $slug })
-                OPTIONAL MATCH (article: Article {slug: $slug})-[rel:HAS_CONCEPT]->(concept: Concept)
-                OPTIONAL MATCH (article)-[:HAS_CATEGORY]-(category: Category)
-                WITH COLLECT(rel{.*, name: concept.name}) as concepts, article, COLLECT(category) as categories
-                RETURN article{.*, concepts: concepts, categories: categories }
-            """
-            data = graph.run(query, slug=slug).data()
-            if not data:
-                return None
+        # The article, its relationships and its comment threads in one round trip
+        query = f"""
+            CYPHER expressionEngine=interpreted
+            {match}
+            WITH article LIMIT 1
+            {THREADS}
+            OPTIONAL MATCH (article)-[rel:HAS_CONCEPT]->(concept: Concept)
+            WITH article, threads, COLLECT(rel{{.*, name: concept.name}}) as concepts
+            OPTIONAL MATCH (article)-[:HAS_CATEGORY]-(category: Category)
+            WITH article, threads, concepts, COLLECT(category) as categories
+            OPTIONAL MATCH (source)-[:LINKS_TO]->(article)
+            WITH article, threads, concepts, categories,
+                 COLLECT(source{{.name, .title, .slug, labels: labels(source)}}) as backlinks
+            RETURN article{{.*, concepts: concepts, categories: categories, backlinks: backlinks }}, threads
+        """
+        data = graph.run(query, title=title, slug=slug).data()
+        if not data:
+            return None
 
         article = data[0]["article"]
-        comments = Article.get_threads(title)
-        article["comments"] = comments
+        article["comments"] = Article.__comments(data[0]["threads"])
         return BlogArticle(**article)
 
     # TODO: Test
@@ -479,8 +451,9 @@ class Article(GraphObject):
         ]
 
         if data and include_comments:
+            threads = Article.get_threads_of([article.title for article in data])
             for article in data:
-                article.comments = Article.get_threads(article.title)
+                article.comments = threads.get(article.title)
 
         return Paginated(endpoint, data, page, per_page, testing, **pagination_params)
 
@@ -492,33 +465,32 @@ class Article(GraphObject):
         :returns: List of CommentThreads or None.
         """
 
-        # Check Article exists
-        if not Article.exists(title):
-            return None
+        return Article.get_threads_of([title]).get(title)
 
-        query = """
-            match r=(:Article {title: $title})<-[:AS_REPLY_TO*..]-(c:Comment)<-[:WROTE]-(u:User)
-            WITH COLLECT(r) AS rs
-            CALL apoc.convert.toTree(rs, true, {
-                nodes: {
-                    Comment: ['uuid', 'content', 'timestamp'],
-                    User: ['username'],                     
-                    Article: ['slug', 'timestamp']
-                }
-            }) yield value
-            Return value
-        """
+    @classmethod
+    def get_threads_of(cls, titles: List[str]) -> Dict[str, ArticleComments]:
+        """ Get the comment threads of several Articles in one query.
 
-        data = graph.run(query, title=title).data()
+        :param titles: Titles of the Articles.
+        :returns: Title -> comment threads, for the Articles that exist.
+        """
 
-        if not data:
-            return ArticleComments()
+        query = f"""
+            UNWIND $titles AS title
+            MATCH (article: Article {{title: title}})
+            {THREADS}
+            RETURN article.title AS title, threads
+        """
 
-        data = data[0].get("value")
+        data = graph.run(query, titles=titles).data()
+        return {row["title"]: Article.__comments(row["threads"]) for row in data}
 
-        if not data:
+    @classmethod
+    def __comments(cls, threads: Optional[Dict]) -> ArticleComments:
+        """
+        :param threads: Comment tree of an Article, from THREADS.
+        :return: Its comment threads.
+        """
+        if not threads:
             return ArticleComments()
-
-        comments = data["as_reply_to"]
-        clean_comments = clean_comments_recursive(comments)
-        return ArticleComments(clean_comments)
+        return ArticleComments(clean_comments_recursive(threads["as_reply_to"]))
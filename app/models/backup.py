@@ -0,0 +1,169 @@
+""" NDJSON backups of the content graph.
+
+Articles, notes, links and concepts are exported as records in the format
+the bulk import endpoint takes, without the fields derived from their
+content, so importing them parses them again and recreates their
+HAS_CONCEPT and LINKS_TO relationships. Everything else (podcasts, users,
+comments and the remaining relationships) is exported as plain node and
+relationship records, which the import writes back as they are.
+
+Export with:
+
+    python manage.py export > backup.ndjson
+"""
+from itertools import groupby
+from typing import Any, Dict, Iterator, List, Tuple
+from . import graph
+from ..html_parsing.analysis import DERIVED_FIELDS
+
+
+# Label -> record type of the nodes exported as content
+CONTENT_TYPES = {"Concept": "concept", "Article": "article", "Note": "note", "Link": "link"}
+
+# Label -> property identifying the node, for every exported label
+NODE_KEYS = {
+    "Concept": "name",
+    "Article": "title",
+    "Note": "title",
+    "Link": "title",
+    "Podcast": "title",
+    "User": "email",
+    "Comment": "uuid",
+}
+
+# Relationships recreated when content is imported, so not exported from content
+DERIVED_RELATIONSHIPS = ["HAS_CONCEPT", "LINKS_TO"]
+
+RELATIONSHIP_TYPES = {"HAS_CONCEPT", "LINKS_TO", "RELATED_TO", "WROTE", "AS_REPLY_TO", "HAS_CATEGORY"}
+
+# Nodes read per query
+EXPORT_BATCH_SIZE = 500
+
+
+def _pages(query: str, batch_size: int, **parameters: Any) -> Iterator[Dict[str, Any]]:
+    # Each page starts after the last key of the one before, so it's one
+    # index range read and no more than batch_size records are held at once
+    after = None
+    while True:
+        page = graph.run(query, after=after, batch=batch_size, **parameters).data()
+        yield from page
+        if len(page) < batch_size:
+            return
+        after = page[-1]["key"]
+
+
+def export_records(batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+
+    """ Stream every exported node, then every relationship between them.
+
+    Nodes are read a page at a time in order of their key, so memory use
+    doesn't grow with the size of the graph, and the fields derived from
+    content are left out by the query rather than read and dropped.
+
+    :param batch_size: Nodes read per query.
+    :return: Iterator of records.
+    """
+
+    for label, key in NODE_KEYS.items():
+        query = f"""
+            MATCH (n: {label})
+            WHERE n.{key} IS NOT NULL AND ($after IS NULL OR n.{key} > $after)
+            WITH n
+            ORDER BY n.{key}
+            LIMIT $batch
+            RETURN n.{key} AS key, [name IN keys(n) WHERE NOT name IN $derived | [name, n[name]]] AS properties
+        """
+        derived = list(DERIVED_FIELDS) if label in CONTENT_TYPES else []
+        for record in _pages(query, batch_size, derived=derived):
+            properties = dict(record["properties"])
+            if label in CONTENT_TYPES:
+                yield {"type": CONTENT_TYPES[label], **properties}
+            else:
+                yield {"type": "node", "label": label, "properties": properties}
+
+    names = sorted(set(NODE_KEYS.values()))
+    for label, key in NODE_KEYS.items():
+        query = f"""
+            MATCH (source: {label})
+            WHERE source.{key} IS NOT NULL AND ($after IS NULL OR source.{key} > $after)
+            WITH source
+            ORDER BY source.{key}
+            LIMIT $batch
+            RETURN source.{key} AS key, [
+                (source)-[rel]->(target) WHERE NOT ($content AND type(rel) IN $derived) |
+                {{ type: type(rel), labels: labels(target), keys: [name IN $names | target[name]],
+                   properties: properties(rel) }}
+            ] AS relationships
+        """
+        pages = _pages(query, batch_size, content=label in CONTENT_TYPES, derived=DERIVED_RELATIONSHIPS,
+                       names=names)
+        for record in pages:
+            for rel in record["relationships"]:
+                end_label = next((target_label for target_label in rel["labels"] if target_label in NODE_KEYS), None)
+                if end_label is None:
+                    continue
+                end = rel["keys"][names.index(NODE_KEYS[end_label])]
+                if end is None:
+                    continue
+                yield {
+                    "type": "relationship",
+                    "relationship": rel["type"],
+                    "start": {"label": label, "key": record["key"]},
+                    "end": {"label": end_label, "key": end},
+                    "properties": rel["properties"]
+                }
+
+
+def restore_nodes(label: str, nodes: List[Dict[str, Any]]) -> None:
+
+    """ Write exported nodes of one label, merging them on their key.
+
+    :param label: One of NODE_KEYS.
+    :param nodes: Properties of each node.
+    """
+
+    key = NODE_KEYS[label]
+    query = f"""
+        UNWIND $nodes AS properties
+        MERGE (n: {label} {{ {key}: properties.{key} }})
+        SET n += properties
+    """
+    graph.run(query, nodes=nodes)
+
+
+def restore_relationships(relationships: List[Dict[str, Any]]) -> List[int]:
+
+    """ Write exported relationships whose nodes exist.
+
+    :param relationships: Relationship records, each with an "id" to report it by.
+    :return: ids of the relationships written.
+    """
+
+    def group(relationship: Dict[str, Any]) -> Tuple[str, str, str]:
+        return relationship["relationship"], relationship["start"]["label"], relationship["end"]["label"]
+
+    written = []
+    for (rel_type, start_label, end_label), rows in groupby(sorted(relationships, key=group), key=group):
+        query = f"""
+            UNWIND $rows AS row
+            MATCH (source: {start_label} {{ {NODE_KEYS[start_label]}: row.start.key }})
+            MATCH (target: {end_label} {{ {NODE_KEYS[end_label]}: row.end.key }})
+            MERGE (source)-[rel: {rel_type}]->(target)
+            SET rel += row.properties
+            RETURN DISTINCT row.id AS id
+        """
+        written.extend(record["id"] for record in graph.run(query, rows=list(rows)))
+    return written
+
+
+def valid_node(record: Dict[str, Any]) -> bool:
+    return record.get("label") in NODE_KEYS and record.get("label") not in CONTENT_TYPES \
+        and isinstance(record.get("properties"), dict) \
+        and record["properties"].get(NODE_KEYS[record["label"]]) is not None
+
+
+def valid_relationship(record: Dict[str, Any]) -> bool:
+    return record.get("relationship") in RELATIONSHIP_TYPES \
+        and all(isinstance(record.get(end), dict) and record[end].get("label") in NODE_KEYS
+                and record[end].get("key") is not None for end in ("start", "end")) \
+        and isinstance(record.get("properties", {}), dict)
@@ -0,0 +1,73 @@
+from typing import Any, Dict, List
+import inspect
+from py2neo.ogm import GraphObject
+from . import graph
+from .concept import Concept, auto_linker, concept_matcher
+from .link_graph import resolve_links, sync_all_links
+from .upsert import merge_nodes
+from ..html_parsing.analysis import analyse
+from ..html_parsing.images import render_content
+
+
+def create_all(label: str, key: str, nodes: List[GraphObject], render: bool = False) -> List[str]:
+
+    """ Create many nodes of one label, with their relationships, in a fixed number of statements.
+
+    The nodes are merged on key with one statement, then the HAS_CONCEPT
+    and LINKS_TO edges of the ones created and the links to them are added
+    in batches, all in one transaction. A node is never stored with its
+    content_hash but without its edges, which would stop a re-post from
+    repairing them.
+
+    :param label: Label of the nodes.
+    :param key: Property identifying the nodes, e.g. title.
+    :param nodes: Nodes to create.
+    :param render: True to set the nodes' rendered_content.
+    :return: Values of key of the nodes created; existing and repeated values are skipped.
+    """
+
+    unique = {}
+    for node in nodes:
+        unique.setdefault(getattr(node, key), node)
+    if not unique:
+        return []
+
+    for node in unique.values():
+        analysis = analyse(node.content)
+        for name, value in analysis.properties().items():
+            setattr(node, name, value)
+        if render:
+            node.rendered_content = render_content(node.content, analysis)
+
+    linker = auto_linker()
+    tx = graph.begin()
+    try:
+        values = merge_nodes(label, key, [dict(node.__node__) for node in unique.values()], tx)
+        created = [unique[value] for value in values]
+        mentioned = []
+        if created:
+            mentioned = Concept.link_all_mentions(label, key, {
+                getattr(node, key): analyse(node.content, linker).concepts
+                for node in created
+            }, tx)
+            sync_all_links(label, key, {getattr(node, key): node.links_to for node in created if node.links_to}, tx)
+            resolve_links(label, [node.slug for node in created], tx)
+        tx.commit()
+    except Exception:
+        tx.rollback()
+        raise
+    concept_matcher.add(mentioned)
+    return [getattr(node, key) for node in created]
+
+
+def init_fields(model: Any, fields: Dict[str, Any]) -> Dict[str, Any]:
+
+    """ The fields a model's constructor takes.
+
+    :param model: Model class.
+    :param fields: Posted or imported fields.
+    :return: Keyword arguments for the constructor.
+    """
+
+    parameters = inspect.signature(model.__init__).parameters
+    return {field: value for field, value in fields.items() if field in parameters and field != "self"}
@@ -5,9 +5,16 @@ import uuid
 import datetime as dt
 from py2neo.ogm import GraphObject, Property
 from .article import Article
+from .queries import queries
 from .user import User
 
 
+COMMENT_BY_UUID = queries.register("comment_by_uuid", """
+    MATCH (c: Comment { uuid: $uuid })
+    RETURN c
+""", uuid="")
+
+
 class AsReplyTo(Enum):
     Article = 0
     Comment = 1
@@ -81,9 +88,4 @@ class Comment(GraphObject):
         :return: True if exists else False.
         """
 
-        query = """
-            MATCH (c: Comment { uuid: $uuid })
-            RETURN c
-        """
-
-        return graph.evaluate(query, uuid=comment_id) is not None
+        return queries.evaluate(COMMENT_BY_UUID, uuid=comment_id) is not None
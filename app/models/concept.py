@@ -1,9 +1,48 @@
 from slugify import slugify
 from . import graph
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from py2neo.database import Transaction
 from py2neo.ogm import GraphObject, Property
 import datetime as dt
-from ..html_parsing.concept_parser import parse_concepts
+import logging
+import threading
+from config import Config
+from ..html_parsing.analysis import analyse
+from ..html_parsing.concept_matcher import ConceptMatcher
+from ..html_parsing.concept_parser import ConceptMention
+from .link_graph import resolve_links, sync_all_links, sync_links
+from .queries import queries
+from .upsert import merge_nodes, write_content
+
+
+# Names of all concepts, loaded from the graph on first use
+concept_matcher = ConceptMatcher()
+_matcher_loaded = threading.Event()
+_matcher_lock = threading.Lock()
+
+
+CONCEPT_BY_NAME = queries.register("concept_by_name", """
+    MATCH (c: Concept { name: $name })
+    RETURN c
+""", name="")
+
+
+def auto_linker() -> Optional[ConceptMatcher]:
+
+    """ The matcher used to link concepts at ingestion.
+
+    :return: ConceptMatcher, or None when AUTO_LINK_CONCEPTS is off.
+    """
+
+    if not Config.AUTO_LINK_CONCEPTS:
+        return None
+    if not _matcher_loaded.is_set():
+        with _matcher_lock:
+            if not _matcher_loaded.is_set():
+                names = graph.run("MATCH (c: Concept) RETURN c.name AS name").data()
+                concept_matcher.add(item["name"] for item in names)
+                _matcher_loaded.set()
+    return concept_matcher
 
 
 class Concept(GraphObject):
@@ -23,6 +62,15 @@ class Concept(GraphObject):
     last_edited: str = Property()
     timestamp: str = Property()
     slug: str = Property()
+    summary: str = Property()
+    text: str = Property()
+    absolute_content: str = Property()
+    word_count: int = Property()
+    reading_time: int = Property()
+    toc: str = Property()
+    links_to: List[str] = Property()
+    content_hash: str = Property()
+    analysis_version: int = Property()
 
     def __init__(self, name, content: str = ""):
         """ Represents a concept / keyword / noun phrase mentioned in an article.
@@ -49,31 +97,72 @@ class Concept(GraphObject):
         :return:
         """
 
-        if Concept.exists(self.name):
-            return False
+        return bool(Concept.create_many([self]))
 
-        graph.merge(self)
-        Concept.add_related_concepts(self.name)
-        return True
+    @classmethod
+    def create_many(cls, concepts: List["Concept"]) -> List[str]:
+
+        """ Create concepts, link them to the concepts they mention and resolve links to them.
+
+        Concepts are expanded breadth first: the new concepts are merged
+        with one statement, then the concepts their content mentions are
+        linked, and created if missing, with one more. Mentioned concepts
+        have no content of their own, so the expansion stops there, and the
+        number of statements doesn't grow with the number of concepts or how
+        they link to each other.
+
+        :param concepts: Concepts to create.
+        :return: Names of the concepts created; existing and repeated names are skipped.
+        """
+
+        visited = {}
+        for concept in concepts:
+            visited.setdefault(concept.name, concept)
+        for concept in visited.values():
+            for key, value in analyse(concept.content).properties().items():
+                setattr(concept, key, value)
+
+        # Concepts that already exist are left alone; the concepts and their
+        # edges are written in one transaction, so none is stored without them
+        tx = graph.begin()
+        try:
+            created = merge_nodes("Concept", "name", [dict(concept.__node__) for concept in visited.values()], tx)
+            level = [visited[name] for name in created]
+            mentioned = []
+            if level:
+                # The new concepts link to each other, but aren't matched
+                # elsewhere until they are committed
+                linker = auto_linker()
+                if linker is not None:
+                    linker = linker.extended(concept.name for concept in level)
+
+                # Next level: the concepts each new concept mentions
+                # (a concept's content mentions its own name)
+                mentioned = Concept.link_all_mentions("Concept", "name", {
+                    concept.name: [
+                        mention
+                        for mention in analyse(concept.content, linker).concepts
+                        if mention.name != concept.name
+                    ]
+                    for concept in level
+                }, tx)
+                sync_all_links("Concept", "name",
+                               {concept.name: concept.links_to for concept in level if concept.links_to}, tx)
+                resolve_links("Concept", [concept.slug for concept in level], tx)
+            tx.commit()
+        except Exception:
+            tx.rollback()
+            raise
+        concept_matcher.add([concept.name for concept in level] + mentioned)
+        return [concept.name for concept in level]
 
     @classmethod
     def get_concept(cls, name: str) -> Optional[Dict]:
         """ Get concept by name.
 
-        :return: True on success else False.
-        """
-        if not Concept.exists(name):
-            #logging.warning("Failed to get_concept because concept does not exist")
-            return None
-        query = """
-            MATCH (concept: Concept {name: $name})
-            RETURN concept
+        :return: The concept's properties, or None if it doesn't exist.
         """
-        data = graph.run(query, name=name).data()
-        if not data:
-            #logging.error("get_concept graph query returned None")
-            return None
-        return dict(data[0]["concept"])
+        return queries.fetch(CONCEPT_BY_NAME, name=name)
 
     @classmethod
     def exists(cls, name) -> bool:
@@ -81,78 +170,164 @@ class Concept(GraphObject):
 
         :return: True if exists else False.
         """
-        query = """
-            MATCH (c: Concept {name: $name})
-            RETURN c
-        """
-        return graph.evaluate(query, name=name) is not None
+        return queries.evaluate(CONCEPT_BY_NAME, name=name) is not None
 
     @classmethod
-    def update_concept(cls, name: str, content: str) -> bool:
+    def update_concept(cls, name: str, content: str) -> Optional[bool]:
 
         """ Update a concept
-        :return:
-        """
 
-        if not Concept.exists(name):
-            return False
+        Re-posting unchanged content doesn't write to the graph. Empty content
+        leaves the concept as it is, e.g. one created by a mention.
+        :return: True on success, False if the update failed, None if the concept doesn't exist.
+        """
 
         if not content:
-            return False
+            return True if Concept.exists(name) else None
 
         return Concept.__update_content(name, content)
 
     @classmethod
-    def __update_content(cls, name: str, content: str) -> bool:
-
-        tx = graph.begin()
-        # 1. Delete concept relationships
-        query = """
-                MATCH (Concept)<-[rel:HAS_CONCEPT]-(Concept { name: $name })
-                DELETE rel
-            """
-        graph.run(query, name=name)
-
-        # 2. Update content and last_edited
-        query = """
-                MATCH (a: Concept { name: $name })
-                SET a.content = $content
-                SET a.last_edited = $last_edited
-            """
+    def __update_content(cls, name: str, content: str) -> Optional[bool]:
 
+        properties = analyse(content).properties()
         last_edited = dt.datetime.now().isoformat()
-        graph.run(query, name=name, content=content, last_edited=last_edited)
-        tx.commit()
 
-        # 3. Update concept relationships
-        Concept.add_related_concepts(name)
+        tx = graph.begin()
+        try:
+            # 1. Update content, derived fields and last_edited, unless the content is unchanged
+            written = write_content("Concept", "name", name, content, properties, last_edited, tx)
+            if not written:
+                tx.rollback()
+                return None if written is None else True
+
+            # 2. Update concept and link relationships
+            created = Concept.add_related_concepts(name, content, tx)
+            sync_links("Concept", "name", name, properties["links_to"], tx)
+            tx.commit()
+        except Exception as e:
+            tx.rollback()
+            logging.error(f"Failed to update content with exception {e}")
+            return False
+        concept_matcher.add(created)
         return True
 
     @classmethod
-    def add_related_concepts(cls, name: str):
+    def add_related_concepts(cls, name: str, content: str, tx: Optional[Transaction] = None) -> List[str]:
 
-        """ Add concept relations to the Article.
-        """
+        """ Add concept relations to the Concept.
 
-        concept = Concept.match(graph).where(f"_.name = \'{name}\'").first()
+        :return: Names of the concepts created, see link_all_mentions.
+        """
 
         # Add concept net concepts
-        related_concepts = parse_concepts(concept.content)
-        if not related_concepts:
-            return
+        # (a concept's content mentions its own name)
+        related_concepts = [
+            related_concept
+            for related_concept in analyse(content, auto_linker()).concepts
+            if related_concept.name != name
+        ]
 
         # Add concept relations to graph
-        for related_concept in related_concepts:
+        return Concept.link_mentions("Concept", "name", name, related_concepts, tx)
+
+    @classmethod
+    def link_mentions(cls, label: str, key: str, value: str, mentions: List[ConceptMention],
+                      tx: Optional[Transaction] = None) -> List[str]:
+
+        """ Bring a node's HAS_CONCEPT edges in line with the concepts it mentions.
+
+        Edges to concepts that are no longer mentioned are deleted, edges to
+        newly mentioned concepts are created along with any missing concepts,
+        and the mentions of the rest are only written if they changed. Both
+        statements run in one transaction, and their cost doesn't grow with
+        the number of concepts.
 
-            rel = Concept(related_concept.name, "")
-            rel.create()
+        (n)-[:HAS_CONCEPT { mentions }]->(c: Concept)
+
+        :param label: Label of the mentioning node.
+        :param key: Property identifying the mentioning node.
+        :param value: Value of that property.
+        :param mentions: ConceptMentions found in the node's content.
+        :param tx: Transaction to run on, else a transaction of their own is committed.
+        :return: Names of the concepts created, see link_all_mentions.
+        """
+
+        return Concept.link_all_mentions(label, key, {value: mentions}, tx)
+
+    @classmethod
+    def link_all_mentions(cls, label: str, key: str, sources: Dict[str, List[ConceptMention]],
+                          tx: Optional[Transaction] = None) -> List[str]:
+
+        """ Sync the HAS_CONCEPT edges of many nodes in one transaction.
+
+        :param label: Label of the mentioning nodes.
+        :param key: Property identifying the mentioning nodes.
+        :param sources: Value of that property -> ConceptMentions found in the node's content.
+        :param tx: Transaction to run on, else a transaction of their own is committed.
+        :return: Names of the concepts created. Given a tx, the caller adds them to
+            concept_matcher once it commits, so a rollback doesn't leave them matched.
+        """
+
+        if not sources:
+            return []
+
+        unlink = f"""
+            UNWIND $sources AS row
+            MATCH (source: {label} {{ {key}: row.value }})-[rel:HAS_CONCEPT]->(concept: Concept)
+            WHERE NOT concept.name IN row.names
+            DELETE rel
+        """
+        link = f"""
+            UNWIND $sources AS row
+            MATCH (source: {label} {{ {key}: row.value }})
+            UNWIND row.concepts AS mention
+            OPTIONAL MATCH (existing: Concept {{ name: mention.name }})
+            WITH source, mention, existing IS NULL AS created
+            MERGE (concept: Concept {{ name: mention.name }})
+            ON CREATE SET concept += mention.properties
+            MERGE (source)-[rel:HAS_CONCEPT]->(concept)
+            FOREACH (_ IN CASE WHEN rel.mentions = mention.mentions THEN [] ELSE [1] END |
+                SET rel.mentions = mention.mentions)
+            RETURN concept.name AS name, concept.slug AS slug, created
+        """
+        empty = analyse("").properties()
+        rows = [
+            {
+                "value": value,
+                "names": [mention.name for mention in mentions],
+                "concepts": [
+                    {
+                        "name": mention.name,
+                        "mentions": mention.mentions,
+                        "properties": {**Concept(mention.name).to_dict(), **empty}
+                    }
+                    for mention in mentions
+                ]
+            }
+            for value, mentions in sources.items()
+        ]
 
-            query = """
-                MERGE (related: Concept { name: $related_name })
-                MERGE (main: Concept { name: $main_name })
-                MERGE (main)-[:HAS_CONCEPT { mentions: $mentions }]->(related)
-            """
-            graph.run(query, main_name=name, mentions=related_concept.mentions, related_name=related_concept.name)
+        own_tx = tx is None
+        if own_tx:
+            tx = graph.begin()
+        try:
+            tx.run(unlink, sources=rows)
+            linked = tx.run(link, sources=rows).data() if any(row["concepts"] for row in rows) else []
+
+            # A concept mentioned by several nodes is only created once
+            created = {row["name"]: row["slug"] for row in linked if row["created"]}
+            if created:
+                resolve_links("Concept", list(created.values()), tx)
+            if own_tx:
+                tx.commit()
+        except Exception:
+            if own_tx:
+                tx.rollback()
+            raise
+        if own_tx:
+            concept_matcher.add(created)
+        return list(created)
 
     @classmethod
     def get_concepts_in_articles(cls):
@@ -174,7 +349,8 @@ class Concept(GraphObject):
     def get_all_concepts_with_linked(cls):
 
         """
-        Get all concepts plus their (direct) links to other resources.
+        Get all concepts plus their (direct) links to other resources:
+        everything that mentions or links to them.
         :return:
         """
 
@@ -184,7 +360,7 @@ class Concept(GraphObject):
             CYPHER expressionEngine=interpreted
             MATCH (c: Concept)
             OPTIONAL MATCH (c)<-[]-(n)
-            WITH c as concept, collect(n) as links
+            WITH c as concept, collect(DISTINCT n) as links
             RETURN concept{.*, links: links}
         """
 
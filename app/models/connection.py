@@ -0,0 +1,69 @@
+""" The connection to the graph, opened on first use.
+
+Importing app.models doesn't connect: the connection is opened by the first
+query, from the settings of the app (or Config when there's no app, as in
+manage.py), and warmed up with a trivial query so the first request doesn't
+pay for the handshake. py2neo pools connections and hands each transaction
+its own, so threads don't share one.
+
+Connections don't survive a fork, so a process that finds it was forked
+after the connection was opened opens its own.
+"""
+from typing import Any, Mapping, Optional
+import logging
+import os
+import threading
+from py2neo import Graph
+
+
+class GraphConnection:
+
+    """ Stands in for the Graph, opening it on first use in each process.
+    """
+
+    def __init__(self):
+        self._settings: Optional[Mapping[str, Any]] = None
+        self._graph: Optional[Graph] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def configure(self, settings: Mapping[str, Any]) -> None:
+        """ Use the NEO4J_* settings of an app's config; takes effect on the next connection.
+        """
+        with self._lock:
+            self._settings = settings
+            self._graph = None
+
+    def _connect(self) -> Graph:
+        settings = self._settings
+        if settings is None:
+            from config import Config
+            settings = vars(Config)
+        if not settings.get("NEO4J_PASSWORD"):
+            raise RuntimeError("NEO4J_PASSWORD isn't set")
+
+        graph = Graph(
+            settings["NEO4J_URI"],
+            user=settings["NEO4J_USERNAME"],
+            password=settings["NEO4J_PASSWORD"],
+            init_size=settings["NEO4J_POOL_INIT_SIZE"],
+            max_size=settings["NEO4J_POOL_MAX_SIZE"],
+            max_age=settings["NEO4J_CONNECTION_MAX_AGE"],
+        )
+        graph.evaluate("RETURN 1")
+        logging.debug(f"Connected to {settings['NEO4J_URI']} in process {os.getpid()}")
+        return graph
+
+    def get(self) -> Graph:
+        """ The graph, connected to in this process.
+        """
+        pid = os.getpid()
+        if self._graph is None or self._pid != pid:
+            with self._lock:
+                if self._graph is None or self._pid != pid:
+                    self._graph = self._connect()
+                    self._pid = pid
+        return self._graph
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
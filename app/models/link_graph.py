@@ -0,0 +1,138 @@
+from itertools import groupby
+from typing import Dict, List, Optional
+from py2neo.database import Transaction
+from . import graph
+
+
+# Labels of the nodes content can link to, each found by its slug
+LINK_TARGETS = ("Article", "Note", "Concept", "Link")
+
+
+def sync_links(label: str, key: str, value: str, refs: List[str], tx: Optional[Transaction] = None) -> None:
+
+    """ Bring a node's LINKS_TO edges in line with the links in its content.
+
+    Edges to pages that are no longer linked are deleted and edges to newly
+    linked pages are merged; edges that haven't changed aren't touched.
+    Links to pages that don't exist yet wait on a PendingLink node, and are
+    resolved when the page is created.
+
+    (source)-[:LINKS_TO]->(target)
+    (source)-[:AWAITS]->(:PendingLink { ref: "<label>/<slug>" })
+
+    :param label: Label of the linking node.
+    :param key: Property identifying the linking node.
+    :param value: Value of that property.
+    :param refs: The node's links_to property: "<label>/<slug>" of each linked page.
+    :param tx: Transaction to run on, else each statement commits on its own.
+    """
+
+    sync_all_links(label, key, {value: refs}, tx)
+
+
+def sync_all_links(label: str, key: str, sources: Dict[str, List[str]], tx: Optional[Transaction] = None) -> None:
+
+    """ Sync the LINKS_TO edges of many nodes with one statement per target label.
+
+    :param label: Label of the linking nodes.
+    :param key: Property identifying the linking nodes.
+    :param sources: Value of that property -> the node's links_to property.
+    :param tx: Transaction to run on, else each statement commits on its own.
+    """
+
+    if not sources:
+        return
+    runner = graph if tx is None else tx
+
+    query = f"""
+        UNWIND $sources AS row
+        MATCH (source: {label} {{ {key}: row.value }})-[rel:LINKS_TO]->(target)
+        WHERE NOT any(target_label IN labels(target) WHERE target_label + '/' + target.slug IN row.refs)
+        DELETE rel
+    """
+    runner.run(query, sources=[{"value": value, "refs": refs} for value, refs in sources.items()])
+
+    # Links to pages that no longer exist in the content stop waiting for them
+    query = f"""
+        UNWIND $sources AS row
+        MATCH (source: {label} {{ {key}: row.value }})-[rel:AWAITS]->(pending: PendingLink)
+        WHERE NOT pending.ref IN row.refs
+        DELETE rel
+        WITH DISTINCT pending
+        WHERE NOT ()-[:AWAITS]->(pending)
+        DELETE pending
+    """
+    runner.run(query, sources=[{"value": value, "refs": refs} for value, refs in sources.items()])
+
+    targets = sorted(
+        (*ref.split("/", 1), value)
+        for value, refs in sources.items()
+        for ref in refs
+    )
+    for target, group in groupby(targets, key=lambda target: target[0]):
+        if target not in LINK_TARGETS:
+            continue
+        # Links to pages that don't exist yet wait on a PendingLink, found by its ref when the page is created
+        query = f"""
+            UNWIND $links AS link
+            MATCH (source: {label} {{ {key}: link.value }})
+            OPTIONAL MATCH (target: {target} {{ slug: link.slug }})
+            WITH source, link, COLLECT(target) AS targets
+            FOREACH (linked IN [linked IN targets WHERE linked <> source] |
+                MERGE (source)-[:LINKS_TO]->(linked))
+            FOREACH (_ IN CASE WHEN size(targets) = 0 THEN [1] ELSE [] END |
+                MERGE (pending: PendingLink {{ ref: link.ref }})
+                MERGE (source)-[:AWAITS]->(pending))
+        """
+        runner.run(query, links=[
+            {"value": value, "slug": slug, "ref": f"{target}/{slug}"}
+            for _, slug, value in group
+        ])
+
+
+def resolve_links(label: str, slugs: List[str], tx: Optional[Transaction] = None) -> None:
+
+    """ Add the LINKS_TO edges of pages that linked to nodes before they were created.
+
+    :param label: Label of the new nodes.
+    :param slugs: Slugs of the new nodes.
+    :param tx: Transaction to run on, else the statement commits on its own.
+    """
+
+    if not slugs:
+        return
+
+    # PendingLink.ref is unique, so each new node is one index lookup
+    query = f"""
+        UNWIND $refs AS ref
+        MATCH (pending: PendingLink {{ ref: ref }})
+        MATCH (target: {label} {{ slug: substring(ref, size($prefix)) }})
+        OPTIONAL MATCH (source)-[:AWAITS]->(pending)
+        FOREACH (linking IN CASE WHEN source IS NULL OR source = target THEN [] ELSE [source] END |
+            MERGE (linking)-[:LINKS_TO]->(target))
+        WITH DISTINCT pending
+        DETACH DELETE pending
+    """
+    prefix = f"{label}/"
+    (graph if tx is None else tx).run(query, refs=[prefix + slug for slug in slugs], prefix=prefix)
+
+
+def backfill_pending_links() -> None:
+
+    """ Add the PendingLinks of links stored before unresolved links were tracked.
+
+    Reads every node with links, so it runs once, as a migration.
+    """
+
+    for target in LINK_TARGETS:
+        query = f"""
+            MATCH (source)
+            WHERE any(ref IN source.links_to WHERE ref STARTS WITH $prefix)
+            UNWIND [ref IN source.links_to WHERE ref STARTS WITH $prefix] AS ref
+            OPTIONAL MATCH (existing: {target} {{ slug: substring(ref, size($prefix)) }})
+            WITH source, ref, existing
+            WHERE existing IS NULL
+            MERGE (pending: PendingLink {{ ref: ref }})
+            MERGE (source)-[:AWAITS]->(pending)
+        """
+        graph.run(query, prefix=f"{target}/")
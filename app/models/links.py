@@ -6,8 +6,18 @@ import datetime as dt
 from . import graph
 from py2neo.ogm import GraphObject, Property
 
-from .concept import Concept
-from ..html_parsing.concept_parser import parse_concepts
+from .concept import Concept, auto_linker, concept_matcher
+from .batch import create_all
+from .link_graph import sync_links
+from .queries import queries
+from .upsert import update_properties, write_content
+from ..html_parsing.analysis import DERIVED_FIELDS, analyse
+
+
+LINK_BY_TITLE = queries.register("link_by_title", """
+    MATCH (l: Link { title: $title })
+    RETURN l
+""", title="")
 
 
 class Link(GraphObject):
@@ -24,6 +34,15 @@ class Link(GraphObject):
     last_edited: str = Property()
     timestamp: str = Property()
     slug: str = Property()
+    summary: str = Property()
+    text: str = Property()
+    absolute_content: str = Property()
+    word_count: int = Property()
+    reading_time: int = Property()
+    toc: str = Property()
+    links_to: List[str] = Property()
+    content_hash: str = Property()
+    analysis_version: int = Property()
 
     def __init__(self, url: str, title: str, author: str, content: str):
         self.url = url
@@ -45,88 +64,68 @@ class Link(GraphObject):
         }
 
     @classmethod
-    def update_link(cls, title: str, update_info: Dict[str, Any]) -> bool:
+    def update_link(cls, title: str, update_info: Dict[str, Any]) -> Optional[bool]:
         """ Update a link
-        :return:
-        """
 
-        if not Link.exists(title):
-            return False
+        Unchanged properties are skipped, so re-posting an unchanged link
+        doesn't write to the graph. The link isn't read first: the
+        statements writing it compare the values.
+        :return: True if every property was updated, False if an update failed, None if the link doesn't exist.
+        """
 
         if not update_info:
             return False
 
+        changes = {}
         link_fields = list(vars(Link)["__annotations__"].keys())
         for key, value in update_info.items():
             # Don't allow adding new properties
             if key not in link_fields:
                 continue
-
-            elif key == "content":
-                Link.__update_content(title, value)
-            elif key == "slug" or key == "title":
+            elif key in ("content", "slug", "title") or key in DERIVED_FIELDS:
                 continue
             else:
-                Link.__update_property(title, key, value)
-
-        return True
-
-    @classmethod
-    def __update_property(cls, title: str, key: str, value: Any) -> bool:
+                changes[key] = value
 
-        query = f"""
-            MATCH (link: Link)
-            WHERE link.title = $title
-            SET link.{key} = $value
-        """
-
-        graph.run(query, title=title, value=value)
-        return True
+        if "content" not in update_info:
+            return True if update_properties("Link", "title", title, changes) else None
+        return Link.__update(title, changes, update_info["content"])
 
     @classmethod
-    def __update_content(cls, title: str, content: str) -> bool:
-
-        tx = graph.begin()
-        # 1. Delete concept relationships
-        query = """
-            MATCH (Concept)<-[rel:HAS_CONCEPT]-(Link { title: $title })
-            DELETE rel
-        """
-        graph.run(query, title=title)
-
-        # 2. Update content and last_edited
-        query = """
-            MATCH (a: Link { title: $title })
-            SET a.content = $content
-            SET a.last_edited = $last_edited
-        """
+    def __update(cls, title: str, changes: Dict[str, Any], content: str) -> Optional[bool]:
 
+        properties = analyse(content).properties()
         last_edited = dt.datetime.now().isoformat()
-        graph.run(query, title=title, content=content, last_edited=last_edited)
-        tx.commit()
+        concepts = analyse(content, auto_linker()).concepts
 
-        # 3. Update concept relationships
-        Link.add_related_concepts(title)
+        created = []
+        tx = graph.begin()
+        try:
+            # 1. Update the changed properties
+            if not update_properties("Link", "title", title, changes, tx):
+                tx.rollback()
+                return None
+
+            # 2. Update content, derived fields and last_edited, unless the content is unchanged
+            if write_content("Link", "title", title, content, properties, last_edited, tx):
+                # 3. Update concept and link relationships
+                created = Concept.link_mentions("Link", "title", title, concepts, tx)
+                sync_links("Link", "title", title, properties["links_to"], tx)
+            tx.commit()
+        except Exception as e:
+            tx.rollback()
+            logging.error(f"Failed to update content with exception {e}")
+            return False
+        concept_matcher.add(created)
         return True
 
     @classmethod
     def get_link(cls, title: str) -> Optional[Dict]:
 
         """
-        :return:
-        """
-        if not Link.exists(title):
-            return None
-
-        query = """
-            MATCH (link: Link {title: $title})
-            RETURN link
+        :return: The link's properties, or None if it doesn't exist.
         """
-
-        data = graph.run(query, title=title).data()
-        if not data:
-            return None
-        return dict(data[0]["link"])
+        return queries.fetch(LINK_BY_TITLE, title=title)
 
     @classmethod
     def get_links(cls) -> List["Link"]:
@@ -151,30 +150,14 @@ class Link(GraphObject):
         ]
 
     @classmethod
-    def add_related_concepts(cls, title: str):
+    def create_many(cls, links: List["Link"]) -> List[str]:
 
-        """ Add concept relations to the Article.
-        """
-
-        link = Link.match(graph).where(f"_.title = \'{title}\'").first()
-
-        # Add concept net concepts
-        related_concepts = parse_concepts(link.content)
-        if not related_concepts:
-            return
+        """ Create Links and their relationships in a fixed number of statements.
 
-        # Add concept relations to graph
-        for related_concept in related_concepts:
-
-            rel = Concept(related_concept.name, "")
-            rel.create()
+        :return: Titles of the Links created; existing and repeated titles are skipped.
+        """
 
-            query = """
-                MERGE (related: Concept { name: $related_name })
-                MERGE (link: Link { title: $title })
-                MERGE (link)-[:HAS_CONCEPT { mentions: $mentions }]->(related)
-            """
-            graph.run(query, title=title, mentions=related_concept.mentions, related_name=related_concept.name)
+        return create_all("Link", "title", links)
 
     @classmethod
     def exists(cls, title: str) -> bool:
@@ -185,11 +168,7 @@ class Link(GraphObject):
         :return:
         """
 
-        query = """
-            MATCH (c: Link {title: $title})
-            RETURN c
-        """
-        return graph.evaluate(query, title=title) is not None
+        return queries.evaluate(LINK_BY_TITLE, title=title) is not None
 
     def create(self) -> bool:
 
@@ -198,11 +177,6 @@ class Link(GraphObject):
         :return:
         """
 
-        if Link.exists(self.title):
-            return False
-
-        graph.create(self)
-        Link.add_related_concepts(self.title)
-        return True
+        return bool(Link.create_many([self]))
 
 
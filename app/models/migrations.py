@@ -0,0 +1,81 @@
+""" Versioned schema migrations.
+
+Constraints and indexes are set up by an explicit step rather than when
+app.models is imported, so starting a worker doesn't touch the schema:
+
+    python manage.py migrate
+
+Migrations run in order of version, and the highest version applied is
+stored on a SchemaMigration node, so later runs only apply new migrations.
+Each migration inspects the schema first and only adds what is missing or
+changed, so running one again is harmless.
+"""
+import logging
+from typing import Callable, List, NamedTuple
+from . import graph
+from .link_graph import backfill_pending_links
+from .schema import ensure_constraints, ensure_indexes
+from .search_index import ensure_fts_index
+
+
+def pending_links() -> None:
+    # PendingLink.ref joined the uniqueness constraints
+    ensure_constraints()
+    backfill_pending_links()
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[], None]
+
+
+MIGRATIONS = [
+    Migration(1, "Uniqueness constraints on node keys", ensure_constraints),
+    Migration(2, "Full-text index over article text", ensure_fts_index),
+    Migration(3, "Indexes on slugs", ensure_indexes),
+    Migration(4, "Pending links to pages that don't exist yet", pending_links),
+]
+
+
+def schema_version() -> int:
+
+    """ The highest migration version applied to the graph.
+
+    :return: Version, 0 if none has been applied.
+    """
+
+    query = """
+        MATCH (m: SchemaMigration)
+        RETURN m.version
+    """
+    return graph.evaluate(query) or 0
+
+
+def pending() -> List[Migration]:
+    version = schema_version()
+    return [migration for migration in MIGRATIONS if migration.version > version]
+
+
+def migrate() -> List[int]:
+
+    """ Apply the migrations newer than the graph's schema version.
+
+    The version is recorded after each migration that succeeds. A migration
+    that fails raises before its version is recorded, so the next run
+    resumes from it.
+
+    :return: Versions applied.
+    """
+
+    query = """
+        MERGE (m: SchemaMigration)
+        SET m.version = $version
+    """
+    applied = []
+    for migration in sorted(pending(), key=lambda migration: migration.version):
+        logging.info(f"Applying migration {migration.version}: {migration.description}")
+        migration.apply()
+        graph.run(query, version=migration.version)
+        applied.append(migration.version)
+    return applied
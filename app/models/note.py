@@ -1,9 +1,23 @@
 from py2neo.ogm import GraphObject, Property
 from . import graph
 import datetime as dt
+import logging
+from typing import List, Optional
+from slugify import slugify
 
-from .concept import Concept
-from ..html_parsing.concept_parser import parse_concepts
+from .concept import Concept, auto_linker, concept_matcher
+from .batch import create_all
+from .link_graph import sync_links
+from .queries import queries
+from .upsert import write_content
+from ..html_parsing.analysis import analyse
+from ..html_parsing.images import render_content
+
+
+NOTE_BY_TITLE = queries.register("note_by_title", """
+    MATCH (n: Note { title: $title })
+    RETURN n
+""", title="")
 
 
 class Note(GraphObject):
@@ -18,12 +32,23 @@ class Note(GraphObject):
     timestamp: str = Property()
     last_edited: str = Property()
     slug: str = Property()
+    summary: str = Property()
+    text: str = Property()
+    absolute_content: str = Property()
+    word_count: int = Property()
+    reading_time: int = Property()
+    toc: str = Property()
+    links_to: List[str] = Property()
+    rendered_content: str = Property()
+    content_hash: str = Property()
+    analysis_version: int = Property()
 
     def __init__(self, title: str, content: str) -> None:
         self.title = title
         self.content = content
         self.timestamp = dt.datetime.now().isoformat()
         self.last_edited = self.timestamp
+        self.slug = slugify(title)
 
     def to_dict(self):
         return {
@@ -35,18 +60,7 @@ class Note(GraphObject):
 
     @classmethod
     def get_note(cls, title: str):
-        if not Note.exists(title):
-            return None
-
-        query = """
-            MATCH (note: Note {title: $title})
-            RETURN note
-        """
-
-        data = graph.run(query, title=title).data()
-        if not data:
-            return None
-        return dict(data[0]["note"])
+        return queries.fetch(NOTE_BY_TITLE, title=title)
 
     @classmethod
     def get_public(cls):
@@ -68,45 +82,47 @@ class Note(GraphObject):
         ]
 
     @classmethod
-    def update_note(cls, title: str, content: str) -> bool:
+    def update_note(cls, title: str, content: str) -> Optional[bool]:
 
         """ Update a note
-        :return:
-        """
 
-        if not Note.exists(title):
-            return False
+        Re-posting unchanged content doesn't write to the graph.
+        :return: True on success, False if the update failed, None if the note doesn't exist.
+        """
 
         if not content:
             return False
 
-        Note.__update_content(title, content)
-        return True
+        return Note.__update_content(title, content)
 
     @classmethod
-    def __update_content(cls, title: str, content: str) -> bool:
-
-        tx = graph.begin()
-        # 1. Delete concept relationships
-        query = """
-            MATCH (Concept)<-[rel:HAS_CONCEPT]-(Note { title: $title })
-            DELETE rel
-        """
-        graph.run(query, title=title)
-
-        # 2. Update content and last_edited
-        query = """
-            MATCH (a: Note { title: $title })
-            SET a.content = $content
-            SET a.last_edited = $last_edited
-        """
+    def __update_content(cls, title: str, content: str) -> Optional[bool]:
 
+        analysis = analyse(content)
+        properties = analysis.properties()
+        properties["rendered_content"] = render_content(content, analysis)
+        # Notes created before they had slugs get one here
+        properties["slug"] = slugify(title)
         last_edited = dt.datetime.now().isoformat()
-        graph.run(query, title=title, content=content, last_edited=last_edited)
-        tx.commit()
+        concepts = analyse(content, auto_linker()).concepts
 
-        # 3. Update concept relationships
-        Note.add_related_concepts(title)
+        tx = graph.begin()
+        try:
+            # 1. Update content, derived fields and last_edited, unless the content is unchanged
+            written = write_content("Note", "title", title, content, properties, last_edited, tx)
+            if not written:
+                tx.rollback()
+                return None if written is None else True
+
+            # 2. Update concept and link relationships
+            created = Concept.link_mentions("Note", "title", title, concepts, tx)
+            sync_links("Note", "title", title, properties["links_to"], tx)
+            tx.commit()
+        except Exception as e:
+            tx.rollback()
+            logging.error(f"Failed to update content with exception {e}")
+            return False
+        concept_matcher.add(created)
         return True
 
     def create(self) -> bool:
@@ -114,38 +130,17 @@ class Note(GraphObject):
         """ Create a new Note
         """
 
-        if Note.exists(self.title):
-            return False
-
-        graph.create(self)
-        Note.add_related_concepts(self.title)
-        return True
+        return bool(Note.create_many([self]))
 
     @classmethod
-    def add_related_concepts(cls, title: str):
+    def create_many(cls, notes: List["Note"]) -> List[str]:
 
-        """ Add concept relations to the Article.
-        """
+        """ Create Notes and their relationships in a fixed number of statements.
 
-        note = Note.match(graph).where(f"_.title = \'{title}\'").first()
-
-        # Add concept net concepts
-        related_concepts = parse_concepts(note.content)
-        if not related_concepts:
-            return
-
-        # Add concept relations to graph
-        for related_concept in related_concepts:
-
-            rel = Concept(related_concept.name, "")
-            rel.create()
+        :return: Titles of the Notes created; existing and repeated titles are skipped.
+        """
 
-            query = """
-                MERGE (related: Concept { name: $related_name })
-                MERGE (note: Note { title: $title })
-                MERGE (note)-[:HAS_CONCEPT { mentions: $mentions }]->(related)
-            """
-            graph.run(query, title=title, mentions=related_concept.mentions, related_name=related_concept.name)
+        return create_all("Note", "title", notes, render=True)
 
     @classmethod
     def exists(cls, title: str) -> bool:
@@ -157,9 +152,4 @@ class Note(GraphObject):
         :return: True if exists else False.
         """
 
-        query = """
-            MATCH (p: Note { title: $title })
-            RETURN p
-        """
-
-        return graph.evaluate(query, title=title) is not None
+        return queries.evaluate(NOTE_BY_TITLE, title=title) is not None
@@ -2,12 +2,20 @@ from typing import List
 
 import uuid
 from . import graph
+from .queries import queries
+from .upsert import merge_nodes
 from py2neo.ogm import GraphObject, Property
 import logging
 
 from ..html_parsing.concept_parser import parse_concepts
 
 
+PODCAST_BY_TITLE = queries.register("podcast_by_title", """
+    MATCH (p: Podcast { title: $title })
+    RETURN p
+""", title="")
+
+
 class Podcast(GraphObject):
 
     """Represents a Golden Nuggets Podcast episode.
@@ -56,11 +64,12 @@ class Podcast(GraphObject):
         """ Add concept relations to the Article.
         """
 
-        if not Podcast.exists(title):
+        node = queries.evaluate(PODCAST_BY_TITLE, title=title)
+        if node is None:
             logging.warning(f"Failed to add concepts because Article does not exist")
             return
 
-        note = Podcast.match(graph).where(f"_.title = \'{title}\'").first()
+        note = Podcast.wrap(node)
 
         # Add concept net concepts
         related_concepts = parse_concepts(note.content)
@@ -84,12 +93,7 @@ class Podcast(GraphObject):
         :return: True if exists else False.
         """
 
-        query = """
-            MATCH (p: Podcast { title: $title })
-            RETURN p
-        """
-
-        return graph.evaluate(query, title=title) is not None
+        return queries.evaluate(PODCAST_BY_TITLE, title=title) is not None
 
     def create(self):
 
@@ -98,8 +102,8 @@ class Podcast(GraphObject):
         :return:
         """
 
-        if Podcast.exists(self.title):
+        # Merged on title, so an existing podcast is left alone
+        if not merge_nodes("Podcast", "title", [dict(self.__node__)]):
             return
 
-        graph.create(self)
         logging.debug(f"Created new podcast with uuid {self.uuid}")
@@ -0,0 +1,122 @@
+""" Registry of named, parameterized Cypher statements.
+
+Models register the statements they look nodes up with, and run them by
+name; fetch() returns a node's properties, or None, without checking that
+it exists first. Values are always passed as parameters, so each statement has one
+query text and Neo4j plans it once, however many titles it's run with.
+
+warm() EXPLAINs every statement, so Neo4j has their plans cached before
+they're first run; with WARM_QUERIES on, each process warms them before
+its first request. stats() reports, per statement, how often this process
+ran it and whether this process warmed it. Those are counts kept here, not
+Neo4j's plan cache statistics.
+"""
+from typing import Any, Dict, NamedTuple, Optional
+import logging
+import os
+import threading
+from py2neo.database import Cursor, Transaction
+from . import graph
+
+
+class Statement(NamedTuple):
+    cypher: str
+    # Parameters the statement is warmed with
+    example: Dict[str, Any]
+
+
+class QueryRegistry:
+
+    """ Named statements, and how often this process ran them.
+    """
+
+    def __init__(self):
+        self._statements: Dict[str, Statement] = {}
+        self._warmed = set()
+        self._runs: Dict[str, int] = {}
+        # Process the statements were last warmed in
+        self._warmed_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def register(self, name: str, cypher: str, **example: Any) -> str:
+        """ Add a statement.
+
+        :param name: Name it's run by.
+        :param cypher: Query, taking its values as parameters.
+        :param example: A value of each parameter, for warming it.
+        :return: name
+        """
+        statement = Statement(cypher, example)
+        if self._statements.setdefault(name, statement) != statement:
+            raise ValueError(f"A different statement is already registered as {name}")
+        return name
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._runs[name] = self._runs.get(name, 0) + 1
+
+    def run(self, name: str, tx: Optional[Transaction] = None, **parameters: Any) -> Cursor:
+        """ Run a statement.
+
+        :param name: Name it was registered as.
+        :param tx: Transaction to run it on, else it runs on its own.
+        :param parameters: Its parameters.
+        :return: Cursor of the results.
+        """
+        cypher = self._statements[name].cypher
+        self._count(name)
+        runner = graph if tx is None else tx
+        return runner.run(cypher, parameters)
+
+    def evaluate(self, name: str, tx: Optional[Transaction] = None, **parameters: Any) -> Any:
+        """ Run a statement and return the first value of its first record, or None.
+        """
+        return self.run(name, tx, **parameters).evaluate()
+
+    def fetch(self, name: str, tx: Optional[Transaction] = None, **parameters: Any) -> Optional[Dict[str, Any]]:
+        """ Run a statement returning a node, in one round trip.
+
+        :return: The node's properties, or None if nothing matched.
+        """
+        node = self.evaluate(name, tx, **parameters)
+        return dict(node) if node is not None else None
+
+    def warm(self) -> None:
+        """ EXPLAIN every statement, so its plan is cached before it's run.
+        """
+        for name, statement in self._statements.items():
+            try:
+                graph.run(f"EXPLAIN {statement.cypher}", statement.example).data()
+            except Exception as e:
+                logging.warning(f"Failed to warm statement {name} with exception {e}")
+                continue
+            with self._lock:
+                self._warmed.add(name)
+        logging.debug(f"Warmed {len(self._statements)} statements")
+
+    def warm_once(self) -> None:
+        """ Warm the statements, unless this process already has.
+        """
+        pid = os.getpid()
+        with self._lock:
+            if self._warmed_pid == pid:
+                return
+            self._warmed_pid = pid
+        self.warm()
+
+    def statements(self) -> Dict[str, Statement]:
+        return dict(self._statements)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """ How often this process ran each statement, and whether it warmed it.
+
+        :return: Name -> {"runs": n, "warmed": bool}
+        """
+        with self._lock:
+            return {
+                name: {"runs": self._runs.get(name, 0), "warmed": name in self._warmed}
+                for name in self._statements
+            }
+
+
+queries = QueryRegistry()
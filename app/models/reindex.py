@@ -0,0 +1,163 @@
+""" Re-analyse and relink every content node.
+
+Run after changing the analysis (and bumping ANALYSIS_VERSION) with:
+
+    python manage.py reindex
+
+Nodes are read a batch at a time in order of their key, each batch
+starting after the last key of the one before. The blocks of each batch
+are parsed on a process pool, and each batch is written in one
+transaction. Only nodes whose stored analysis_version is out of date are
+read, so an interrupted run picks up where it stopped when run again.
+
+A forced run reindexes every node, so it instead records the last key it
+wrote on a ReindexCheckpoint node, in the transaction writing the batch,
+and an interrupted forced run resumes after it. The checkpoint is removed
+once the label is done.
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterable, List, Optional
+import logging
+import os
+import time
+from . import graph
+from .backup import CONTENT_TYPES, NODE_KEYS
+from .concept import Concept, auto_linker, concept_matcher
+from .link_graph import sync_all_links
+from ..html_parsing.analysis import ANALYSIS_VERSION, analyse, parse_blocks
+from ..html_parsing.images import render_content
+
+
+REINDEX_BATCH_SIZE = 50
+
+# Labels whose nodes store the html served in place of their content
+RENDERED_LABELS = {"Article", "Note"}
+
+
+def _stale(label: str, force: bool) -> str:
+    key = NODE_KEYS[label]
+    condition = "" if force else "AND (n.analysis_version IS NULL OR n.analysis_version <> $version)"
+    return f"""
+        MATCH (n: {label})
+        WHERE n.{key} IS NOT NULL {condition}
+          AND ($after IS NULL OR n.{key} > $after)
+    """
+
+
+def checkpoint(label: str) -> Optional[str]:
+
+    """ The last key written by an interrupted forced run of the current analysis version.
+
+    :return: Key, or None to start from the first node.
+    """
+
+    query = """
+        MATCH (checkpoint: ReindexCheckpoint { label: $label, version: $version })
+        RETURN checkpoint.after
+    """
+    return graph.evaluate(query, label=label, version=ANALYSIS_VERSION)
+
+
+def clear_checkpoint(label: str) -> None:
+    query = """
+        MATCH (checkpoint: ReindexCheckpoint { label: $label })
+        DELETE checkpoint
+    """
+    graph.run(query, label=label)
+
+
+def _write_batch(label: str, batch: List[dict], executor: Optional[Executor], force: bool) -> None:
+    key = NODE_KEYS[label]
+    contents = [row["content"] or "" for row in batch]
+    if executor is not None:
+        parse_blocks(contents, executor)
+
+    linker = auto_linker()
+    rows = []
+    mentions = {}
+    links = {}
+    for row, content in zip(batch, contents):
+        analysis = analyse(content)
+        properties = analysis.properties()
+        if label in RENDERED_LABELS:
+            properties["rendered_content"] = render_content(content, analysis)
+        rows.append({"key": row["key"], "properties": properties})
+        # A concept's content mentions its own name
+        mentions[row["key"]] = [
+            mention for mention in analyse(content, linker).concepts
+            if label != "Concept" or mention.name != row["key"]
+        ]
+        links[row["key"]] = properties["links_to"]
+
+    query = f"""
+        UNWIND $rows AS row
+        MATCH (n: {label} {{ {key}: row.key }})
+        SET n += row.properties
+    """
+    save_checkpoint = """
+        MERGE (checkpoint: ReindexCheckpoint { label: $label })
+        SET checkpoint.after = $after, checkpoint.version = $version
+    """
+    tx = graph.begin()
+    try:
+        tx.run(query, rows=rows)
+        created = Concept.link_all_mentions(label, key, mentions, tx)
+        sync_all_links(label, key, links, tx)
+        if force:
+            tx.run(save_checkpoint, label=label, after=batch[-1]["key"], version=ANALYSIS_VERSION)
+        tx.commit()
+    except Exception:
+        tx.rollback()
+        raise
+    concept_matcher.add(created)
+
+
+def reindex(labels: Iterable[str] = CONTENT_TYPES, batch_size: int = REINDEX_BATCH_SIZE,
+            workers: Optional[int] = None, force: bool = False) -> int:
+
+    """ Re-analyse content nodes and rewrite their derived fields and relationships.
+
+    :param labels: Labels to reindex, from CONTENT_TYPES.
+    :param batch_size: Nodes parsed and written together.
+    :param workers: Processes parsing content; defaults to one per core, below 2 parses in this process.
+    :param force: True to reindex nodes already analysed by the current version, resuming
+        an interrupted forced run from its checkpoint.
+    :return: Number of nodes reindexed.
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    reindexed = 0
+    try:
+        for label in labels:
+            key = NODE_KEYS[label]
+            after = checkpoint(label) if force else None
+            total = graph.evaluate(_stale(label, force) + "RETURN count(n)", version=ANALYSIS_VERSION, after=after)
+            resuming = f" after {after}" if after is not None else ""
+            logging.info(f"Reindexing {total} {label}s{resuming} on {workers} workers")
+
+            query = _stale(label, force) + f"""
+                WITH n
+                ORDER BY n.{key}
+                LIMIT $batch
+                RETURN n.{key} AS key, n.content AS content
+            """
+            started = time.perf_counter()
+            done = 0
+            while True:
+                batch = graph.run(query, version=ANALYSIS_VERSION, after=after, batch=batch_size).data()
+                if not batch:
+                    break
+                _write_batch(label, batch, executor, force)
+                after = batch[-1]["key"]
+                done += len(batch)
+                rate = done / max(time.perf_counter() - started, 1e-9)
+                logging.info(f"Reindexed {done}/{total} {label}s ({rate:.1f}/s)")
+            if force:
+                clear_checkpoint(label)
+            reindexed += done
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return reindexed
@@ -0,0 +1,142 @@
+""" Constraints and indexes on the properties nodes are looked up by.
+
+Nodes are created with MERGE on their natural key; the uniqueness
+constraints make that safe with concurrent writers and index the keys
+every lookup goes through. Slugs aren't unique, so links and popups find
+their targets through plain indexes. They are added by migrations, see
+migrations.py.
+
+Check that every lookup is an index seek rather than a label scan with:
+
+    python manage.py verify-schema
+"""
+import logging
+from typing import Any, Dict, List, Tuple
+from . import graph
+from .queries import queries as registry
+
+
+UNIQUE_KEYS = [
+    ("Article", "title"),
+    ("Article", "uuid"),
+    ("Concept", "name"),
+    ("Note", "title"),
+    ("Link", "title"),
+    ("Podcast", "title"),
+    ("User", "email"),
+    ("Comment", "uuid"),
+    ("PendingLink", "ref"),
+]
+
+INDEXES = [
+    ("Article", "slug"),
+    ("Concept", "slug"),
+    ("Note", "slug"),
+    ("Link", "slug"),
+]
+
+# Plan operators that read every node of a label, or of the graph
+SCAN_OPERATORS = {"AllNodesScan", "NodeByLabelScan"}
+
+# Lookups that aren't on a single declared key: description -> (query, parameters)
+BATCH_LOOKUPS = {
+    "Concept mentions by name": (
+        "UNWIND $rows AS row MATCH (c: Concept { name: row.name }) RETURN c",
+        {"rows": [{"name": ""}]}
+    ),
+    "Pending links by ref": (
+        "UNWIND $refs AS ref MATCH (pending: PendingLink { ref: ref }) RETURN pending",
+        {"refs": [""]}
+    ),
+    "Link targets by slug": (
+        "UNWIND $links AS link MATCH (target: Article { slug: link.slug }) RETURN target",
+        {"links": [{"slug": ""}]}
+    ),
+}
+
+
+def ensure_constraints() -> None:
+
+    """ Add the uniqueness constraints that don't exist yet.
+
+    A constraint can't be added while its label has duplicate keys; that's
+    logged, and the remaining constraints are still added before raising.
+
+    :raises RuntimeError: If any constraint couldn't be added.
+    """
+
+    failed = []
+    for label, key in UNIQUE_KEYS:
+        existing = [
+            constraint if isinstance(constraint, str) else constraint[0]
+            for constraint in graph.schema.get_uniqueness_constraints(label)
+        ]
+        if key in existing:
+            continue
+        try:
+            graph.schema.create_uniqueness_constraint(label, key)
+        except Exception as e:
+            logging.error(f"Failed to add uniqueness constraint on {label}.{key}, "
+                          f"merge the duplicate {label}s first: {e}")
+            failed.append(f"{label}.{key}")
+    if failed:
+        raise RuntimeError(f"Failed to add uniqueness constraints on {', '.join(failed)}")
+
+
+def ensure_indexes() -> None:
+
+    """ Add the indexes that don't exist yet.
+    """
+
+    for label, key in INDEXES:
+        existing = [tuple(index) for index in graph.schema.get_indexes(label)]
+        if (key,) in existing:
+            continue
+        graph.schema.create_index(label, key)
+
+
+def lookups() -> Dict[str, Tuple[str, Dict[str, Any]]]:
+
+    """ A query looking up nodes by each declared key, the batch lookups and the registered statements.
+
+    :return: Description -> (query, parameters).
+    """
+
+    queries = {
+        f"{label} by {key}": (f"MATCH (n: {label} {{ {key}: $value }}) RETURN n", {"value": ""})
+        for label, key in UNIQUE_KEYS + INDEXES
+    }
+    queries.update(BATCH_LOOKUPS)
+    queries.update({
+        f"Statement {name}": (statement.cypher, statement.example)
+        for name, statement in registry.statements().items()
+    })
+    return queries
+
+
+def plan_operators(plan: Any) -> List[str]:
+
+    """ The operators of a query plan and of its children.
+
+    :param plan: Plan of an EXPLAINed query.
+    :return: Operator names, without the runtime suffix Neo4j 4 adds, e.g. "@neo4j".
+    """
+
+    operator = getattr(plan, "operator_type", None) or plan["operatorType"]
+    children = getattr(plan, "children", None) or plan.get("children", [])
+    return [operator.split("@")[0]] + [name for child in children for name in plan_operators(child)]
+
+
+def verify_lookups() -> Dict[str, List[str]]:
+
+    """ EXPLAIN each lookup and find the ones the planner answers with a scan.
+
+    :return: Description -> operators of each lookup that scans; empty if every lookup seeks an index.
+    """
+
+    scans = {}
+    for description, (query, parameters) in lookups().items():
+        operators = plan_operators(graph.run(f"EXPLAIN {query}", parameters).plan())
+        if SCAN_OPERATORS.intersection(operators):
+            scans[description] = operators
+    return scans
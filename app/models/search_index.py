@@ -0,0 +1,120 @@
+""" Full-text search index over Articles.
+
+The index covers the plain text of articles rather than their html, so tag
+names, attributes and concept markup aren't tokenized.
+
+Rebuild the index and backfill articles that predate the text property with:
+
+    python manage.py rebuild-search-index
+"""
+import logging
+from typing import List
+from . import graph
+from ..html_parsing.analysis import analyse
+
+
+FTS_INDEX = "articleContent"
+FTS_LABELS = ["Article"]
+FTS_PROPERTIES = ["title", "summary", "text"]
+
+BACKFILL_BATCH_SIZE = 100
+
+# Query
+# CALL db.index.fulltext.queryNodes("articleContent", "query") YIELD node, score
+# RETURN node.title, node.description, score
+
+
+def add_fts_index():
+    query = """
+        CALL db.index.fulltext.createNodeIndex($name, $labels, $properties)
+    """
+    graph.run(query, name=FTS_INDEX, labels=FTS_LABELS, properties=FTS_PROPERTIES)
+
+
+def drop_fts_index():
+    query = """
+        CALL db.index.fulltext.drop($name)
+    """
+    graph.run(query, name=FTS_INDEX)
+
+
+def fts_index_properties() -> List[str]:
+
+    """ Get the properties covered by the existing full-text index.
+
+    :return: Property names, or an empty list if there's no index.
+    """
+
+    for index in graph.run("CALL db.indexes()").data():
+        # Neo4j 3.5 calls the column indexName
+        if (index.get("name") or index.get("indexName")) == FTS_INDEX:
+            return list(index["properties"])
+    return []
+
+
+def ensure_fts_index() -> None:
+
+    """ Create the full-text index, replacing it if it covers other properties.
+
+    An index that is already up to date is left alone, so it isn't
+    repopulated on every start.
+    """
+
+    properties = fts_index_properties()
+    if sorted(properties) == sorted(FTS_PROPERTIES):
+        return
+    if properties:
+        drop_fts_index()
+    add_fts_index()
+
+
+def backfill_text(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+
+    """ Set the text property of articles written before it existed.
+
+    Only text is set, so the full analysis still runs on the article's next
+    update.
+
+    :param batch_size: Articles written per transaction.
+    :return: Number of articles updated.
+    """
+
+    query = """
+        MATCH (article: Article)
+        WHERE article.text IS NULL AND article.title IS NOT NULL
+        RETURN article.title AS title, article.content AS content
+        LIMIT $limit
+    """
+    update = """
+        UNWIND $rows AS row
+        MATCH (article: Article { title: row.title })
+        SET article.text = row.text
+    """
+
+    updated = 0
+    while True:
+        rows = graph.run(query, limit=batch_size).data()
+        if not rows:
+            return updated
+        graph.run(update, rows=[
+            {"title": row["title"], "text": analyse(row["content"]).text}
+            for row in rows
+        ])
+        updated += len(rows)
+        logging.info(f"Backfilled text for {updated} articles")
+
+
+def rebuild_fts_index(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+
+    """ Backfill article text, then rebuild the full-text index from scratch.
+
+    :param batch_size: Articles written per transaction.
+    :return: Number of articles backfilled.
+    """
+
+    updated = backfill_text(batch_size)
+    if fts_index_properties():
+        drop_fts_index()
+    add_fts_index()
+    return updated
+
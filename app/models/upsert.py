@@ -0,0 +1,92 @@
+from typing import Any, Dict, List, Optional
+from py2neo.database import Transaction
+from . import graph
+
+
+def merge_nodes(label: str, key: str, nodes: List[Dict[str, Any]], tx: Optional[Transaction] = None) -> List[Any]:
+
+    """ Create the nodes that don't exist yet, in one statement.
+
+    Each node is merged on its key, which a uniqueness constraint backs, so
+    concurrent writers can't create the same node twice and no existence
+    check is needed first. Existing nodes aren't changed.
+
+    :param label: Label of the nodes.
+    :param key: Property identifying the nodes.
+    :param nodes: Properties of each node; keys must be distinct.
+    :param tx: Transaction to run on, else the statement commits on its own.
+    :return: Values of key of the nodes created.
+    """
+
+    if not nodes:
+        return []
+
+    query = f"""
+        UNWIND $nodes AS properties
+        MERGE (n: {label} {{ {key}: properties.{key} }})
+        ON CREATE SET n += properties, n._created = true
+        WITH n, n._created IS NOT NULL AS created
+        REMOVE n._created
+        RETURN n.{key} AS value, created
+    """
+    runner = graph if tx is None else tx
+    return [row["value"] for row in runner.run(query, nodes=nodes).data() if row["created"]]
+
+
+def update_properties(label: str, key: str, value: Any, properties: Dict[str, Any],
+                      tx: Optional[Transaction] = None) -> bool:
+
+    """ Set the properties of a node that differ from the given values, in one statement.
+
+    The node isn't read first: each property is compared and set in the
+    statement, so unchanged properties aren't written.
+
+    :param label: Label of the node.
+    :param key: Property identifying the node.
+    :param value: Its value of key.
+    :param properties: Property name -> new value; names must be fields of the node's model.
+    :param tx: Transaction to run on, else the statement commits on its own.
+    :return: True if the node exists.
+    """
+
+    changes = "\n".join(
+        f"FOREACH (_ IN CASE WHEN n.{name} = $properties.{name} THEN [] ELSE [1] END | "
+        f"SET n.{name} = $properties.{name})"
+        for name in properties
+    )
+    query = f"""
+        MATCH (n: {label} {{ {key}: $value }})
+        {changes}
+        RETURN count(n)
+    """
+    runner = graph if tx is None else tx
+    return bool(runner.evaluate(query, value=value, properties=properties))
+
+
+def write_content(label: str, key: str, value: Any, content: str, properties: Dict[str, Any],
+                  last_edited: str, tx: Transaction) -> Optional[bool]:
+
+    """ Set a node's content and derived properties, unless it already holds the analysis of content.
+
+    Whether the content changed is decided by the statement writing it, from
+    the stored content_hash and analysis_version, so the node isn't read first.
+
+    :param label: Label of the node.
+    :param key: Property identifying the node.
+    :param value: Its value of key.
+    :param content: New content.
+    :param properties: Derived properties, including content_hash and analysis_version.
+    :param last_edited: Timestamp of the edit.
+    :param tx: Transaction to run on.
+    :return: None if the node doesn't exist, False if its content was current, True if written.
+    """
+
+    query = f"""
+        MATCH (n: {label} {{ {key}: $value }})
+        WITH n, coalesce(n.content_hash = $properties.content_hash
+                         AND n.analysis_version = $properties.analysis_version, false) AS current
+        FOREACH (_ IN CASE WHEN current THEN [] ELSE [1] END |
+            SET n += $properties, n.content = $content, n.last_edited = $last_edited)
+        RETURN NOT current
+    """
+    return tx.evaluate(query, value=value, content=content, properties=properties, last_edited=last_edited)
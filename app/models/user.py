@@ -5,6 +5,13 @@ from passlib.handlers import bcrypt
 from py2neo import Node
 from py2neo.ogm import GraphObject, Property
 from app.models import graph
+from app.models.queries import queries
+
+
+USER_BY_EMAIL = queries.register("user_by_email", """
+    MATCH (u: User { email: $email })
+    RETURN u
+""", email="")
 
 
 class User(GraphObject):
@@ -56,8 +63,8 @@ class User(GraphObject):
     def get_user_by_email(cls, email: str) -> "User":
         """ Find a user according to their email address.
         """
-        user = User.match(graph).where(f"_.email = \'{email}\'")
-        return user
+        node = queries.evaluate(USER_BY_EMAIL, email=email)
+        return User.wrap(node) if node is not None else None
 
     @classmethod
     def verify_password(cls, email: str, password: str) -> False:
@@ -76,8 +83,4 @@ class User(GraphObject):
 
         :returns: True if exists else False.
         """
-        query = """
-            MATCH (u: User { email: $email })
-            RETURN u
-        """
-        return (email is not None) and (graph.evaluate(query, email=email) is not None)
+        return (email is not None) and (queries.evaluate(USER_BY_EMAIL, email=email) is not None)
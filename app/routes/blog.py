@@ -1,7 +1,10 @@
-from typing import Dict
+from typing import Any, Dict, Tuple
 
 from app.forms.comment_forms import CommentForm
+from app.coalescer import coalesce
+from app.jobs import ingest
 from app.models.article import Article
+from app.models.batch import init_fields
 
 # flask
 from flask import current_app as app, make_response, url_for
@@ -68,23 +71,46 @@ def handle_articles_post_request():
     if not validate_data(data):
         return {"Message": "Failed. Invalid data."}, 400
 
-    title = data["title"]
+    return ingest("article", data["title"], save_article, data)
 
-    # Update
-    if Article.exists(title):
-        if Article.update_article(title, data):
-            # TODO: return dict
-            return {"Message": "Successfully updated article"}, 201
-        else:
-            return {"Message": f"Failed. Attempt to add link {title} to graph failed."}, 400
 
-    # Create
-    else:
-        article = Article(**data)
+def save_article(data: Dict) -> Tuple[Dict[str, Any], int]:
+
+    """
+    Create or update an article from validated data.
+    Held while coalescing, so only the latest of a burst of posts is parsed and written.
+    :param data:
+    :return: (response body, status code)
+    """
+
+    if coalesce("Article", data["title"], write_article, data):
+        return {"Message": "Queued article update"}, 202
+    return write_article(data)
+
+
+def write_article(data: Dict) -> Tuple[Dict[str, Any], int]:
+
+    """
+    Update an article, creating it when no article has its title.
+    The update goes first, so posting an existing article doesn't pay for a create.
+    :param data:
+    :return: (response body, status code)
+    """
+
+    title = data["title"]
+
+    updated = Article.update_article(title, data)
+    if updated is None:
+        # Merged on title, so an article created concurrently is left alone and updated
+        article = Article(**init_fields(Article, data))
         if article.create():
             return article.to_dict(), 201
-        else:
-            return {"Message": f"Failed. Attempt to add link {title} to graph failed."}, 400
+        updated = Article.update_article(title, data)
+
+    if updated:
+        return {"Message": "Successfully updated article"}, 201
+    else:
+        return {"Message": f"Failed. Attempt to add link {title} to graph failed."}, 400
 
 
 def validate_data(data: Dict) -> bool:
@@ -101,9 +127,10 @@ def validate_data(data: Dict) -> bool:
         return False
     if not data.get("content"):
         return False
-    if not data.get("published"):
+    # Unpublished articles and a confidence of 0 are valid
+    if data.get("published") is None:
         return False
-    if not data.get("finished_confidence"):
+    if data.get("finished_confidence") is None:
         return False
 
     return True
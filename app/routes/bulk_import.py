@@ -0,0 +1,296 @@
+import atexit
+import json
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.html_parsing.analysis import DERIVED_FIELDS, parse_blocks, private_caches
+from app.models.article import Article
+from app.models.batch import init_fields
+from app.models.backup import NODE_KEYS, restore_nodes, restore_relationships, valid_node, valid_relationship
+from app.models.concept import Concept
+from app.models.links import Link
+from app.models.note import Note
+from app.routes import blog, concept, links, note
+
+# flask
+from flask import current_app as app
+from flask import Response, request, stream_with_context
+
+from app.routes.authentication import authenticated
+
+
+class RecordType(NamedTuple):
+
+    """ How one type of imported record is validated and written.
+    """
+
+    model: Any
+    key: str
+    validate: Callable[[Dict], bool]
+    save: Callable[[Dict], Tuple[Dict[str, Any], int]]
+
+
+# Concepts go first, so content mentioning them links to their imported content
+RECORD_TYPES = {
+    "concept": RecordType(Concept, "name", concept.validate_data, concept.write_concept),
+    "article": RecordType(Article, "title", blog.validate_data, blog.write_article),
+    "note": RecordType(Note, "title", note.validate_data, note.write_note),
+    "link": RecordType(Link, "title", links.validate_data, links.write_link),
+}
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def parse_pool() -> Optional[ProcessPoolExecutor]:
+
+    """ The process pool imported content is parsed on, created on first use.
+
+    Its processes are spawned rather than forked, since forking a server
+    process copies whatever locks its other threads hold at the time. The
+    pool is shut down when the process exits.
+
+    :return: ProcessPoolExecutor, or None when IMPORT_WORKERS is below 2.
+    """
+
+    global _pool
+    if app.config["IMPORT_WORKERS"] < 2:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=app.config["IMPORT_WORKERS"],
+                                            mp_context=multiprocessing.get_context("spawn"))
+                atexit.register(shutdown_parse_pool)
+    return _pool
+
+
+def shutdown_parse_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+@app.route("/import", methods=["POST"])
+def bulk_import():
+
+    """
+    Import articles, notes, links and concepts from an NDJSON body.
+
+    Each line is a record with a "type" and the fields its POST endpoint
+    takes, or a node or relationship record of an export. Each line of the
+    response is the result of one record.
+    :return:
+    """
+
+    if not authenticated():
+        return {"Message": "Authorization failed"}, 401
+
+    results = import_records(request.stream, app.config["IMPORT_CHUNK_SIZE"])
+    return Response(stream_with_context(json.dumps(result) + "\n" for result in results),
+                    mimetype="application/x-ndjson")
+
+
+def import_records(lines: Iterable[bytes], chunk_size: int) -> Iterator[Dict[str, Any]]:
+
+    """
+    Import records chunk by chunk, as they are read.
+    :param lines: NDJSON lines.
+    :param chunk_size: Records written together.
+    :return: Result of each record, in order within each chunk.
+    """
+
+    chunk = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        chunk.append((number, line))
+        if len(chunk) >= chunk_size:
+            yield from import_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield from import_chunk(chunk)
+
+
+def result(number: int, kind: Optional[str], key: Optional[str], status: int,
+           message: Optional[str] = None) -> Dict[str, Any]:
+    return {"line": number, "type": kind, "key": key, "status": status, "Message": message}
+
+
+def import_chunk(chunk: List[Tuple[int, bytes]]) -> List[Dict[str, Any]]:
+
+    """
+    Validate a chunk of records, parse their content in parallel and write them.
+
+    New records of each type are created together; records that already
+    exist are updated one by one through their POST endpoint's handler.
+    Content is analysed with caches of the chunk's own, so an import doesn't
+    evict the parses of the documents being served.
+    :param chunk: (line number, line) of each record.
+    :return: Result of each record.
+    """
+
+    with private_caches():
+        return _import_chunk(chunk)
+
+
+def _import_chunk(chunk: List[Tuple[int, bytes]]) -> List[Dict[str, Any]]:
+
+    results = {}
+    records: Dict[str, List[Tuple[int, Dict]]] = {kind: [] for kind in RECORD_TYPES}
+    nodes: List[Tuple[int, Dict]] = []
+    relationships: List[Tuple[int, Dict]] = []
+    for number, line in chunk:
+        try:
+            data = json.loads(line)
+        except ValueError:
+            results[number] = result(number, None, None, 400, "Failed. Invalid JSON.")
+            continue
+
+        kind = data.get("type") if isinstance(data, dict) else None
+        if kind == "node":
+            if valid_node(data):
+                nodes.append((number, data))
+            else:
+                results[number] = result(number, kind, None, 400, "Failed. Invalid data.")
+            continue
+        if kind == "relationship":
+            if valid_relationship(data):
+                relationships.append((number, data))
+            else:
+                results[number] = result(number, kind, None, 400, "Failed. Invalid data.")
+            continue
+        if kind not in RECORD_TYPES:
+            results[number] = result(number, kind, None, 400, "Failed. Unknown record type.")
+            continue
+
+        record_type = RECORD_TYPES[kind]
+        fields = {field: value for field, value in data.items() if field != "type"}
+        if not record_type.validate(fields):
+            results[number] = result(number, kind, fields.get(record_type.key), 400, "Failed. Invalid data.")
+            continue
+        records[kind].append((number, fields))
+
+    pool = parse_pool()
+    if pool is not None:
+        parse_blocks((fields["content"] for kind in records for _, fields in records[kind]), pool)
+
+    for kind, record_type in RECORD_TYPES.items():
+        results.update(import_records_of_type(kind, record_type, records[kind]))
+    results.update(import_nodes(nodes))
+    results.update(import_relationships(relationships))
+
+    return [results[number] for number in sorted(results)]
+
+
+def build(model: Any, fields: Dict) -> Any:
+
+    """
+    Make a model from imported fields.
+
+    Fields the constructor doesn't take, such as the uuid and timestamps of
+    exported records, are set afterwards; derived fields are recomputed.
+    :param model: Model class.
+    :param fields: Record fields.
+    :return: Model instance.
+    """
+
+    arguments = init_fields(model, fields)
+    node = model(**arguments)
+    properties = vars(model).get("__annotations__", {})
+    for field, value in fields.items():
+        if field not in arguments and field in properties and field not in DERIVED_FIELDS:
+            setattr(node, field, value)
+    return node
+
+
+def import_records_of_type(kind: str, record_type: RecordType,
+                           records: List[Tuple[int, Dict]]) -> Dict[int, Dict[str, Any]]:
+    results = {}
+    first = {}
+    for number, fields in records:
+        first.setdefault(fields[record_type.key], number)
+
+    new = {}
+    for number, fields in records:
+        if first[fields[record_type.key]] != number:
+            continue
+        try:
+            new[number] = build(record_type.model, fields)
+        except TypeError:
+            results[number] = result(number, kind, fields[record_type.key], 400, "Failed. Invalid data.")
+
+    try:
+        created = set(record_type.model.create_many(list(new.values()))) if new else set()
+    except Exception as e:
+        logging.error(f"Failed to import {kind}s with exception {e}")
+        for number, fields in records:
+            results[number] = result(number, kind, fields[record_type.key], 500, f"Failed. {e}")
+        return results
+
+    for number, fields in records:
+        key = fields[record_type.key]
+        if number in results:
+            continue
+        if number in new and key in created:
+            results[number] = result(number, kind, key, 201)
+            continue
+        # Existing, or repeated within the chunk
+        try:
+            body, status = record_type.save(fields)
+        except Exception as e:
+            logging.error(f"Failed to import {kind} {key} with exception {e}")
+            body, status = {"Message": f"Failed. {e}"}, 500
+        results[number] = result(number, kind, key, status, body.get("Message") if status >= 400 else None)
+    return results
+
+
+def import_nodes(nodes: List[Tuple[int, Dict]]) -> Dict[int, Dict[str, Any]]:
+    results = {}
+    def label_of(node: Tuple[int, Dict]) -> str:
+        return node[1]["label"]
+
+    for label, group in groupby(sorted(nodes, key=label_of), key=label_of):
+        group = list(group)
+        try:
+            restore_nodes(label, [data["properties"] for _, data in group])
+            status, message = 201, None
+        except Exception as e:
+            logging.error(f"Failed to import {label} nodes with exception {e}")
+            status, message = 500, f"Failed. {e}"
+        for number, data in group:
+            results[number] = result(number, "node", data["properties"][NODE_KEYS[label]], status, message)
+    return results
+
+
+def import_relationships(relationships: List[Tuple[int, Dict]]) -> Dict[int, Dict[str, Any]]:
+    if not relationships:
+        return {}
+    rows = [
+        {
+            "id": number,
+            "relationship": data["relationship"],
+            "start": data["start"],
+            "end": data["end"],
+            "properties": data.get("properties") or {}
+        }
+        for number, data in relationships
+    ]
+    try:
+        written = set(restore_relationships(rows))
+        failure = (404, "Failed. Node not found.")
+    except Exception as e:
+        logging.error(f"Failed to import relationships with exception {e}")
+        written = set()
+        failure = (500, f"Failed. {e}")
+    return {
+        number: result(number, "relationship", data["relationship"], 201) if number in written
+        else result(number, "relationship", data["relationship"], *failure)
+        for number, data in relationships
+    }
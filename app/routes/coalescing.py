@@ -0,0 +1,63 @@
+from typing import Callable, Dict, Hashable, Optional, Tuple
+from flask import current_app as app
+from flask import request
+from slugify import slugify
+
+from app.coalescer import write_coalescer
+
+
+# Documents that mention or link to another, and so show up on its page
+LINKING = ("Article", "Note", "Link", "Concept")
+
+# Endpoint -> labels of the documents its page shows
+READS: Dict[str, Tuple[str, ...]] = {
+    "index": ("Article", "Concept"),
+    "articles": ("Article",),
+    "search": ("Article",),
+    "rss": ("Article",),
+    "notes": ("Note",),
+    "links": ("Link",),
+    # Each concept is listed with everything that mentions or links to it
+    "concepts": LINKING,
+    "export": LINKING,
+}
+
+
+def reads(endpoint: Optional[str], view_args: Dict) -> Optional[Callable[[Hashable], bool]]:
+
+    """
+    Which held updates a GET reads.
+    :param endpoint: Endpoint of the request.
+    :param view_args: Its url arguments.
+    :return: Predicate over coalescer keys, or None if it reads none of them.
+    """
+
+    if endpoint == "article":
+        # Any document, the article itself or one of its backlinks
+        return lambda key: key[0] in LINKING
+    if endpoint == "summary_popup":
+        return lambda key: key[0] == "Article" and slugify(key[1]) == view_args["slug"]
+    if endpoint == "concept_popup":
+        return lambda key: key == ("Concept", view_args["name"])
+    if endpoint in READS:
+        return lambda key: key[0] in READS[endpoint]
+    return None
+
+
+@app.before_request
+def flush_pending_writes():
+
+    """
+    Write the held updates a read shows before it, so a GET sees every update posted before it.
+    Static files and pages that show no documents flush nothing.
+    :return:
+    """
+
+    if request.method not in ("GET", "HEAD"):
+        return
+    coalescer = write_coalescer()
+    if coalescer is None:
+        return
+    predicate = reads(request.endpoint, request.view_args or {})
+    if predicate is not None:
+        coalescer.flush_where(predicate)
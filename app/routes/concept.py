@@ -1,6 +1,9 @@
-from typing import Dict
+from typing import Any, Dict, Tuple
 from itertools import groupby
+from app.coalescer import coalesce
+from app.jobs import ingest
 from app.models.article import Article
+from app.models.batch import init_fields
 from app.models.concept import Concept
 
 # flask
@@ -52,24 +55,49 @@ def handle_concept_post_request():
     if not data:
         return {"Message": "Failed. No data posted."}, 400
 
-    name = data["name"]
-    content = data["content"]
-
     if not validate_data(data):
         return {"Message": "Failed. Invalid data."}, 400
 
-    if Concept.exists(name):
-        if Concept.update_concept(name, content):
-            return Concept.get_concept(name), 201
-        else:
-            return {"Message": f"Failed. Attempt to update concept {name} failed."}, 400
+    return ingest("concept", data["name"], save_concept, data)
 
-    else:
-        l = Concept(**data)
+
+def save_concept(data: Dict) -> Tuple[Dict[str, Any], int]:
+
+    """
+    Create or update a concept from validated data.
+    Held while coalescing, so only the latest of a burst of posts is parsed and written.
+    :param data:
+    :return: (response body, status code)
+    """
+
+    if coalesce("Concept", data["name"], write_concept, data):
+        return {"Message": "Queued concept update"}, 202
+    return write_concept(data)
+
+
+def write_concept(data: Dict) -> Tuple[Dict[str, Any], int]:
+
+    """
+    Update a concept, creating it when no concept has its name.
+    The update goes first, so posting an existing concept doesn't pay for a create.
+    :param data:
+    :return: (response body, status code)
+    """
+
+    name = data["name"]
+
+    updated = Concept.update_concept(name, data["content"])
+    if updated is None:
+        # Merged on name, so a concept created concurrently is left alone and updated
+        l = Concept(**init_fields(Concept, data))
         if l.create():
             return l.to_dict(), 201
-        else:
-            return {"Message": f"Failed. Attempt to add concept {name} to graph failed."}, 400
+        updated = Concept.update_concept(name, data["content"])
+
+    if updated:
+        return Concept.get_concept(name), 201
+    else:
+        return {"Message": f"Failed. Attempt to update concept {name} failed."}, 400
 
 
 def validate_data(data: Dict) -> bool:
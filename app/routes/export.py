@@ -0,0 +1,28 @@
+import json
+
+from app.models.backup import export_records
+
+# flask
+from flask import current_app as app
+from flask import Response, stream_with_context
+
+from app.routes.authentication import authenticated
+
+
+@app.route("/export", methods=["GET"])
+def export():
+
+    """
+    Stream a backup of the content graph as NDJSON.
+
+    The output can be posted back to /import.
+    :return:
+    """
+
+    if not authenticated():
+        return {"Message": "Authorization failed"}, 401
+
+    lines = (json.dumps(record) + "\n" for record in export_records())
+    return Response(stream_with_context(lines),
+                    mimetype="application/x-ndjson",
+                    headers={"Content-Disposition": "attachment; filename=backup.ndjson"})
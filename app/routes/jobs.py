@@ -0,0 +1,23 @@
+from flask import current_app as app
+
+from app.jobs import job_queue
+from app.routes.authentication import authenticated
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job(job_id: str):
+
+    """
+    Report the progress of a queued ingestion.
+    :param job_id:
+    :return:
+    """
+
+    if not authenticated():
+        return {"Message": "Authorization failed"}, 401
+
+    report = job_queue(app).get(job_id)
+    if report is None:
+        return {"Message": f"No job {job_id}"}, 404
+
+    return report, 200
@@ -1,6 +1,9 @@
 # Models
-from typing import Dict
+from typing import Any, Dict, Tuple
 
+from app.coalescer import coalesce
+from app.jobs import ingest
+from app.models.batch import init_fields
 from app.models.links import Link
 
 # flask
@@ -51,22 +54,46 @@ def handle_links_post_request():
     if not validate_data(data):
         return {"Message": "Failed. Invalid data."}, 400
 
-    title = data["title"]
+    return ingest("link", data["title"], save_link, data)
 
-    # Update
-    if Link.exists(title):
-        if Link.update_link(title, data):
-            return Link.get_link(title), 201
-        else:
-            return {"Message": f"Failed. Attempt to update link failed"}, 400
 
-    # Create
-    else:
-        l = Link(**data)
+def save_link(data: Dict) -> Tuple[Dict[str, Any], int]:
+
+    """
+    Create or update a link from validated data.
+    Held while coalescing, so only the latest of a burst of posts is parsed and written.
+    :param data:
+    :return: (response body, status code)
+    """
+
+    if coalesce("Link", data["title"], write_link, data):
+        return {"Message": "Queued link update"}, 202
+    return write_link(data)
+
+
+def write_link(data: Dict) -> Tuple[Dict[str, Any], int]:
+
+    """
+    Update a link, creating it when no link has its title.
+    The update goes first, so posting an existing link doesn't pay for a create.
+    :param data:
+    :return: (response body, status code)
+    """
+
+    title = data["title"]
+
+    updated = Link.update_link(title, data)
+    if updated is None:
+        # Merged on title, so a link created concurrently is left alone and updated
+        l = Link(**init_fields(Link, data))
         if l.create():
             return l.to_dict(), 201
-        else:
-            return {"Message": f"Failed. Attempt to add link {title} to graph failed."}, 400
+        updated = Link.update_link(title, data)
+
+    if updated:
+        return Link.get_link(title), 201
+    else:
+        return {"Message": f"Failed. Attempt to update link failed"}, 400
 
 
 def validate_data(data: Dict) -> bool:
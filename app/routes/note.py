@@ -1,6 +1,9 @@
 # Models
-from typing import Dict
+from typing import Any, Dict, Tuple
 
+from app.coalescer import coalesce
+from app.jobs import ingest
+from app.models.batch import init_fields
 from app.models.note import Note
 
 # flask
@@ -35,31 +38,46 @@ def handle_note_post_request():
     if not validate_data(data):
         return {"Message": "Failed. Invalid data."}, 400
 
-    title = data["title"]
-    content = data["content"]
+    return ingest("note", data["title"], save_note, data)
 
-    # Update
-    if Note.exists(title):
-        Note.update_note(title, content)
-        return Note.get_note(title), 201
 
-    # Create
-    else:
-        l = Note(**data)
-        if l.create():
-            return l.to_dict(), 201
-        else:
-            return {"Message": f"Failed. Attempt to add note {title} to graph failed."}, 400
+def save_note(data: Dict) -> Tuple[Dict[str, Any], int]:
 
+    """
+    Create or update a note from validated data.
+    Held while coalescing, so only the latest of a burst of posts is parsed and written.
+    :param data:
+    :return: (response body, status code)
+    """
 
-def handle_note_get_request():
+    if coalesce("Note", data["title"], write_note, data):
+        return {"Message": "Queued note update"}, 202
+    return write_note(data)
 
-    """ Return notes
-    :return:
+
+def write_note(data: Dict) -> Tuple[Dict[str, Any], int]:
+
+    """
+    Update a note, creating it when no note has its title.
+    The update goes first, so posting an existing note doesn't pay for a create.
+    :param data:
+    :return: (response body, status code)
     """
 
-    notes = Note.get_public()
-    return render_template('notes_page/notes.html', notes=notes)
+    title = data["title"]
+
+    updated = Note.update_note(title, data["content"])
+    if updated is None:
+        # Merged on title, so a note created concurrently is left alone and updated
+        l = Note(**init_fields(Note, data))
+        if l.create():
+            return l.to_dict(), 201
+        updated = Note.update_note(title, data["content"])
+
+    if updated:
+        return Note.get_note(title), 201
+    else:
+        return {"Message": f"Failed. Attempt to update note {title} failed."}, 400
 
 
 def validate_data(data: Dict) -> bool:
@@ -1,10 +1,8 @@
 import html
 
-# db
-from app.models import graph
-
 # models
-from app.models.article import Article
+from app.models.article import ARTICLE_BY_SLUG, Article
+from app.models.queries import queries
 from app.models.concept import Concept
 
 # flask
@@ -29,7 +27,8 @@ def summary_popup(slug: str):
     """ Bootstrap popover content for Article links.
     """
 
-    article = Article.match(graph).where(f"_.slug = \'{slug}\'").first()
-    if article:
+    node = queries.evaluate(ARTICLE_BY_SLUG, slug=slug)
+    if node is not None:
+        article = Article.wrap(node)
         return render_template('article/article_popup.html', article=article)
 
@@ -0,0 +1,31 @@
+from flask import current_app as app
+
+from app.models.queries import queries
+from app.routes.authentication import authenticated
+
+
+@app.before_request
+def warm_statements():
+
+    """
+    With WARM_QUERIES on, cache the plans of the registered statements before this process's first request.
+    Warming here rather than in create_app keeps the connection lazy.
+    :return:
+    """
+
+    if app.config["WARM_QUERIES"]:
+        queries.warm_once()
+
+
+@app.route("/queries/stats", methods=["GET"])
+def query_stats():
+
+    """
+    Report how often this process ran each registered statement, and whether it warmed it.
+    :return:
+    """
+
+    if not authenticated():
+        return {"Message": "Authorization failed"}, 401
+
+    return queries.stats(), 200
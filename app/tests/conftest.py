@@ -1,7 +1,13 @@
+import os
+# The password of the local test database; set NEO4J_PASSWORD to use another
+os.environ.setdefault("NEO4J_PASSWORD", "helloworld")
+
 import pytest
+from py2neo.database import Transaction
 from app import create_app
 from app.models import graph
 from app.models.concept import Concept
+from app.models.migrations import migrate
 
 
 def create_concepts():
@@ -27,8 +33,24 @@ def test_client():
 def test_graph():
     # Clean db
     graph.evaluate("MATCH (n) DETACH DELETE n")
+    migrate()
 
     yield graph
 
     graph.evaluate("MATCH (n) DETACH DELETE n")
 
+
+
+@pytest.fixture
+def query_log(monkeypatch):
+    """ Record every Cypher statement sent to the graph.
+    """
+    statements = []
+    run = Transaction.run
+
+    def logged_run(self, cypher, *args, **kwargs):
+        statements.append(cypher)
+        return run(self, cypher, *args, **kwargs)
+
+    monkeypatch.setattr(Transaction, "run", logged_run)
+    return statements
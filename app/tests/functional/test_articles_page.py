@@ -102,3 +102,202 @@ def test_post_update_article(test_client):
     data = response.json
     assert data["content"] == content
     assert data["finished_confidence"] == finished_confidence
+
+
+def test_post_article_links_to_article(test_client, test_graph):
+    """
+    GIVEN an article
+    WHEN another article linking to it is posted, then edited to drop the link
+    THEN the LINKS_TO edge is added, shown as a backlink, then removed
+    """
+
+    def post(title, content):
+        return test_client.post('/articles', json={
+            "title": title,
+            "author": "Jamesb",
+            "content": content,
+            "published": True,
+            "finished_confidence": 5
+        })
+
+    post("Linked Article", "Some content.")
+    post("Linking Article", "<p>See <a href='/articles/linked-article'>this</a>.</p>")
+
+    query = """
+        MATCH (:Article { title: "Linking Article" })-[rel:LINKS_TO]->(:Article { title: "Linked Article" })
+        RETURN count(rel)
+    """
+    assert test_graph.evaluate(query) == 1
+
+    response = test_client.get('/articles/linked-article')
+    assert response.status_code == 200
+    assert b"Linking Article" in response.data
+
+    post("Linking Article", "<p>No links any more.</p>")
+    assert test_graph.evaluate(query) == 0
+
+
+def test_post_article_links_to_missing_note(test_client, test_graph):
+    """
+    GIVEN an article linking to a note that doesn't exist yet
+    WHEN the note is created
+    THEN the link waits on a PendingLink, then becomes a LINKS_TO edge
+    """
+
+    test_client.post('/articles', json={
+        "title": "Early Article",
+        "author": "Jamesb",
+        "content": "<p>See <a href='/notes#later-note'>this</a>.</p>",
+        "published": True,
+        "finished_confidence": 5
+    })
+
+    pending = """
+        MATCH (:Article { title: "Early Article" })-[:AWAITS]->(pending: PendingLink { ref: "Note/later-note" })
+        RETURN count(pending)
+    """
+    assert test_graph.evaluate(pending) == 1
+
+    test_client.post('/notes', json={
+        "title": "Later Note",
+        "content": "Some content."
+    })
+
+    query = """
+        MATCH (:Article { title: "Early Article" })-[rel:LINKS_TO]->(:Note { title: "Later Note" })
+        RETURN count(rel)
+    """
+    assert test_graph.evaluate(query) == 1
+    assert test_graph.evaluate("MATCH (pending: PendingLink) RETURN count(pending)") == 0
+
+
+def test_search_matches_text_not_markup(test_client):
+    """
+    GIVEN an article whose html has markup around its text
+    WHEN articles are searched
+    THEN words from its text match, words only found in the markup don't
+    """
+
+    from app.models.article import Article
+
+    test_client.post('/articles', json={
+        "title": "Searchable Article",
+        "author": "Jamesb",
+        "content": "<p class='callout'>About <span class='concept' name='Zettelkasten'>slip boxes</span>.</p>",
+        "published": True,
+        "finished_confidence": 5
+    })
+
+    def titles(search):
+        results = Article.paginate_search(search=search, endpoint="search", testing=True)
+        return [article.title for article in results.data]
+
+    assert "Searchable Article" in titles("slip")
+    assert "Searchable Article" not in titles("callout")
+
+
+def test_post_article_concepts_cost_constant_queries(test_client, query_log):
+    """
+    GIVEN articles mentioning 2 and 80 new concepts
+    WHEN they are posted
+    THEN both take the same number of statements (each concept used to take
+    several: an exists check, the concept merge, its own concept lookup,
+    link resolution and the relationship merge)
+    """
+
+    def post(title, count):
+        content = "".join(f"<p>About <span class='concept' name='{title} {i}'>c{i}</span>.</p>"
+                          for i in range(count))
+        query_log.clear()
+        response = test_client.post('/articles', json={
+            "title": title,
+            "author": "Jamesb",
+            "content": content,
+            "published": True,
+            "finished_confidence": 5
+        })
+        assert response.status_code == 201
+        return len(query_log)
+
+    few = post("Few Concepts", 2)
+    many = post("Many Concepts", 80)
+
+    assert many == few
+    assert many < 80
+
+
+def test_post_update_article_only_changes_edited_concepts(test_client, test_graph):
+    """
+    GIVEN an article mentioning two concepts
+    WHEN a typo is fixed, then one concept is replaced
+    THEN the unchanged concept keeps its relationship, the other's is replaced
+    """
+
+    def post(content):
+        return test_client.post('/articles', json={
+            "title": "Edited Article",
+            "author": "Jamesb",
+            "content": content,
+            "published": True,
+            "finished_confidence": 5
+        })
+
+    def relationships():
+        query = """
+            MATCH (:Article { title: "Edited Article" })-[rel:HAS_CONCEPT]->(concept: Concept)
+            RETURN concept.name AS name, id(rel) AS id, rel.mentions AS mentions
+        """
+        return {row["name"]: row for row in test_graph.run(query).data()}
+
+    kept = "<p>All about <span class='concept' name='Incremental Reading'>IR</span>.</p>"
+    post(kept + "<p>Sme <span class='concept' name='Priority Queue'>queues</span>.</p>")
+    before = relationships()
+
+    post(kept + "<p>Some <span class='concept' name='Priority Queue'>queues</span>.</p>")
+    after = relationships()
+    assert after["Incremental Reading"] == before["Incremental Reading"]
+    assert after["Priority Queue"]["id"] == before["Priority Queue"]["id"]
+    assert after["Priority Queue"]["mentions"] != before["Priority Queue"]["mentions"]
+
+    post(kept + "<p>Some <span class='concept' name='Memory'>memory</span>.</p>")
+    after = relationships()
+    assert sorted(after) == ["Incremental Reading", "Memory"]
+    assert after["Incremental Reading"] == before["Incremental Reading"]
+
+
+def test_post_update_article_is_atomic(test_client, test_graph, monkeypatch):
+    """
+    GIVEN an article
+    WHEN its content is updated and relinking fails part way through
+    THEN neither its content nor its concept relationships change
+    """
+
+    import app.models.article
+
+    def post(content):
+        return test_client.post('/articles', json={
+            "title": "Atomic Article",
+            "author": "Jamesb",
+            "content": content,
+            "published": True,
+            "finished_confidence": 5
+        })
+
+    def state():
+        query = """
+            MATCH (article: Article { title: "Atomic Article" })
+            OPTIONAL MATCH (article)-[:HAS_CONCEPT]->(concept: Concept)
+            RETURN article.content AS content, collect(concept.name) AS concepts
+        """
+        return test_graph.run(query).data()
+
+    post("<p>About <span class='concept' name='Atomicity'>atomicity</span>.</p>")
+    before = state()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("Lost connection")
+
+    monkeypatch.setattr(app.models.article, "sync_links", fail)
+    post("<p>About <span class='concept' name='Isolation'>isolation</span>.</p>")
+
+    assert state() == before
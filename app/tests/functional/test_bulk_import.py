@@ -0,0 +1,102 @@
+import json
+from app.models.article import Article
+from app.models.concept import Concept
+from app.models.note import Note
+
+
+def test_post_bulk_import(test_client):
+    """
+    GIVEN an NDJSON body of concepts, articles and notes, with one invalid and one repeated record
+    WHEN it is posted to '/import'
+    THEN each record gets a result line and the valid ones are written
+    """
+
+    records = [
+        {"type": "article", "title": "Imported Article", "author": "Jamesb", "published": True,
+         "finished_confidence": 5,
+         "content": "<p>About <span class='concept' name='Imported Concept'>it</span>.</p>"},
+        {"type": "concept", "name": "Imported Concept", "content": "A concept with content."},
+        {"type": "note", "title": "Imported Note", "content": "First version."},
+        {"type": "note", "title": "Imported Note", "content": "Second version."},
+        {"type": "note", "content": "No title."},
+        {"type": "podcast", "title": "Unknown"},
+    ]
+    body = "\n".join(json.dumps(record) for record in records) + "\nnot json\n"
+
+    response = test_client.post('/import', data=body, content_type="application/x-ndjson")
+
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [(result["line"], result["status"]) for result in results] == [
+        (1, 201), (2, 201), (3, 201), (4, 201), (5, 400), (6, 400), (7, 400)
+    ]
+
+    assert Article.exists("Imported Article")
+    assert Concept.get_concept("Imported Concept")["content"] == "A concept with content."
+    assert Note.get_note("Imported Note")["content"] == "Second version."
+
+
+def test_export_reimports(test_client, test_graph):
+    """
+    GIVEN content, a podcast and their relationships
+    WHEN the graph is exported, emptied and the export is imported
+    THEN the same nodes and relationships are back
+    """
+
+    test_client.post('/import', data="\n".join(json.dumps(record) for record in [
+        {"type": "article", "title": "Exported Article", "author": "Jamesb", "published": False,
+         "finished_confidence": 0,
+         "content": "<p>About <span class='concept' name='Exported Concept'>it</span>.</p>"},
+        {"type": "note", "title": "Exported Note", "content": "<a href='/articles/exported-article'>See</a>"},
+        {"type": "node", "label": "Podcast", "properties": {"title": "Exported Podcast", "url": "https://example.com"}},
+        {"type": "relationship", "relationship": "HAS_CONCEPT",
+         "start": {"label": "Podcast", "key": "Exported Podcast"},
+         "end": {"label": "Concept", "key": "Exported Concept"}, "properties": {}},
+    ]), content_type="application/x-ndjson")
+
+    def snapshot():
+        nodes = test_graph.run("""
+            MATCH (n) RETURN labels(n) AS labels, n.title AS title, n.name AS name, n.uuid AS uuid,
+                             n.timestamp AS timestamp
+            ORDER BY title, name
+        """).data()
+        relationships = test_graph.run("""
+            MATCH (a)-[r]->(b) RETURN type(r) AS type, coalesce(a.title, a.name) AS a, coalesce(b.title, b.name) AS b
+            ORDER BY type, a, b
+        """).data()
+        return nodes, relationships
+
+    before = snapshot()
+    response = test_client.get('/export')
+    assert response.status_code == 200
+    backup = response.data.decode()
+    assert all(json.loads(line)["type"] for line in backup.splitlines())
+    assert "absolute_content" not in backup
+
+    test_graph.evaluate("MATCH (n) DETACH DELETE n")
+    response = test_client.post('/import', data=backup, content_type="application/x-ndjson")
+    results = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert all(result["status"] == 201 for result in results)
+
+    assert snapshot() == before
+
+
+def test_export_pages_through_nodes(test_client):
+    """
+    GIVEN several notes linking to each other
+    WHEN the graph is exported a node at a time
+    THEN the records are the same as exporting it in one page
+    """
+
+    from app.models.backup import export_records
+
+    test_client.post('/import', data="\n".join(json.dumps(record) for record in [
+        {"type": "note", "title": f"Paged Note {i}", "content": f"<a href='/notes#paged-note-{(i + 1) % 3}'>Next</a>"}
+        for i in range(3)
+    ]), content_type="application/x-ndjson")
+
+    records = list(export_records(batch_size=1))
+    assert records == list(export_records())
+    assert [record["title"] for record in records if record.get("title", "").startswith("Paged")] == \
+        ["Paged Note 0", "Paged Note 1", "Paged Note 2"]
+    assert not any("word_count" in record for record in records)
@@ -65,3 +65,68 @@ def test_post_update_concept(test_client):
     assert response.status_code == 201
     assert response.json["name"] == name
     assert response.json["content"] == content
+
+
+def test_post_empty_concept_created_by_mention(test_client, test_graph):
+    """
+    GIVEN a concept created by a mention, so it has no content
+    WHEN it is posted again without content, as when re-importing concepts
+    THEN the post succeeds and leaves the concept as it is
+    """
+
+    test_client.post('/concepts', json={
+        "name": "Integration",
+        "content": "Integrations join <span name='Mental Unit' class='concept'>mental units</span>."
+    })
+
+    response = test_client.post('/concepts', json={"name": "Mental Unit", "content": ""})
+
+    assert response.status_code == 201
+    assert response.json["name"] == "Mental Unit"
+
+
+def test_create_many_interlinked_concepts(test_graph, query_log):
+    """
+    GIVEN concepts that each mention the next, with the last mentioning the first
+    WHEN they are created together
+    THEN every concept and relationship is written in a bounded number of statements
+    """
+
+    def concepts(prefix, count):
+        return [
+            Concept(f"{prefix} {i}",
+                    f"Leads to <span class='concept' name='{prefix} {(i + 1) % count}'>the next</span>.")
+            for i in range(count)
+        ]
+
+    query_log.clear()
+    assert len(Concept.create_many(concepts("Small Cycle", 3))) == 3
+    few = len(query_log)
+
+    query_log.clear()
+    assert len(Concept.create_many(concepts("Large Cycle", 500))) == 500
+    assert len(query_log) == few
+
+    query = """
+        MATCH (:Concept { name: "Large Cycle 499" })-[:HAS_CONCEPT]->(c: Concept)
+        RETURN c.name
+    """
+    assert test_graph.evaluate(query) == "Large Cycle 0"
+    assert test_graph.evaluate("MATCH (c: Concept) WHERE c.name STARTS WITH 'Large Cycle' RETURN count(c)") == 500
+
+
+def test_concurrent_creates_make_one_concept(test_graph):
+    """
+    GIVEN the same new concept
+    WHEN it is created from several threads at once
+    THEN one node is created and one create reports it
+    """
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    name = "Concurrency"
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        created = list(executor.map(lambda _: Concept(name, "Many things at once.").create(), range(8)))
+
+    assert created.count(True) == 1
+    assert test_graph.evaluate("MATCH (c: Concept { name: $name }) RETURN count(c)", name=name) == 1
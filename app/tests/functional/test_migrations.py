@@ -0,0 +1,59 @@
+import pytest
+from app.models import migrations
+from app.models.migrations import MIGRATIONS, Migration, migrate, schema_version
+from app.models.schema import verify_lookups
+from app.models.search_index import FTS_PROPERTIES, fts_index_properties
+
+
+def test_migrate_applies_only_pending(test_graph):
+    """
+    GIVEN a graph migrated to the latest version
+    WHEN migrations are run again
+    THEN nothing is applied
+    """
+
+    assert schema_version() == MIGRATIONS[-1].version
+    assert migrate() == []
+
+
+def test_migrate_keeps_existing_index(test_graph, query_log):
+    """
+    GIVEN a graph with the constraints and full-text index but no recorded version
+    WHEN migrations are run
+    THEN every migration is recorded without dropping or recreating the index
+    """
+
+    test_graph.run("MATCH (m: SchemaMigration) DELETE m")
+    assert schema_version() == 0
+
+    assert migrate() == [migration.version for migration in MIGRATIONS]
+    assert sorted(fts_index_properties()) == sorted(FTS_PROPERTIES)
+    assert not any("db.index.fulltext" in statement for statement in query_log)
+
+
+def test_failed_migration_is_not_recorded(test_graph, monkeypatch):
+    """
+    GIVEN a pending migration that fails
+    WHEN migrations are run
+    THEN the error is raised and the schema version stays where it was
+    """
+
+    def fail():
+        raise RuntimeError("Duplicate keys")
+
+    version = schema_version()
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS + [Migration(version + 1, "Fails", fail)])
+
+    with pytest.raises(RuntimeError):
+        migrate()
+    assert schema_version() == version
+
+
+def test_lookups_seek_indexes(test_graph):
+    """
+    GIVEN a migrated graph
+    WHEN each lookup by a declared key is explained
+    THEN none scans a label
+    """
+
+    assert verify_lookups() == {}
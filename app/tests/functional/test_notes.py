@@ -66,3 +66,106 @@ def test_post_update_note(test_client, test_graph):
     data = response.json
     assert data["title"] == title
     assert data["content"] == content
+
+
+def test_post_unchanged_note_skips_update(test_client, test_graph):
+    """
+    GIVEN an existing note
+    WHEN the same note is posted again
+    THEN the stored note isn't rewritten
+    """
+
+    title = "Unchanged note"
+    content = "A note about <span class='concept' name='Spaced Repetition'>spaced repetition</span>."
+
+    created = test_client.post('/notes', json={"title": title, "content": content}).json
+    response = test_client.post('/notes', json={"title": title, "content": content})
+
+    assert response.status_code == 201
+    assert response.json["last_edited"] == created["last_edited"]
+
+
+def test_post_note_async_ingestion(test_client, monkeypatch):
+    """
+    GIVEN a Flask application with ASYNC_INGESTION on
+    WHEN a note is posted
+    THEN the post returns 202 with a job, which reports the note once it's written
+    """
+
+    from flask import current_app
+    from app.jobs import job_queue
+    from app.models.note import Note
+
+    monkeypatch.setitem(current_app.config, "ASYNC_INGESTION", True)
+
+    response = test_client.post('/notes', json={
+        "title": "A queued note",
+        "content": "Written by a worker."
+    })
+
+    assert response.status_code == 202
+    location = response.headers["Location"]
+    assert location == f"/jobs/{response.json['id']}"
+
+    job_queue(current_app).shutdown()
+    job = test_client.get(location).json
+    assert job["status"] == "succeeded"
+    assert job["status_code"] == 201
+    assert job["run_time"] is not None
+    assert Note.exists("A queued note")
+
+    assert test_client.get("/jobs/unknown").status_code == 404
+
+
+def test_post_note_updates_coalesced(test_client, monkeypatch):
+    """
+    GIVEN a Flask application with a COALESCE_WINDOW
+    WHEN a note is updated twice in quick succession
+    THEN both updates are held, and the next GET shows the latest one
+    """
+
+    from flask import current_app
+    from app.models.note import Note
+
+    test_client.post('/notes', json={"title": "An autosaved note", "content": "Draft 1"})
+    monkeypatch.setitem(current_app.config, "COALESCE_WINDOW", 60)
+
+    for content in ("Draft 2", "Draft 3"):
+        response = test_client.post('/notes', json={"title": "An autosaved note", "content": content})
+        assert response.status_code == 202
+    assert Note.get_note("An autosaved note")["content"] == "Draft 1"
+
+    response = test_client.get('/notes')
+    assert response.status_code == 200
+    assert b"Draft 3" in response.data
+    assert Note.get_note("An autosaved note")["content"] == "Draft 3"
+
+
+def test_held_note_update_shows_on_linked_article(test_client, monkeypatch):
+    """
+    GIVEN a note update held by the coalescer that links the note to an article
+    WHEN the article's page is requested
+    THEN the update is written first, so the page lists the note as a backlink
+    """
+
+    from flask import current_app
+
+    test_client.post('/articles', json={
+        "title": "A backlinked article",
+        "author": "Test",
+        "content": "An article that a note links to.",
+        "published": True,
+        "finished_confidence": 5
+    })
+    test_client.post('/notes', json={"title": "A linking note", "content": "Draft"})
+    monkeypatch.setitem(current_app.config, "COALESCE_WINDOW", 60)
+
+    response = test_client.post('/notes', json={
+        "title": "A linking note",
+        "content": "See <a href='/articles/a-backlinked-article'>the article</a>."
+    })
+    assert response.status_code == 202
+
+    response = test_client.get('/articles/a-backlinked-article')
+    assert response.status_code == 200
+    assert b"A linking note" in response.data
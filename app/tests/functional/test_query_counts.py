@@ -0,0 +1,39 @@
+import pytest
+from app.models.article import Article
+from app.models.concept import Concept
+from app.models.links import Link
+from app.models.note import Note
+
+
+@pytest.fixture(scope="module")
+def content(test_client):
+    Concept("Counted Concept", "Mentioned by the counted article.").create()
+    Article("Counted Article", "About the <span class='concept' name='Counted Concept'>concept</span>.",
+            finished_confidence=3, published=True).create()
+    Note("Counted Note", "A note.").create()
+    Link("https://example.com", "Counted Link", "Someone", "A link.").create()
+
+
+@pytest.mark.parametrize("url, queries", [
+    ("/", 2),
+    ("/articles", 2),
+    ("/articles/counted-article", 1),
+    ("/article/counted-article/popup", 1),
+    ("/concepts/Counted Concept/popup", 1),
+    ("/notes", 1),
+    ("/links", 1),
+    ("/podcasts", 1),
+    ("/rss", 1),
+])
+def test_route_query_count(test_client, content, query_log, url, queries):
+    """
+    GIVEN stored content
+    WHEN a page is requested
+    THEN it is read in a fixed number of queries, without existence checks
+    """
+
+    query_log.clear()
+    response = test_client.get(url)
+
+    assert response.status_code == 200
+    assert len(query_log) == queries
@@ -0,0 +1,50 @@
+from app.html_parsing.analysis import ANALYSIS_VERSION
+from app.models.reindex import reindex
+
+
+def test_reindex_stale_nodes(test_client, test_graph):
+    """
+    GIVEN notes analysed by an older version of the analysis
+    WHEN the content graph is reindexed on a process pool
+    THEN their derived fields and concept relationships are rewritten, and a second run has nothing to do
+    """
+
+    for i in range(3):
+        test_client.post('/notes', json={
+            "title": f"Stale Note {i}",
+            "content": f"<p>Note {i} about <span class='concept' name='Reindexing'>reindexing</span>.</p>"
+        })
+    test_graph.run("""
+        MATCH (note: Note)-[rel:HAS_CONCEPT]->()
+        WHERE note.title STARTS WITH 'Stale Note'
+        DELETE rel
+        SET note.analysis_version = 0, note.text = ''
+    """)
+
+    assert reindex(["Note"], batch_size=2, workers=2) >= 3
+
+    query = """
+        MATCH (note: Note)-[:HAS_CONCEPT]->(:Concept { name: 'Reindexing' })
+        WHERE note.title STARTS WITH 'Stale Note' AND note.analysis_version = $version AND note.text <> ''
+        RETURN count(note)
+    """
+    assert test_graph.evaluate(query, version=ANALYSIS_VERSION) == 3
+    assert reindex(["Note"], workers=2) == 0
+
+
+def test_forced_reindex_resumes_from_checkpoint(test_client, test_graph):
+    """
+    GIVEN a forced reindex interrupted after writing a note
+    WHEN it is run again
+    THEN it only reindexes the notes after that one, and removes its checkpoint
+    """
+
+    for i in range(3):
+        test_client.post('/notes', json={"title": f"Forced Note {i}", "content": f"<p>Note {i}.</p>"})
+    test_graph.run("""
+        CREATE (:ReindexCheckpoint { label: 'Note', after: 'Forced Note 0', version: $version })
+    """, version=ANALYSIS_VERSION)
+    remaining = test_graph.evaluate("MATCH (note: Note) WHERE note.title > 'Forced Note 0' RETURN count(note)")
+
+    assert reindex(["Note"], batch_size=2, workers=1, force=True) == remaining
+    assert test_graph.evaluate("MATCH (checkpoint: ReindexCheckpoint) RETURN count(checkpoint)") == 0
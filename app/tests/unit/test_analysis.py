@@ -0,0 +1,174 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+from app.html_parsing.analysis import ANALYSIS_VERSION, analyse, analysis_cache, block_cache, is_current, parse_blocks, \
+    private_caches
+from app.html_parsing.concept_matcher import ConceptMatcher
+from app.html_parsing.concept_parser import html_to_text, parse_concepts
+from app.html_parsing.summary_parser import parse_summary
+
+
+CONTENT = ("<summary>A short summary.</summary>"
+           "<h2 id='intro'>Intro</h2>"
+           "<p>Read <a href='/articles/other'>this</a> about "
+           "<span class='concept' name='SuperMemo'>SuperMemo</span>.</p>"
+           "<img src='/static/images/item_icon.jpg'>")
+
+
+def test_analyse_matches_individual_parsers():
+    """
+    GIVEN html content
+    WHEN it is analysed
+    THEN the results match the individual parsers
+    """
+
+    analysis = analyse(CONTENT)
+
+    assert analysis.summary == parse_summary(CONTENT)
+    assert analysis.text == html_to_text(CONTENT)
+    assert [c.name for c in analysis.concepts] == [c.name for c in parse_concepts(CONTENT)]
+
+
+def test_analyse_mentions_end_with_their_block():
+    analysis = analyse(CONTENT)
+
+    assert analysis.concepts[0].mentions == [
+        "Read this about <span class='concept' name='SuperMemo'>SuperMemo</span>."
+    ]
+
+
+def test_analyse_derived_fields():
+    analysis = analyse(CONTENT)
+
+    assert analysis.word_count == 8
+    assert analysis.reading_time == 1
+    assert analysis.toc == [{"level": 2, "title": "Intro", "anchor": "intro"}]
+    assert 'href="https://experimental-learning.com/articles/other"' in analysis.absolute_content
+    assert 'src="https://experimental-learning.com/static/images/item_icon.jpg"' in analysis.absolute_content
+    assert json.loads(analysis.properties()["toc"]) == analysis.toc
+
+
+def test_is_current():
+    properties = analyse(CONTENT).properties()
+
+    assert is_current(properties, CONTENT)
+    assert not is_current(properties, CONTENT + "<p>More.</p>")
+    assert not is_current({**properties, "analysis_version": ANALYSIS_VERSION - 1}, CONTENT)
+
+
+def test_analyse_only_reparses_changed_blocks():
+    """
+    GIVEN an analysed document
+    WHEN one of its paragraphs changes
+    THEN only that paragraph is parsed again and its mentions are merged with the rest
+    """
+
+    paragraphs = [f"<p>Paragraph {i} about <span class='concept' name='SuperMemo'>SuperMemo</span>.</p>"
+                  for i in range(10)]
+    analyse("".join(paragraphs))
+
+    paragraphs[3] = "<p>Edited, with <span class='concept' name='Anki'>Anki</span>.</p>"
+    block_cache.clear()
+    for paragraph in paragraphs[:3] + paragraphs[4:]:
+        analyse(paragraph)
+    block_cache.hits = block_cache.misses = 0
+
+    analysis = analyse("".join(paragraphs))
+
+    assert block_cache.misses == 1
+    assert block_cache.hits == 9
+    assert [(c.name, len(c.mentions)) for c in analysis.concepts] == [("SuperMemo", 9), ("Anki", 1)]
+
+
+def test_parse_blocks_in_parallel():
+    """
+    GIVEN documents whose blocks aren't cached
+    WHEN their blocks are parsed on a process pool
+    THEN analysing them afterwards parses nothing and gives the same result
+    """
+
+    documents = [f"<h2 id='d{i}'>Document {i}</h2><p>About <span class='concept' name='Anki'>Anki</span>.</p>"
+                 for i in range(4)]
+    expected = [analyse(document).properties() for document in documents]
+    block_cache.clear()
+    analysis_cache.clear()
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        # The paragraph is shared by every document, so it's only parsed once
+        assert parse_blocks(documents, executor) == 5
+        assert parse_blocks(documents, executor) == 0
+    block_cache.hits = block_cache.misses = 0
+
+    assert [analyse(document).properties() for document in documents] == expected
+    assert block_cache.misses == 0
+
+
+def test_private_caches_leave_shared_caches_alone():
+    """
+    GIVEN documents analysed with private caches, e.g. by an import
+    WHEN the block is left
+    THEN their parses were cached privately and the shared caches didn't change
+    """
+
+    block_cache.clear()
+    analysis_cache.clear()
+
+    with private_caches() as caches:
+        analyse("<p>Imported.</p>")
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            parse_blocks(["<p>Also imported.</p>"], executor)
+
+    assert len(caches.blocks) == 2 and len(caches.analyses) == 1
+    assert len(block_cache) == 0 and len(analysis_cache) == 0
+
+
+def test_analyse_links_known_concepts():
+    matcher = ConceptMatcher(["Spaced Repetition", "SuperMemo"])
+    content = ("<p>Spaced repetition is old.</p>"
+               "<p>Read about <span class='concept' name='SuperMemo'>SuperMemo</span>.</p>")
+
+    analysis = analyse(content, matcher)
+
+    assert [(c.name, c.mentions) for c in analysis.concepts] == [
+        ("Spaced Repetition", ["<span class='concept' name='Spaced Repetition'>Spaced repetition</span> is old."]),
+        ("SuperMemo", ["Read about <span class='concept' name='SuperMemo'>SuperMemo</span>."])
+    ]
+    assert [c.name for c in analyse(content).concepts] == ["SuperMemo"]
+
+
+def test_analyse_internal_links():
+    content = ("<p><a href='/articles/other'>Other</a>, "
+               "<a class='article' slug='popover'>popover</a>, "
+               "<a href='https://experimental-learning.com/notes#a-note'>note</a>, "
+               "<a href='/concepts#supermemo'>concept</a>, "
+               "<a href='/articles/other'>again</a> and "
+               "<a href='https://example.com/articles/external'>elsewhere</a>.</p>")
+
+    analysis = analyse(content)
+
+    assert analysis.properties()["links_to"] == ["Article/other", "Article/popover", "Note/a-note",
+                                                 "Concept/supermemo"]
+
+
+def test_large_blocks_are_streamed(monkeypatch):
+    """
+    GIVEN a block longer than the streaming threshold
+    WHEN it is analysed
+    THEN the streaming parser gives the same fields as the tree
+    """
+
+    from app.html_parsing import analysis
+
+    block = ("<div><summary>A short summary.</summary><h2 id='intro'>Intro</h2>"
+             "<p>Read <a href='/articles/other'>this</a> and <a class='article' slug='popover'>that</a> about "
+             "<span class='concept' name='SuperMemo'>SuperMemo</span>.</p>"
+             "<img src='/static/images/item_icon.jpg'><a href='https://example.com/x'>out</a></div>")
+    parsed = analysis._analyse_block(block)
+
+    monkeypatch.setattr(analysis, "STREAM_PARSE_THRESHOLD", 0)
+    streamed = analysis._analyse_block(block)
+
+    assert streamed._replace(absolute_content="", concepts=[]) == parsed._replace(absolute_content="", concepts=[])
+    assert [(c.name, c.mentions) for c in streamed.concepts] == [(c.name, c.mentions) for c in parsed.concepts]
+    assert "href='https://experimental-learning.com/articles/other'" in streamed.absolute_content
+    assert "src='https://experimental-learning.com/static/images/item_icon.jpg'" in streamed.absolute_content
+    assert "href='https://example.com/x'" in streamed.absolute_content
@@ -0,0 +1,36 @@
+from app.html_parsing.blocks import split_blocks
+
+
+def test_split_blocks_top_level_elements():
+    """
+    GIVEN html with top-level block elements and inline runs
+    WHEN it is split into blocks
+    THEN each block element and each inline run is a block, and the blocks join back to the html
+    """
+
+    content = ("<h2>Title</h2>\n"
+               "<p>One <b>two</b>.</p>\n"
+               "Loose <i>inline</i> text\n"
+               "<div><p>Nested</p></div>")
+
+    blocks = split_blocks(content)
+
+    assert blocks == ["<h2>Title</h2>\n",
+                      "<p>One <b>two</b>.</p>",
+                      "\nLoose <i>inline</i> text\n",
+                      "<div><p>Nested</p></div>"]
+    assert "".join(blocks) == content
+
+
+def test_split_blocks_ignores_markup_in_raw_text_and_attributes():
+    content = "<p title='a > b'>x</p><script>if (a < b) { s = '<p>' }</script><p>y</p>"
+
+    assert split_blocks(content) == ["<p title='a > b'>x</p>",
+                                     "<script>if (a < b) { s = '<p>' }</script>",
+                                     "<p>y</p>"]
+
+
+def test_split_blocks_unclosed_element_runs_to_end():
+    content = "<p>a</p><div><p>b</p><p>c</p>"
+
+    assert split_blocks(content) == ["<p>a</p>", "<div><p>b</p><p>c</p>"]
@@ -0,0 +1,71 @@
+import threading
+from app.coalescer import WriteCoalescer
+
+
+def test_coalescer_writes_only_the_merged_update():
+    writes = []
+    coalescer = WriteCoalescer(window=60)
+
+    coalescer.submit(("Article", "A"), writes.append, {"content": "draft 1", "published": False})
+    coalescer.submit(("Article", "A"), writes.append, {"content": "draft 2"})
+    coalescer.submit(("Article", "B"), writes.append, {"content": "other"})
+    assert writes == []
+    assert len(coalescer) == 2
+
+    coalescer.flush_all()
+
+    assert sorted(writes, key=lambda write: write["content"]) == [
+        {"content": "draft 2", "published": False},
+        {"content": "other"}
+    ]
+    assert len(coalescer) == 0
+
+
+def test_coalescer_writes_when_the_window_closes():
+    written = threading.Event()
+    coalescer = WriteCoalescer(window=0.01)
+
+    coalescer.submit(("Note", "A"), lambda payload: written.set(), {"content": "draft"})
+
+    assert written.wait(1)
+    assert len(coalescer) == 0
+
+
+def test_coalescer_flush_waits_for_a_write_in_progress():
+    started = threading.Event()
+    release = threading.Event()
+    writes = []
+
+    def slow_write(payload):
+        started.set()
+        release.wait(1)
+        writes.append(payload["content"])
+
+    coalescer = WriteCoalescer(window=60)
+    coalescer.submit(("Note", "A"), slow_write, {"content": "first"})
+    flushing = threading.Thread(target=coalescer.flush_all)
+    flushing.start()
+    started.wait(1)
+
+    coalescer.submit(("Note", "A"), lambda payload: writes.append(payload["content"]), {"content": "second"})
+    threading.Timer(0.02, release.set).start()
+    coalescer.flush(("Note", "A"))
+    flushing.join()
+
+    assert writes == ["first", "second"]
+
+
+def test_coalescer_flushes_only_matching_keys_and_forgets_flushed_ones():
+    writes = []
+    coalescer = WriteCoalescer(window=60)
+
+    coalescer.submit(("Note", "A"), writes.append, {"content": "note"})
+    coalescer.submit(("Article", "B"), writes.append, {"content": "article"})
+
+    coalescer.flush_where(lambda key: key[0] == "Note")
+
+    assert writes == [{"content": "note"}]
+    assert list(coalescer._key_locks) == [("Article", "B")]
+
+    coalescer.flush_all()
+    assert not coalescer._key_locks
@@ -0,0 +1,66 @@
+from app.html_parsing import concept_matcher
+from app.html_parsing.concept_matcher import ConceptMatcher
+
+
+def test_find_folds_case_and_whitespace():
+    """
+    GIVEN a matcher over concept names
+    WHEN text mentions them in a different case or split over lines
+    THEN each mention is found with its offset and original text
+    """
+
+    matcher = ConceptMatcher(["Spaced Repetition", "SuperMemo"])
+    text = "I use spaced\nRepetition in SUPERMEMO."
+
+    assert matcher.find(text) == [(6, "Spaced Repetition", "spaced\nRepetition"),
+                                  (27, "SuperMemo", "SUPERMEMO")]
+
+
+def test_find_respects_word_boundaries():
+    matcher = ConceptMatcher(["Super", "C++"])
+
+    assert matcher.find("Superb supermemo, but super and C++.") == [(22, "Super", "super"),
+                                                                    (32, "C++", "C++")]
+
+
+def test_find_prefers_leftmost_longest():
+    matcher = ConceptMatcher(["memory", "long term memory", "term"])
+
+    assert matcher.find("long term memory") == [(0, "long term memory", "long term memory")]
+
+
+def test_add_and_discard(monkeypatch):
+    monkeypatch.setattr(concept_matcher, "MIN_PENDING", 2)
+    matcher = ConceptMatcher(["Anki"])
+    version = matcher.version
+
+    matcher.add(["SuperMemo"])
+    assert matcher.find("Anki or SuperMemo") == [(0, "Anki", "Anki"), (8, "SuperMemo", "SuperMemo")]
+    assert matcher.version > version
+
+    # Pushes the pending names into the main automaton
+    matcher.add(["Mnemosyne", "Incremental Reading", "Spaced Repetition"])
+    matcher.discard("Anki")
+    assert [name for _, name, _ in matcher.find("Anki, SuperMemo, Mnemosyne")] == ["SuperMemo", "Mnemosyne"]
+    assert "Anki" not in matcher and "mnemosyne" in matcher
+
+
+def test_link_keeps_marked_up_spans():
+    matcher = ConceptMatcher(["SuperMemo", "Anki"])
+    text = "SuperMemo and Anki."
+
+    assert matcher.link(text, [(0, "SuperMemo (software)", "SuperMemo")]) == [
+        (0, "SuperMemo (software)", "SuperMemo"),
+        (14, "Anki", "Anki")
+    ]
+
+
+def test_extended_leaves_the_matcher_unchanged():
+    matcher = ConceptMatcher(["Anki"])
+    version = matcher.version
+
+    extended = matcher.extended(["SuperMemo"])
+
+    assert [name for _, name, _ in extended.find("Anki or SuperMemo")] == ["Anki", "SuperMemo"]
+    assert [name for _, name, _ in matcher.find("Anki or SuperMemo")] == ["Anki"]
+    assert matcher.version == version and extended.cache_key != matcher.cache_key
@@ -0,0 +1,29 @@
+from app.html_parsing.concept_parser import parse_concepts
+
+
+def test_parse_concepts_mentions():
+    """
+    GIVEN html content with concept spans
+    WHEN parse_concepts is called
+    THEN each span is mapped to the sentence that contains it
+    """
+
+    content = ("<p>Mr. Smith likes <span class='concept' name='SuperMemo'>SuperMemo</span>. "
+               "It uses <span class='concept' name='Spaced Repetition'>spaced repetition</span>!</p>"
+               "<p>Everyone likes <span class='concept' name='SuperMemo'>SuperMemo</span>.</p>")
+
+    concepts = parse_concepts(content)
+
+    assert [concept.name for concept in concepts] == ["SuperMemo", "Spaced Repetition"]
+    assert concepts[0].mentions == [
+        "Mr. Smith likes <span class='concept' name='SuperMemo'>SuperMemo</span>.",
+        "Everyone likes <span class='concept' name='SuperMemo'>SuperMemo</span>."
+    ]
+    assert concepts[1].mentions == [
+        "It uses <span class='concept' name='Spaced Repetition'>spaced repetition</span>!"
+    ]
+
+
+def test_parse_concepts_ignores_unnamed_spans():
+    content = "Some <span class='concept'>thing</span>."
+    assert parse_concepts(content) == []
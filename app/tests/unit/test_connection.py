@@ -0,0 +1,54 @@
+import pytest
+from app.models import connection
+
+
+class FakeGraph:
+
+    def __init__(self, uri, **settings):
+        self.uri = uri
+        self.settings = settings
+
+    def evaluate(self, query):
+        return 1
+
+
+SETTINGS = {
+    "NEO4J_URI": "bolt://graph:7687",
+    "NEO4J_USERNAME": "neo4j",
+    "NEO4J_PASSWORD": "secret",
+    "NEO4J_POOL_INIT_SIZE": 1,
+    "NEO4J_POOL_MAX_SIZE": 4,
+    "NEO4J_CONNECTION_MAX_AGE": 60,
+}
+
+
+def test_connection_opens_on_first_use(monkeypatch):
+    opened = []
+    monkeypatch.setattr(connection, "Graph", lambda uri, **settings: opened.append(uri) or FakeGraph(uri, **settings))
+    graph = connection.GraphConnection()
+    graph.configure(SETTINGS)
+    assert opened == []
+
+    assert graph.uri == "bolt://graph:7687"
+    assert graph.settings["max_size"] == 4
+    assert graph.get() is graph.get()
+    assert opened == ["bolt://graph:7687"]
+
+
+def test_connection_reopens_after_fork(monkeypatch):
+    monkeypatch.setattr(connection, "Graph", FakeGraph)
+    graph = connection.GraphConnection()
+    graph.configure(SETTINGS)
+    parent = graph.get()
+
+    monkeypatch.setattr(connection.os, "getpid", lambda: -1)
+    assert graph.get() is not parent
+
+
+def test_connection_needs_a_password(monkeypatch):
+    monkeypatch.setattr(connection, "Graph", FakeGraph)
+    graph = connection.GraphConnection()
+    graph.configure({**SETTINGS, "NEO4J_PASSWORD": None})
+
+    with pytest.raises(RuntimeError):
+        graph.get()
@@ -0,0 +1,80 @@
+import os
+from PIL import Image
+from app.html_parsing import images
+from app.html_parsing.images import image_variants, optimize_images
+
+
+def use_static_dir(monkeypatch, tmp_path):
+    static = tmp_path / "static"
+    (static / "images").mkdir(parents=True)
+    monkeypatch.setattr(images, "STATIC_DIR", str(static))
+    monkeypatch.setattr(images, "VARIANTS_DIR", str(static / "images" / "variants"))
+    Image.new("RGB", (2000, 1000), "white").save(static / "images" / "big.png")
+    return static
+
+
+def test_optimize_images(monkeypatch, tmp_path):
+    """
+    GIVEN html with a large local image and a remote image
+    WHEN its images are optimized
+    THEN the local image gets resized variants, size hints and lazy loading
+    """
+
+    use_static_dir(monkeypatch, tmp_path)
+    content = "<p><img src='/static/images/big.png'><img src='https://example.com/a.png'></p>"
+
+    html = optimize_images(content)
+
+    variants = image_variants("/static/images/big.png")
+    assert [width for _, width in variants.webp] == [480, 960, 1440, 2000]
+    assert 'type="image/webp"' in html and ".webp 480w" in html
+    assert 'width="2000"' in html and 'height="1000"' in html and 'loading="lazy"' in html
+    assert html.count("<picture>") == 1
+    for url, _ in variants.webp + variants.fallback:
+        assert os.path.isfile(os.path.join(images.VARIANTS_DIR, url.rsplit("/", 1)[1]))
+
+
+def test_variants_generated_once_per_image(monkeypatch, tmp_path):
+    static = use_static_dir(monkeypatch, tmp_path)
+    Image.new("RGB", (2000, 1000), "white").save(static / "images" / "copy.png")
+
+    first = image_variants("/static/images/big.png")
+    generated = sorted(os.listdir(images.VARIANTS_DIR))
+    second = image_variants("/static/images/copy.png")
+
+    assert first == second
+    assert sorted(os.listdir(images.VARIANTS_DIR)) == generated
+
+
+def test_non_local_images_are_left_alone(monkeypatch, tmp_path):
+    use_static_dir(monkeypatch, tmp_path)
+
+    assert optimize_images("<img src='https://example.com/a.png'><img src='/static/../secret.png'>") is None
+
+
+def test_unreadable_images_are_left_alone(monkeypatch, tmp_path):
+    static = use_static_dir(monkeypatch, tmp_path)
+    (static / "images" / "broken.png").write_bytes(b"\x89PNG\r\n\x1a\n" + b"\0" * 64)
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+
+    assert image_variants("/static/images/broken.png") is None
+    assert image_variants("/static/images/big.png") is None
+    assert not images._generating
+
+
+def test_images_in_a_picture_keep_it(monkeypatch, tmp_path):
+    """
+    GIVEN an image already in a <picture> with its own size and attributes
+    WHEN its images are optimized
+    THEN it isn't wrapped again and keeps its size and other attributes
+    """
+
+    use_static_dir(monkeypatch, tmp_path)
+    content = ("<picture><img alt=\"a &amp; b\" src=\"/static/images/big.png\" width=\"100\"/></picture>"
+               "<p title='<img>'>text</p>")
+
+    html = optimize_images(content)
+
+    assert html.count("<picture>") == 1 and "<source" not in html
+    assert 'alt="a &amp; b"' in html and 'width="100"' in html and "height=" not in html
+    assert html.endswith("</picture><p title='<img>'>text</p>")
@@ -0,0 +1,107 @@
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from flask import Flask
+from app import jobs
+from app.jobs import FAILED, QUEUED, SUCCEEDED, Job, JobQueue, JobStore
+
+
+def job_queue(tmp_path, workers):
+    return JobQueue(workers, JobStore(str(tmp_path / "jobs.sqlite3")))
+
+
+def test_job_queue_runs_jobs_and_reports_timings(tmp_path):
+    queue = job_queue(tmp_path, workers=2)
+    job = queue.submit(Flask(__name__), "article", "a", lambda data: ({"title": data["title"]}, 201), {"title": "A"})
+    queue.shutdown()
+
+    report = queue.get(job.id)
+    assert report == job.to_dict()
+    assert report["status"] == SUCCEEDED
+    assert report["status_code"] == 201
+    assert report["result"] == {"title": "A"}
+    assert report["wait_time"] >= 0
+    assert report["run_time"] >= 0
+
+
+def test_job_queue_reports_failures(tmp_path):
+    def fail(data):
+        raise RuntimeError("Lost connection")
+
+    queue = job_queue(tmp_path, workers=1)
+    app = Flask(__name__)
+    failed = queue.submit(app, "note", "a", fail, {})
+    rejected = queue.submit(app, "note", "b", lambda data: ({"Message": "Failed."}, 400), {})
+    queue.shutdown()
+
+    assert failed.status == FAILED
+    assert failed.status_code == 500
+    assert failed.error == "Lost connection"
+    assert rejected.status == FAILED
+    assert rejected.status_code == 400
+
+
+def test_job_queue_runs_jobs_with_the_same_key_in_order(tmp_path):
+    order = []
+    first_started = threading.Event()
+
+    def slow(data):
+        first_started.set()
+        time.sleep(0.05)
+        order.append(data["n"])
+        return {}, 201
+
+    def fast(data):
+        order.append(data["n"])
+        return {}, 201
+
+    queue = job_queue(tmp_path, workers=4)
+    app = Flask(__name__)
+    queue.submit(app, "article", "same", slow, {"n": 1})
+    first_started.wait(1)
+    queue.submit(app, "article", "same", fast, {"n": 2})
+    queue.submit(app, "article", "other", fast, {"n": 3})
+    queue.shutdown()
+
+    assert order == [3, 1, 2]
+
+
+def test_jobs_are_reported_to_every_process(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    queue = JobQueue(1, JobStore(path))
+    job = queue.submit(Flask(__name__), "note", "a", lambda data: ({}, 201), {})
+    queue.shutdown()
+
+    # Another worker, reading the same file
+    assert JobStore(path).get(job.id)["status"] == SUCCEEDED
+    assert JobStore(path).get("unknown") is None
+
+
+def test_jobs_of_stopped_processes_are_reported_failed(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job = Job("note", {})
+    store.save(job)
+    stopped = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                             capture_output=True, text=True).stdout
+    with sqlite3.connect(store.path) as connection:
+        connection.execute("UPDATE jobs SET pid = ? WHERE id = ?", (int(stopped), job.id))
+
+    report = store.get(job.id)
+    assert job.status == QUEUED
+    assert report["status"] == FAILED
+    assert report["status_code"] == 500
+
+
+def test_finished_jobs_are_forgotten_past_max_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "MAX_JOBS", 2)
+    queue = job_queue(tmp_path, workers=1)
+    app = Flask(__name__)
+    first = queue.submit(app, "note", "a", lambda data: ({}, 201), {})
+    queue.shutdown()
+    queue.submit(app, "note", "b", lambda data: ({}, 201), {})
+    queue.submit(app, "note", "c", lambda data: ({}, 201), {})
+    queue.shutdown()
+
+    assert queue.get(first.id) is None
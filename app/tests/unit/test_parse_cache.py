@@ -0,0 +1,27 @@
+from app.html_parsing.analysis import analyse, analysis_cache
+from app.html_parsing.cache import ParseCache
+
+
+def test_parse_cache_evicts_least_recently_used():
+    cache = ParseCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_analyse_reuses_result():
+    analysis_cache.clear()
+    content = "<summary>Short.</summary><h2 id='intro'>Intro</h2><p>About <span class='concept' name='SuperMemo'>SuperMemo</span>.</p>"
+
+    first = analyse(content)
+    second = analyse(content)
+
+    assert first is second
+    assert analysis_cache.hits == 1
@@ -0,0 +1,74 @@
+import pytest
+from app.models import queries
+
+
+class FakeCursor:
+
+    def evaluate(self):
+        return None
+
+    def data(self):
+        return []
+
+
+class FakeGraph:
+
+    def __init__(self):
+        self.statements = []
+
+    def run(self, cypher, parameters=None):
+        self.statements.append((cypher, parameters))
+        return FakeCursor()
+
+
+def test_registry_runs_statements_with_parameters(monkeypatch):
+    graph = FakeGraph()
+    monkeypatch.setattr(queries, "graph", graph)
+    registry = queries.QueryRegistry()
+    name = registry.register("note_by_title", "MATCH (n: Note { title: $title }) RETURN n", title="")
+
+    registry.evaluate(name, title="Don't quote me")
+    registry.evaluate(name, title="Another")
+
+    assert graph.statements == [
+        ("MATCH (n: Note { title: $title }) RETURN n", {"title": "Don't quote me"}),
+        ("MATCH (n: Note { title: $title }) RETURN n", {"title": "Another"}),
+    ]
+    assert registry.stats() == {"note_by_title": {"runs": 2, "warmed": False}}
+
+
+def test_statements_are_warmed_once_per_process(monkeypatch):
+    graph = FakeGraph()
+    monkeypatch.setattr(queries, "graph", graph)
+    registry = queries.QueryRegistry()
+    name = registry.register("note_by_title", "MATCH (n: Note { title: $title }) RETURN n", title="")
+
+    registry.warm_once()
+    registry.warm_once()
+    registry.evaluate(name, title="A")
+
+    assert graph.statements[0] == ("EXPLAIN MATCH (n: Note { title: $title }) RETURN n", {"title": ""})
+    assert len(graph.statements) == 2
+    assert registry.stats() == {"note_by_title": {"runs": 1, "warmed": True}}
+
+
+def test_names_are_unique():
+    registry = queries.QueryRegistry()
+    registry.register("lookup", "MATCH (n: Note { title: $title }) RETURN n")
+    registry.register("lookup", "MATCH (n: Note { title: $title }) RETURN n")
+
+    with pytest.raises(ValueError):
+        registry.register("lookup", "MATCH (n: Link { title: $title }) RETURN n")
+
+
+def test_fetch_returns_properties_or_none(monkeypatch):
+    graph = FakeGraph()
+    monkeypatch.setattr(queries, "graph", graph)
+    registry = queries.QueryRegistry()
+    name = registry.register("note_by_title", "MATCH (n: Note { title: $title }) RETURN n", title="")
+
+    assert registry.fetch(name, title="Missing") is None
+
+    monkeypatch.setattr(FakeCursor, "evaluate", lambda self: {"title": "Found"})
+    assert registry.fetch(name, title="Found") == {"title": "Found"}
+    assert len(graph.statements) == 2
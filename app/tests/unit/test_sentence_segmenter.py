@@ -0,0 +1,37 @@
+from app.html_parsing.sentence_segmenter import SentenceIndex, iter_sentence_spans, split_into_sentences
+
+
+def test_split_into_sentences_rules():
+    """
+    GIVEN text with prefixes, acronyms, websites and suffixes
+    WHEN split_into_sentences is called
+    THEN only real sentence terminators end a sentence
+    """
+
+    text = "Mr. Smith works at the U.S. office. Visit example.com now! Acme Inc. He left. Trailing"
+
+    assert split_into_sentences(text) == [
+        "Mr. Smith works at the U.S. office.",
+        "Visit example.com now!",
+        "Acme Inc.",
+        "He left."
+    ]
+
+
+def test_iter_sentence_spans_offsets():
+    text = "  First one.\nSecond one?  Third"
+
+    spans = list(iter_sentence_spans(text, include_trailing=True))
+
+    assert [span.text for span in spans] == ["First one.", "Second one?", "Third"]
+    for span in spans:
+        assert text[span.start:span.end] == span.text
+
+
+def test_sentence_index_find():
+    text = "One. Two. Three"
+    index = SentenceIndex(text)
+
+    assert index.find(0).text == "One."
+    assert index.find(text.index("Two")).text == "Two."
+    assert index.find(text.index("Three")) is None
@@ -0,0 +1,36 @@
+import pytest
+from app.html_parsing import concept_parser, stream_parser, summary_parser
+
+
+DOCUMENTS = [
+    "Some content about <span name='Spaced Repetition' class='concept'>spaced repetition</span>.",
+    "<summary>A short summary.</summary>\n\n<p>Mr. Smith likes <span class='concept' name='SuperMemo'>SuperMemo</span>. "
+    "It uses <span class='concept' name='Spaced Repetition'>spaced repetition</span>!</p>",
+    "<summary><b>Bold</b> summary</summary><div><span class='concept' name='Outer'>outer "
+    "<span class='concept' name='Inner'>inner</span></span> text.</div>",
+    "<p>Tom &amp; Jerry&nbsp;<!-- hidden --> <img src='/a.png'><br>are <span class='concept'>unnamed</span>.</p>",
+    "<pre>  \n  </pre><p>  </p>No markup at all",
+]
+
+
+@pytest.mark.parametrize("content", DOCUMENTS)
+def test_stream_parser_matches_soup(content):
+    """
+    GIVEN html content
+    WHEN it is parsed by the streaming extractor
+    THEN the text, summary and concept mentions match the BeautifulSoup path
+    """
+
+    assert stream_parser.html_to_text(content) == concept_parser.html_to_text(content)
+    assert stream_parser.parse_summary(content) == summary_parser.parse_summary(content)
+
+    streamed = [(concept.name, concept.mentions) for concept in stream_parser.parse_concepts(content)]
+    parsed = [(concept.name, concept.mentions) for concept in concept_parser.parse_concepts(content)]
+    assert streamed == parsed
+
+
+def test_stream_parser_accepts_chunks():
+    content = DOCUMENTS[1]
+    chunks = [content[i:i + 7] for i in range(0, len(content), 7)]
+
+    assert stream_parser.extract(chunks) == stream_parser.extract(content)
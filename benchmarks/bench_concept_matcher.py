@@ -0,0 +1,42 @@
+""" Time building, extending and running a concept matcher over 50k names.
+
+Usage: python -m benchmarks.bench_concept_matcher
+"""
+import random
+import string
+import time
+
+from app.html_parsing.concept_matcher import ConceptMatcher
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    random.seed(0)
+    words = ["".join(random.choice(string.ascii_lowercase) for _ in range(random.randint(3, 9)))
+             for _ in range(20000)]
+    names = [" ".join(random.sample(words, random.randint(1, 3))) for _ in range(50000)]
+    text = " ".join(random.choice(words) for _ in range(100000))
+
+    seconds, matcher = timed(ConceptMatcher, names)
+    # The first match builds the automata
+    build, _ = timed(matcher.find, "")
+    print(f"{'build':<8} {(seconds + build) * 1000:>8.1f} ms  {len(matcher)} names")
+
+    seconds, mentions = timed(matcher.find, text)
+    print(f"{'find':<8} {seconds * 1000:>8.1f} ms  {len(text)} chars, {len(mentions)} mentions")
+
+    def add_one(name):
+        matcher.add([name])
+        return matcher.find(name)
+
+    seconds, _ = timed(add_one, "a brand new concept")
+    print(f"{'add':<8} {seconds * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
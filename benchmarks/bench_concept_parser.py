@@ -0,0 +1,33 @@
+""" Benchmark parse_concepts against document size.
+
+Usage: python -m benchmarks.bench_concept_parser
+
+Each paragraph holds one concept span, so the number of concepts grows with
+the document. A linear parser roughly doubles its time when the size doubles.
+"""
+import timeit
+
+from app.html_parsing.concept_parser import parse_concepts
+
+
+PARAGRAPH = ("<p>Mr. Smith reviews his cards with "
+             "<span class='concept' name='Spaced Repetition'>spaced repetition</span>"
+             " every day. It works well for learning! Does it work for everyone?</p>")
+
+
+def make_document(paragraphs: int) -> str:
+    return PARAGRAPH * paragraphs
+
+
+def main():
+    previous = None
+    for paragraphs in (100, 200, 400, 800, 1600):
+        content = make_document(paragraphs)
+        seconds = min(timeit.repeat(lambda: parse_concepts(content), number=1, repeat=3))
+        ratio = f"{seconds / previous:.2f}x" if previous else "-"
+        print(f"{paragraphs:>5} concepts {len(content):>8} chars {seconds * 1000:>9.1f} ms  {ratio}")
+        previous = seconds
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+""" Time re-analysing a long document after a one-paragraph edit.
+
+Usage: python -m benchmarks.bench_incremental_analysis
+"""
+import time
+
+from app.html_parsing import analysis
+
+
+PARAGRAPH = ("<p>Mr. Smith reviews card {} with "
+             "<span class='concept' name='Spaced Repetition'>spaced repetition</span>"
+             " every day. It works <b>well</b> for <i>learning</i>!</p>\n")
+
+
+def timed(content):
+    analysis.analysis_cache.clear()
+    start = time.perf_counter()
+    analysis.analyse(content)
+    return time.perf_counter() - start
+
+
+def main():
+    paragraphs = [PARAGRAPH.format(i) for i in range(5000)]
+    content = "".join(paragraphs)
+    print(f"{len(content)} chars, {len(paragraphs)} blocks")
+
+    analysis.block_cache.clear()
+    print(f"{'full':<8} {timed(content) * 1000:>8.1f} ms")
+
+    paragraphs[2500] = PARAGRAPH.format("edited")
+    print(f"{'edit':<8} {timed(''.join(paragraphs)) * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
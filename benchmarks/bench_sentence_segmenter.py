@@ -0,0 +1,65 @@
+""" Benchmark the sentence segmenter on a 100k word corpus.
+
+Usage: python -m benchmarks.bench_sentence_segmenter
+
+Compares iter_sentence_spans with the previous string-rewriting
+implementation of split_into_sentences, kept here as the baseline.
+"""
+import re
+import timeit
+
+from app.html_parsing.sentence_segmenter import iter_sentence_spans, split_into_sentences
+
+
+SENTENCES = ("Mr. Smith reviews his cards with spaced repetition every day. "
+             "It works well for learning, e.g. for the U.S. exams! "
+             "Does it work for everyone? See example.com for more. ")
+
+
+def legacy_split_into_sentences(text):
+    alphabets = "([A-Za-z])"
+    prefixes = "(Mr|St|Mrs|Ms|Dr)[.]"
+    suffixes = "(Inc|Ltd|Jr|Sr|Co)"
+    starters = "(Mr|Mrs|Ms|Dr|He\\s|She\\s|It\\s|They\\s|Their\\s|Our\\s|We\\s|But\\s|However\\s|That\\s|This\\s|Wherever)"
+    acronyms = "([A-Z][.][A-Z][.](?:[A-Z][.])?)"
+    websites = "[.](com|net|org|io|gov)"
+
+    text = " " + text + "  "
+    text = text.replace("\n", " ")
+    text = re.sub(prefixes, "\\1<prd>", text)
+    text = re.sub(websites, "<prd>\\1", text)
+    if "Ph.D" in text: text = text.replace("Ph.D.", "Ph<prd>D<prd>")
+    text = re.sub("\\s" + alphabets + "[.] ", " \\1<prd> ", text)
+    text = re.sub(acronyms + " " + starters, "\\1<stop> \\2", text)
+    text = re.sub(alphabets + "[.]" + alphabets + "[.]" + alphabets + "[.]", "\\1<prd>\\2<prd>\\3<prd>", text)
+    text = re.sub(alphabets + "[.]" + alphabets + "[.]", "\\1<prd>\\2<prd>", text)
+    text = re.sub(" " + suffixes + "[.] " + starters, " \\1<stop> \\2", text)
+    text = re.sub(" " + suffixes + "[.]", " \\1<prd>", text)
+    text = re.sub(" " + alphabets + "[.]", " \\1<prd>", text)
+    if "”" in text: text = text.replace(".”", "”.")
+    if "\"" in text: text = text.replace(".\"", "\".")
+    if "!" in text: text = text.replace("!\"", "\"!")
+    if "?" in text: text = text.replace("?\"", "\"?")
+    text = text.replace(".", ".<stop>")
+    text = text.replace("?", "?<stop>")
+    text = text.replace("!", "!<stop>")
+    text = text.replace("<prd>", ".")
+    sentences = text.split("<stop>")
+    sentences = sentences[:-1]
+    return [s.strip() for s in sentences]
+
+
+def main():
+    words = len(SENTENCES.split())
+    corpus = SENTENCES * (100000 // words)
+    print(f"{len(corpus.split())} words, {len(split_into_sentences(corpus))} sentences")
+
+    for name, fn in (("legacy split_into_sentences", lambda: legacy_split_into_sentences(corpus)),
+                     ("split_into_sentences", lambda: split_into_sentences(corpus)),
+                     ("iter_sentence_spans", lambda: list(iter_sentence_spans(corpus)))):
+        seconds = min(timeit.repeat(fn, number=1, repeat=5))
+        print(f"{name:<30} {seconds * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+""" Compare peak memory and time of the soup and streaming extractors.
+
+Usage: python -m benchmarks.bench_stream_parser
+"""
+import time
+import tracemalloc
+
+from app.html_parsing import concept_parser, stream_parser, summary_parser
+
+
+PARAGRAPH = ("<p>Mr. Smith reviews his cards with "
+             "<span class='concept' name='Spaced Repetition'>spaced repetition</span>"
+             " every day. It works <b>well</b> for <i>learning</i>!</p>\n")
+
+
+def soup_path(content):
+    return (concept_parser.html_to_text(content),
+            summary_parser.parse_summary(content),
+            concept_parser.parse_concepts(content))
+
+
+def stream_path(content):
+    document = stream_parser.extract(content)
+    return (document.text,
+            document.summary,
+            concept_parser.build_concept_mentions(document.text, document.concepts))
+
+
+def measure(fn, content):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(content)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    content = "<summary>Transcript.</summary>" + PARAGRAPH * 5000
+    print(f"{len(content)} chars")
+    for name, fn in (("soup", soup_path), ("stream", stream_path)):
+        seconds, peak = measure(fn, content)
+        print(f"{name:<8} {seconds * 1000:>8.1f} ms  peak {peak / 2 ** 20:>7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
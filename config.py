@@ -1,4 +1,5 @@
 import os
+import tempfile
 import app.static.avatars as avatars_folder
 
 
@@ -19,6 +20,19 @@ class Config:
 
 
 
+    # Neo4j: connections are pooled per process; max age in seconds. There's
+    # no default password, connecting fails until NEO4J_PASSWORD is set
+    NEO4J_URI = os.getenv("NEO4J_URI") or "bolt://localhost:7687"
+    NEO4J_USERNAME = os.getenv("NEO4J_USERNAME") or "neo4j"
+    NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+    NEO4J_POOL_INIT_SIZE = int(os.getenv("NEO4J_POOL_INIT_SIZE", "1"))
+    NEO4J_POOL_MAX_SIZE = int(os.getenv("NEO4J_POOL_MAX_SIZE", "40"))
+    NEO4J_CONNECTION_MAX_AGE = int(os.getenv("NEO4J_CONNECTION_MAX_AGE", "3600"))
+
+    # EXPLAIN the registered lookups before each process's first request, so
+    # their plans are cached
+    WARM_QUERIES = os.getenv("WARM_QUERIES", "").lower() in ("1", "true")
+
     # Basic Auth
     BASIC_AUTH_USERNAME = os.getenv("BASIC_AUTH_USERNAME")
     BASIC_AUTH_PASSWORD = os.getenv("BASIC_AUTH_PASSWORD")
@@ -26,3 +40,21 @@ class Config:
     # Logging
     FLASK_LOG_LEVEL = 'WARNING'
 
+    # Link every mention of a known concept name, not only the marked up ones
+    AUTO_LINK_CONCEPTS = os.getenv("AUTO_LINK_CONCEPTS", "").lower() in ("1", "true")
+
+    # Parse and write posted content on a pool of worker threads, answering
+    # POSTs with 202 and a job to poll at /jobs/<id>
+    ASYNC_INGESTION = os.getenv("ASYNC_INGESTION", "").lower() in ("1", "true")
+    INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+    # SQLite file the jobs of every process are reported to
+    JOBS_DB = os.getenv("JOBS_DB") or os.path.join(tempfile.gettempdir(), "blog-jobs.sqlite3")
+
+    # Bulk NDJSON imports: records written together, and processes parsing
+    # their content (below 2, content is parsed while writing)
+    IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "100"))
+    IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", str(os.cpu_count() or 1)))
+
+    # Seconds to hold an update so later updates to the same document are
+    # merged into it; 0 writes every update straight away
+    COALESCE_WINDOW = float(os.getenv("COALESCE_WINDOW", "0"))
@@ -0,0 +1,129 @@
+""" Maintenance commands.
+
+    python manage.py migrate
+    python manage.py verify-schema
+    python manage.py export [--batch-size N] [path]
+    python manage.py reindex [--force] [--workers N] [--batch-size N] [label ...]
+    python manage.py rebuild-search-index [--batch-size N]
+"""
+import argparse
+import json
+import logging
+import sys
+from dotenv import load_dotenv
+
+
+def migrate(args: argparse.Namespace) -> None:
+
+    """ Apply pending schema migrations: constraints and indexes.
+    """
+
+    from app.models.migrations import migrate as apply_migrations, schema_version
+
+    try:
+        applied = apply_migrations()
+    except Exception as e:
+        sys.exit(f"Migration failed, schema is at version {schema_version()}: {e}")
+    if applied:
+        logging.info(f"Applied migrations {', '.join(map(str, applied))}")
+    logging.info(f"Schema is at version {schema_version()}")
+
+
+def verify_schema(args: argparse.Namespace) -> None:
+
+    """ Check that every lookup by a declared key is an index seek, exiting non-zero if not.
+    """
+
+    from app.models.schema import lookups, verify_lookups
+
+    scans = verify_lookups()
+    for description, operators in scans.items():
+        logging.error(f"{description} scans: {' -> '.join(operators)}")
+    if scans:
+        sys.exit(f"{len(scans)} lookups scan instead of seeking an index, run migrate")
+    logging.info(f"All {len(lookups())} lookups use an index")
+
+
+def export(args: argparse.Namespace) -> None:
+
+    """ Write a backup of the content graph as NDJSON, re-importable through /import.
+    """
+
+    from app.models.backup import export_records
+
+    out = open(args.path, "w") if args.path else sys.stdout
+    try:
+        count = 0
+        for record in export_records(batch_size=args.batch_size):
+            out.write(json.dumps(record) + "\n")
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    logging.info(f"Exported {count} records")
+
+
+def reindex(args: argparse.Namespace) -> None:
+
+    """ Re-analyse and relink content nodes, on every core.
+    """
+
+    from app.models.backup import CONTENT_TYPES
+    from app.models.reindex import reindex as reindex_nodes
+
+    unknown = set(args.labels) - set(CONTENT_TYPES)
+    if unknown:
+        sys.exit(f"Can't reindex {', '.join(sorted(unknown))}")
+
+    count = reindex_nodes(args.labels or list(CONTENT_TYPES), batch_size=args.batch_size,
+                          workers=args.workers, force=args.force)
+    logging.info(f"Reindexed {count} nodes")
+
+
+def rebuild_search_index(args: argparse.Namespace) -> None:
+
+    """ Backfill the text of articles that predate it, then rebuild the full-text index.
+    """
+
+    from app.models.search_index import FTS_INDEX, rebuild_fts_index
+
+    count = rebuild_fts_index(batch_size=args.batch_size)
+    logging.info(f"Backfilled text for {count} articles and rebuilt the {FTS_INDEX} index")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="Apply pending schema migrations")
+    migrate_parser.set_defaults(run=migrate)
+
+    verify_parser = commands.add_parser("verify-schema", help="Check lookups use indexes, with EXPLAIN")
+    verify_parser.set_defaults(run=verify_schema)
+
+    export_parser = commands.add_parser("export", help="Stream the content graph as NDJSON")
+    export_parser.add_argument("path", nargs="?", help="File to write, else stdout")
+    export_parser.add_argument("--batch-size", type=int, default=500, help="Nodes read per query")
+    export_parser.set_defaults(run=export)
+
+    reindex_parser = commands.add_parser("reindex", help="Re-analyse and relink content nodes")
+    reindex_parser.add_argument("labels", nargs="*", help="Labels to reindex: Concept, Article, Note or Link, else all")
+    reindex_parser.add_argument("--force", action="store_true",
+                                help="Also reindex nodes analysed by the current version")
+    reindex_parser.add_argument("--workers", type=int, help="Parsing processes, else one per core")
+    reindex_parser.add_argument("--batch-size", type=int, default=50, help="Nodes written per transaction")
+    reindex_parser.set_defaults(run=reindex)
+
+    search_parser = commands.add_parser("rebuild-search-index",
+                                        help="Backfill article text and rebuild the full-text index")
+    search_parser.add_argument("--batch-size", type=int, default=100, help="Articles written per transaction")
+    search_parser.set_defaults(run=rebuild_search_index)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    main()